@@ -8,5 +8,37 @@
 # been deposited with the U.S Copyright Office.
 #
 
-from liberty import Liberty, LibertyServer
-from serveradmin import AdminTask
\ No newline at end of file
+import sys
+import types
+
+
+_EXPORTS = {
+    'Liberty': 'liberty',
+    'LibertyServer': 'liberty',
+    'AdminTask': 'serveradmin',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+class _LazyPackage(types.ModuleType):
+    """Imports the modules behind the names exported here on first use.
+
+    Entry points that need none of them, such as the CLI client of a running
+    daemon, then start without loading the whole toolkit.
+    """
+    
+    def __getattr__(self, name):
+        module_name = _EXPORTS.get(name)
+        if module_name is None:
+            raise AttributeError(name)
+        value = getattr(__import__('{0}.{1}'.format(self.__name__, module_name), fromlist=[name]), name)
+        setattr(self, name, value)
+        return value
+
+
+_package = _LazyPackage(__name__, __doc__)
+_package.__dict__.update(globals())
+# Keeps this module, whose globals the methods above use, from being cleared.
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
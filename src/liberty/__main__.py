@@ -0,0 +1,18 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+from __future__ import absolute_import
+
+import sys
+
+from liberty.cli import main
+
+
+sys.exit(main())
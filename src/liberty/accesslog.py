@@ -0,0 +1,356 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import bisect
+import calendar
+import glob
+import multiprocessing
+import os
+import re
+
+import instrument
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# %D is the response time in microseconds.
+DEFAULT_LOG_FORMAT = '%h %u %t "%r" %s %b %D'
+CHUNK_SIZE = 4 * 1024 * 1024
+
+_TOKEN = re.compile(r'%(\{[^}]*\})?([a-zA-Z])')
+_GROUPS = {
+    'h': 'host',
+    't': 'time',
+    'r': 'request',
+    'm': 'method',
+    'U': 'path',
+    's': 'status',
+    'D': 'elapsed',
+}
+_MONTHS = dict((name, i + 1) for i, name in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']))
+# Latency buckets in microseconds, 8 per doubling from 1 us to about 19 hours,
+# which keeps percentiles within 5% whatever the number of requests.
+_BUCKETS_PER_DOUBLING = 8
+_BOUNDS = [int(round(2 ** (i / float(_BUCKETS_PER_DOUBLING)))) for i in range(36 * _BUCKETS_PER_DOUBLING + 1)]
+_BUCKETS = len(_BOUNDS) + 1
+
+
+def compile_format(log_format):
+    """Turns a Liberty ``logFormat`` into a regular expression with named groups."""
+    pattern = []
+    seen = set()
+    pos = 0
+    for match in _TOKEN.finditer(log_format):
+        literal = log_format[pos:match.start()]
+        pattern.append(re.escape(literal))
+        pos = match.end()
+        quoted = literal.endswith('"') and log_format[pos:pos + 1] == '"'
+
+        code = match.group(2)
+        if code == 't':
+            value = r'\[[^\]]*\]'
+        elif quoted:
+            value = r'[^"]*'
+        else:
+            value = r'\S+'
+        name = _GROUPS.get(code) if match.group(1) is None else None
+        if name is not None and name not in seen:
+            seen.add(name)
+            value = '(?P<{0}>{1})'.format(name, value)
+        pattern.append(value)
+    pattern.append(re.escape(log_format[pos:]))
+
+    if 'elapsed' not in seen:
+        raise LibertyAccessLogException("The log format '{0}' has no %D response time.".format(log_format))
+    if 'request' not in seen and 'path' not in seen:
+        raise LibertyAccessLogException("The log format '{0}' has no %r or %U request path.".format(log_format))
+    return re.compile(''.join(pattern) + r'\s*$')
+
+
+class EndpointStats(object):
+    """Counts and a fixed-size latency histogram for one method and path."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.errors = 0
+        self.client_errors = 0
+        self.first_minute = None
+        self.last_minute = None
+        self.histogram = [0] * _BUCKETS
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.client_errors += other.client_errors
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        for minute in (other.first_minute, other.last_minute):
+            self._add_minute(minute)
+
+    def _add_minute(self, minute):
+        if minute is None:
+            return
+        if self.first_minute is None or minute < self.first_minute:
+            self.first_minute = minute
+        if self.last_minute is None or minute > self.last_minute:
+            self.last_minute = minute
+
+    def error_rate(self):
+        """The share of requests answered with a 5xx status."""
+        if self.count == 0:
+            return 0.0
+        return float(self.errors) / self.count
+
+    def throughput(self):
+        """Average requests per minute between the first and the last request."""
+        if self.first_minute is None:
+            return float(self.count)
+        return float(self.count) / ((self.last_minute - self.first_minute) // 60 + 1)
+
+    def percentile(self, pct):
+        """The response time in seconds below which ``pct`` percent of the requests completed."""
+        total = sum(self.histogram)
+        if total == 0:
+            return None
+        rank = max(1, int(-(-pct * total // 100)))
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                break
+        if bucket == 0:
+            return _BOUNDS[0] / 1e6
+        if bucket >= len(_BOUNDS):
+            return _BOUNDS[-1] / 1e6
+        # The geometric middle of the bucket.
+        return (_BOUNDS[bucket - 1] * _BOUNDS[bucket]) ** 0.5 / 1e6
+
+
+class AccessLogReport(object):
+
+    def __init__(self, endpoints, minutes, lines, skipped):
+        self.endpoints = endpoints
+        self.minutes = minutes
+        self.lines = lines
+        self.skipped = skipped
+
+    def get(self, method, path):
+        return self.endpoints.get((method, path))
+
+    def peak_throughput(self):
+        """The most requests served within a single minute."""
+        if not self.minutes:
+            return 0
+        return max(self.minutes.values())
+
+    def format(self):
+        lines = ['{0:<8}{1:<40}{2:>10}{3:>10}{4:>10}{5:>10}{6:>10}{7:>9}'.format(
+            'method', 'path', 'requests', 'req/min', 'p50 ms', 'p95 ms', 'p99 ms', 'errors')]
+        for stats in sorted(self.endpoints.values(), key=lambda stats: (-stats.count, stats.method, stats.path)):
+            lines.append('{0:<8}{1:<40}{2:>10}{3:>10.1f}{4:>10.1f}{5:>10.1f}{6:>10.1f}{7:>9.2%}'.format(
+                stats.method, stats.path, stats.count, stats.throughput(), stats.percentile(50) * 1000,
+                stats.percentile(95) * 1000, stats.percentile(99) * 1000, stats.error_rate()))
+        lines.append('{0} lines, {1} not matching the log format, peak {2} requests/min'.format(
+            self.lines, self.skipped, self.peak_throughput()))
+        return '\n'.join(lines)
+
+
+class AccessLogAnalyzer(object):
+    """Computes per-endpoint latency percentiles, throughput and error rates from access logs.
+
+    Files are read ``chunk_size`` bytes at a time and only fixed-size
+    histograms are kept per endpoint, so memory does not grow with the size
+    of the logs. The response times of a chunk are bucketed with NumPy when it
+    is installed. Several files, such as the rotated logs of a server, are
+    analyzed in parallel processes.
+    """
+
+    def __init__(self, log_format=DEFAULT_LOG_FORMAT, chunk_size=CHUNK_SIZE, processes=None):
+        compile_format(log_format)
+        self._log_format = log_format
+        self._chunk_size = chunk_size
+        self._processes = processes
+
+    def analyze(self, paths):
+        with instrument.span('accesslog.analyze', files=str(len(paths))):
+            jobs = [(path, self._log_format, self._chunk_size) for path in paths]
+            if len(jobs) < 2 or self._processes == 1:
+                parts = [_analyze_file(job) for job in jobs]
+            else:
+                pool = multiprocessing.Pool(self._processes)
+                try:
+                    parts = pool.map(_analyze_file, jobs)
+                finally:
+                    pool.close()
+                    pool.join()
+
+        endpoints = {}
+        minutes = {}
+        lines = skipped = 0
+        for part in parts:
+            for key, stats in part.endpoints.items():
+                if key in endpoints:
+                    endpoints[key].merge(stats)
+                else:
+                    endpoints[key] = stats
+            for minute, count in part.minutes.items():
+                minutes[minute] = minutes.get(minute, 0) + count
+            lines += part.lines
+            skipped += part.skipped
+        instrument.incr('access_log_lines_total', lines)
+        return AccessLogReport(endpoints, minutes, lines, skipped)
+
+    def analyze_server(self, liberty_server):
+        """Analyzes ``http_access*.log`` in the logs directory of a server, rotated files included."""
+        paths = sorted(glob.glob(os.path.join(liberty_server.get_output_dir(), 'logs', 'http_access*.log')))
+        return self.analyze(paths)
+
+
+class _Aggregator(object):
+
+    def __init__(self, log_format):
+        self._pattern = compile_format(log_format)
+        self._epochs = {}
+        self.endpoints = {}
+        self.minutes = {}
+        self.lines = 0
+        self.skipped = 0
+        self._slots = []
+        self._slot_of = {}
+        self._counts = None
+
+    def add_lines(self, lines):
+        latencies = []
+        slots = []
+        match_line = self._pattern.match
+        for line in lines:
+            self.lines += 1
+            match = match_line(line)
+            if match is None:
+                self.skipped += 1
+                continue
+            fields = match.groupdict()
+            try:
+                elapsed = int(fields['elapsed'])
+            except ValueError:
+                self.skipped += 1
+                continue
+
+            method, path = _endpoint(fields)
+            slot = self._slot_of.get((method, path))
+            if slot is None:
+                slot = self._slot_of[(method, path)] = len(self._slots)
+                stats = EndpointStats(method, path)
+                self._slots.append(stats)
+                self.endpoints[(method, path)] = stats
+            stats = self._slots[slot]
+            stats.count += 1
+            status = fields.get('status')
+            if status is not None and status[:1] == '5':
+                stats.errors += 1
+            elif status is not None and status[:1] == '4':
+                stats.client_errors += 1
+
+            time = fields.get('time')
+            if time is not None:
+                minute = self._epoch_minute(time)
+                if minute is not None:
+                    stats._add_minute(minute)
+                    self.minutes[minute] = self.minutes.get(minute, 0) + 1
+
+            latencies.append(elapsed)
+            slots.append(slot)
+        self._add_latencies(latencies, slots)
+
+    def _add_latencies(self, latencies, slots):
+        if numpy is None:
+            for elapsed, slot in zip(latencies, slots):
+                self._slots[slot].histogram[bisect.bisect_left(_BOUNDS, elapsed)] += 1
+            return
+
+        if not latencies:
+            return
+        buckets = numpy.searchsorted(_BOUNDS_ARRAY, numpy.array(latencies, dtype=numpy.int64), side='left')
+        combined = numpy.array(slots, dtype=numpy.int64) * _BUCKETS + buckets
+        counts = numpy.bincount(combined, minlength=len(self._slots) * _BUCKETS).reshape(len(self._slots), _BUCKETS)
+        if self._counts is None:
+            self._counts = counts
+        else:
+            grown = numpy.zeros_like(counts)
+            grown[:self._counts.shape[0]] = self._counts
+            self._counts = grown + counts
+
+    def finish(self):
+        if self._counts is not None:
+            for stats, row in zip(self._slots, self._counts.tolist()):
+                stats.histogram = [a + b for a, b in zip(stats.histogram, row)]
+            self._counts = None
+        return self
+
+    def _epoch_minute(self, time):
+        stamp, _, zone = time.strip('[]').partition(' ')
+        key = (stamp[:17], zone)
+        epoch = self._epochs.get(key)
+        if epoch is None and key not in self._epochs:
+            try:
+                day, month, rest = stamp[:17].split('/')
+                year, hour, minute = rest.split(':')
+                epoch = calendar.timegm((int(year), _MONTHS[month], int(day), int(hour), int(minute), 0))
+                if zone:
+                    offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+                    epoch -= offset if zone[0] == '+' else -offset
+            except (ValueError, KeyError):
+                epoch = None
+            self._epochs[key] = epoch
+        return epoch
+
+    def __getstate__(self):
+        # Only the results travel back from a worker process.
+        return {'endpoints': self.endpoints, 'minutes': self.minutes, 'lines': self.lines, 'skipped': self.skipped}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+if numpy is not None:
+    _BOUNDS_ARRAY = numpy.array(_BOUNDS, dtype=numpy.int64)
+
+
+def _endpoint(fields):
+    request = fields.get('request')
+    if request is not None:
+        parts = request.split(' ')
+        method = parts[0]
+        path = parts[1] if len(parts) > 1 else ''
+    else:
+        method = fields.get('method') or '-'
+        path = fields['path']
+    return method, path.split('?', 1)[0]
+
+
+def _analyze_file(job):
+    path, log_format, chunk_size = job
+    aggregator = _Aggregator(log_format)
+    with open(path, 'r') as f:
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            aggregator.add_lines(lines)
+    return aggregator.finish()
+
+
+class LibertyAccessLogException (Exception):
+    pass
@@ -0,0 +1,243 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from multiprocessing.pool import ThreadPool
+
+import instrument
+
+
+_CACHE_VERSION = 1
+
+
+class SyncReport(object):
+
+    def __init__(self, source_dir, target_dir):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.copied = []
+        self.deleted = []
+        self.bytes_transferred = 0
+        self.total_bytes = 0
+
+    def is_changed(self):
+        return bool(self.copied or self.deleted)
+
+    def format(self):
+        lines = ['copied {0}'.format(path) for path in self.copied]
+        lines.extend('deleted {0}'.format(path) for path in self.deleted)
+        share = float(self.bytes_transferred) / self.total_bytes if self.total_bytes else 0.0
+        lines.append('{0}: {1} copied, {2} deleted, {3} of {4} bytes transferred ({5:.1%})'.format(
+            self.target_dir, len(self.copied), len(self.deleted), self.bytes_transferred, self.total_bytes, share))
+        return '\n'.join(lines)
+
+
+class FileIndex(object):
+    """SHA-1 digests of files, recomputed only when their size or modification time change."""
+
+    def __init__(self, cache_file=None, workers=8):
+        self._cache_file = cache_file
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def digests(self, paths):
+        self._load()
+        pool = ThreadPool(self._workers)
+        try:
+            return dict(zip(paths, pool.map(self.digest, paths)))
+        finally:
+            pool.close()
+            pool.join()
+
+    def digest(self, path):
+        self._load()
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime]
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[:2] == stamp:
+            instrument.incr('cache_hits_total', cache='appsync')
+            return entry[2]
+
+        instrument.incr('cache_misses_total', cache='appsync')
+        digest = _hash_file(path)
+        with self._lock:
+            self._entries[path] = stamp + [digest]
+        return digest
+
+    def forget(self, path):
+        self._load()
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def save(self):
+        if self._cache_file is None or self._entries is None:
+            return
+        with self._lock:
+            cache = {'version': _CACHE_VERSION, 'entries': self._entries}
+        directory = os.path.dirname(self._cache_file)
+        tmp_file = '{0}.{1}.tmp'.format(self._cache_file, os.getpid())
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmp_file, self._cache_file)
+        except (IOError, OSError):
+            # The cache only saves time, an unwritable location is not an error.
+            pass
+
+    def _load(self):
+        with self._lock:
+            if self._entries is not None:
+                return
+            self._entries = {}
+            if self._cache_file is None:
+                return
+            try:
+                with open(self._cache_file, 'r') as f:
+                    cache = json.load(f)
+            except (IOError, ValueError):
+                return
+            if cache.get('version') == _CACHE_VERSION:
+                self._entries = cache['entries']
+
+
+class AppSynchronizer(object):
+    """Makes an exploded application directory identical to a source directory.
+
+    Only files whose size or digest differ are copied. They are first
+    copied to ``staging_dir``, which must be on the same file system as the
+    target, and then renamed into place one after the other together with
+    the deletions. That keeps the window in which the application is half
+    updated to a series of renames, but each rename is visible on its own:
+    an application monitor polling the directory can still see part of the
+    changes in one scan. For an all-or-nothing update configure
+    ``<applicationMonitor updateTrigger="mbean"/>`` and have the application
+    restarted once ``sync`` returns.
+
+    A path that is a file on one side and a directory on the other is
+    replaced as a whole.
+    """
+
+    def __init__(self, index, staging_dir):
+        self._index = index
+        self._staging_dir = staging_dir
+
+    def sync(self, source_dir, target_dir):
+        with instrument.span('appsync.sync', target=os.path.basename(target_dir)):
+            report = SyncReport(source_dir, target_dir)
+            source_files = _list_files(source_dir)
+            target_files = _list_files(target_dir) if os.path.isdir(target_dir) else {}
+
+            candidates = []
+            for path, size in sorted(source_files.items()):
+                report.total_bytes += size
+                if target_files.get(path) == size:
+                    candidates.append(path)
+                else:
+                    report.copied.append(path)
+
+            paths = [os.path.join(source_dir, path) for path in candidates] + [os.path.join(target_dir, path) for path in candidates]
+            digests = self._index.digests(paths)
+            for path in candidates:
+                if digests[os.path.join(source_dir, path)] != digests[os.path.join(target_dir, path)]:
+                    report.copied.append(path)
+            report.copied.sort()
+            report.deleted = sorted(set(target_files) - set(source_files))
+            report.bytes_transferred = sum(source_files[path] for path in report.copied)
+
+            if report.is_changed():
+                self._apply(report)
+            self._index.save()
+        instrument.incr('appsync_bytes_total', report.bytes_transferred)
+        return report
+
+    def _apply(self, report):
+        if not os.path.isdir(self._staging_dir):
+            os.makedirs(self._staging_dir)
+        staging_dir = tempfile.mkdtemp(dir=self._staging_dir)
+        try:
+            for i, path in enumerate(report.copied):
+                shutil.copy2(os.path.join(report.source_dir, path), os.path.join(staging_dir, str(i)))
+
+            # Files that became directories go first, directories that became files are replaced as a whole.
+            ancestors = set()
+            for path in report.copied:
+                directory = os.path.dirname(path)
+                while directory:
+                    ancestors.add(directory)
+                    directory = os.path.dirname(directory)
+            for path in report.deleted:
+                if path in ancestors:
+                    self._delete(report.target_dir, path)
+
+            for path in report.copied:
+                target = os.path.join(report.target_dir, path)
+                if os.path.isdir(target) and not os.path.islink(target):
+                    shutil.rmtree(target)
+                directory = os.path.dirname(target)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+            for i, path in enumerate(report.copied):
+                target = os.path.join(report.target_dir, path)
+                os.rename(os.path.join(staging_dir, str(i)), target)
+                self._index.forget(target)
+            for path in report.deleted:
+                if path not in ancestors:
+                    self._delete(report.target_dir, path)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        _remove_empty_dirs(report.target_dir, report.deleted)
+
+    def _delete(self, target_dir, path):
+        target = os.path.join(target_dir, path)
+        # Gone with a directory that became a file.
+        if os.path.lexists(target):
+            os.remove(target)
+        self._index.forget(target)
+
+
+def _list_files(directory):
+    """Sizes of the files below ``directory``, by path relative to it with '/' separators."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, directory).replace(os.sep, '/')
+            files[relative_path] = os.path.getsize(path)
+    return files
+
+
+def _remove_empty_dirs(target_dir, deleted):
+    directories = set()
+    for path in deleted:
+        directory = os.path.dirname(path)
+        while directory:
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+    for directory in sorted(directories, key=len, reverse=True):
+        path = os.path.join(target_dir, directory)
+        if os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
+
+
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
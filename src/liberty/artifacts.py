@@ -0,0 +1,214 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zipfile
+from multiprocessing.pool import ThreadPool
+from xml.parsers import expat
+
+import instrument
+
+
+_CACHE_VERSION = 1
+_WEB_XML = 'WEB-INF/web.xml'
+_EOCD = 'PK\x05\x06'
+_EOCD_SIZE = 22
+_ZIP64_LOCATOR = 'PK\x06\x07'
+_ZIP64_LOCATOR_SIZE = 20
+_MAX_COMMENT = 65535
+
+
+class WarInspector(object):
+    """Reads the deployment descriptor of WAR files without extracting them.
+
+    Only the zip central directory and ``WEB-INF/web.xml`` are read. Results
+    are cached in a JSON file keyed by a hash of the central directory, which
+    holds the CRC of every entry; a WAR whose size and modification time are
+    unchanged is not opened at all.
+    """
+
+    def __init__(self, cache_file=None, workers=8):
+        if cache_file is None:
+            cache_file = os.path.join(os.path.expanduser('~'), '.liberty-toolkit', 'artifacts.json')
+        self._cache_file = cache_file
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._entries = None
+        self._paths = None
+
+    def inspect(self, war_path):
+        """Returns ``{'digest': ..., 'version': ..., 'roles': [...]}`` for a WAR file."""
+        return self.inspect_all([war_path])[0]
+
+    def inspect_all(self, war_paths):
+        self._load()
+        with instrument.span('artifacts.inspect', wars=str(len(war_paths))):
+            if len(war_paths) < 2:
+                results = [self._inspect(path) for path in war_paths]
+            else:
+                pool = ThreadPool(min(self._workers, len(war_paths)))
+                try:
+                    results = pool.map(self._inspect, war_paths)
+                finally:
+                    pool.close()
+                    pool.join()
+
+        if any(changed for _, changed in results):
+            self._save()
+        return [info for info, _ in results]
+
+    def get_roles(self, war_path):
+        return self.inspect(war_path)['roles']
+
+    def _inspect(self, war_path):
+        path = os.path.abspath(war_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise LibertyArtifactException('Can not find {0}.'.format(war_path))
+        stamp = [stat.st_size, stat.st_mtime]
+
+        with self._lock:
+            known = self._paths.get(path)
+            if known is not None and known[:2] == stamp and known[2] in self._entries:
+                instrument.incr('cache_hits_total', cache='artifacts')
+                return self._entries[known[2]], False
+
+        with open(path, 'rb') as f:
+            digest = central_directory_digest(f)
+            with self._lock:
+                info = self._entries.get(digest)
+            if info is None:
+                instrument.incr('cache_misses_total', cache='artifacts')
+                info = _read_war(f, digest)
+            else:
+                instrument.incr('cache_hits_total', cache='artifacts')
+
+        with self._lock:
+            self._entries[digest] = info
+            self._paths[path] = stamp + [digest]
+        return info, True
+
+    def _load(self):
+        with self._lock:
+            if self._entries is not None:
+                return
+            self._entries = {}
+            self._paths = {}
+            try:
+                with open(self._cache_file, 'r') as f:
+                    cache = json.load(f)
+            except (IOError, ValueError):
+                return
+            if cache.get('version') == _CACHE_VERSION:
+                self._entries = cache['entries']
+                self._paths = cache['paths']
+
+    def _save(self):
+        with self._lock:
+            cache = {'version': _CACHE_VERSION, 'entries': self._entries, 'paths': self._paths}
+            tmp_file = '{0}.{1}.tmp'.format(self._cache_file, os.getpid())
+            try:
+                cache_dir = os.path.dirname(self._cache_file)
+                if not os.path.isdir(cache_dir):
+                    os.makedirs(cache_dir, 0o700)
+                with open(tmp_file, 'w') as f:
+                    json.dump(cache, f)
+                os.rename(tmp_file, self._cache_file)
+            except (IOError, OSError):
+                # The cache only saves time, an unwritable location is not an error.
+                pass
+
+
+def central_directory_digest(f):
+    """SHA-1 of the central directory of the zip file open in ``f``, found from its end record."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    tail_size = min(size, _EOCD_SIZE + _MAX_COMMENT + _ZIP64_LOCATOR_SIZE)
+    f.seek(size - tail_size)
+    tail = f.read(tail_size)
+    pos = tail.rfind(_EOCD)
+    if pos < 0 or pos + _EOCD_SIZE > len(tail):
+        raise LibertyArtifactException('Not a zip file.')
+
+    cd_size, cd_offset = struct.unpack('<II', tail[pos + 12:pos + 20])
+    if cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF:
+        locator = tail[pos - _ZIP64_LOCATOR_SIZE:pos]
+        if not locator.startswith(_ZIP64_LOCATOR):
+            raise LibertyArtifactException('Invalid zip64 end record.')
+        f.seek(struct.unpack('<Q', locator[8:16])[0])
+        record = f.read(56)
+        cd_size, cd_offset = struct.unpack('<QQ', record[40:56])
+
+    f.seek(cd_offset)
+    digest = hashlib.sha1()
+    remaining = cd_size
+    while remaining > 0:
+        chunk = f.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise LibertyArtifactException('Truncated zip central directory.')
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _read_war(f, digest):
+    try:
+        archive = zipfile.ZipFile(f)
+        try:
+            web_xml = archive.read(_WEB_XML)
+        except KeyError:
+            web_xml = None
+    except zipfile.BadZipfile as e:
+        raise LibertyArtifactException(str(e))
+
+    info = {'digest': digest, 'version': None, 'roles': []}
+    if web_xml is not None:
+        info.update(parse_web_xml(web_xml))
+    return info
+
+
+def parse_web_xml(content):
+    """Returns the ``version`` and the declared ``security-role`` names of a web.xml."""
+    result = {'version': None, 'roles': []}
+    path = []
+    text = []
+
+    def start(tag, attrs):
+        name = tag.rsplit(' ', 1)[-1]
+        if not path and name == 'web-app':
+            result['version'] = attrs.get('version')
+        path.append(name)
+        del text[:]
+
+    def end(tag):
+        if path[-2:] == ['security-role', 'role-name']:
+            role = ''.join(text).strip()
+            if role and role not in result['roles']:
+                result['roles'].append(role)
+        path.pop()
+
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text.append
+    try:
+        parser.Parse(content, True)
+    except expat.ExpatError as e:
+        raise LibertyArtifactException('Invalid web.xml: {0}'.format(e))
+    return result
+
+
+class LibertyArtifactException (Exception):
+    pass
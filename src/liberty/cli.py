@@ -0,0 +1,156 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+# Only light modules are imported up front: a call answered by a running
+# daemon never loads the toolkit itself.
+from __future__ import absolute_import
+
+import argparse
+import errno
+import json
+import os
+import socket
+import sys
+
+
+_NO_DAEMON = (errno.ENOENT, errno.ECONNREFUSED, errno.ENOTSOCK)
+
+
+def get_default_socket():
+    """$LIBERTY_TOOLKIT_SOCKET, else a socket in $XDG_RUNTIME_DIR, else one in a per-user directory of $TMPDIR.
+
+    The daemon creates the per-user directory with mode 0700, so other users
+    can not put a socket of their own in its place.
+    """
+    socket_path = os.environ.get('LIBERTY_TOOLKIT_SOCKET')
+    if socket_path:
+        return socket_path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'liberty-toolkit.sock')
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), 'liberty-toolkit-{0}'.format(os.getuid()), 'toolkit.sock')
+
+
+def request(socket_path, message, timeout=None):
+    """Sends one request to the daemon and returns its response, or None if no daemon is running.
+
+    Raises LibertyCliException if the socket belongs to another user.
+    """
+    try:
+        owner = os.lstat(socket_path).st_uid
+    except OSError:
+        return None
+    if owner != os.getuid():
+        raise LibertyCliException('{0} belongs to another user.'.format(socket_path))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except socket.error as e:
+            if e.errno in _NO_DAEMON:
+                return None
+            raise
+        sock.sendall(json.dumps(message) + '\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith('\n'):
+                break
+    finally:
+        sock.close()
+    return json.loads(''.join(chunks))
+
+
+def run(liberty_home, command, args, socket_path=None, local=False):
+    """Runs a command through the daemon when one is listening, in this process otherwise."""
+    message = {'home': os.path.abspath(liberty_home), 'command': command, 'args': list(args)}
+    if not local:
+        response = request(socket_path or get_default_socket(), message)
+        if response is not None:
+            return response
+
+    from liberty.daemon import Session, execute
+    return execute(Session(message['home']), command, message['args'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='liberty', description='Runs Liberty toolkit commands.')
+    parser.add_argument('--home', default=os.environ.get('LIBERTY_HOME'), help='the Liberty installation (default: $LIBERTY_HOME)')
+    parser.add_argument('--socket', default=None, help='the daemon socket (default: $LIBERTY_TOOLKIT_SOCKET, else in $XDG_RUNTIME_DIR or a per-user directory of $TMPDIR)')
+    parser.add_argument('--local', action='store_true', help='run in this process even if a daemon is running')
+    parser.add_argument('command', help='daemon, shutdown, agent, servers, ports, add-features, install-war, start, stop or status')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    socket_path = args.socket or get_default_socket()
+    if args.command in ('daemon', 'shutdown') and args.args:
+        parser.error('{0} takes no arguments, options go before the command'.format(args.command))
+
+    if args.command == 'daemon':
+        from liberty.daemon import ToolkitDaemon
+        try:
+            ToolkitDaemon(socket_path).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == 'shutdown':
+        try:
+            return 0 if request(socket_path, {'command': 'shutdown'}) is not None else 1
+        except LibertyCliException as e:
+            sys.stderr.write(str(e) + '\n')
+            return 1
+    if not args.home:
+        parser.error('no Liberty home, use --home or set LIBERTY_HOME')
+    if args.command == 'agent':
+        if len(args.args) != 1:
+            parser.error('agent takes one [host:]port argument')
+        from liberty.fleet import ToolkitAgent, LibertyFleetException, parse_address
+        try:
+            ToolkitAgent(args.home, parse_address(args.args[0]), os.environ.get('LIBERTY_AGENT_TOKEN')).serve_forever()
+        except LibertyFleetException as e:
+            sys.stderr.write('{0} Set LIBERTY_AGENT_TOKEN.\n'.format(e))
+            return 1
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        response = run(args.home, args.command, args.args, socket_path, args.local)
+    except LibertyCliException as e:
+        response = {'ok': False, 'error': str(e)}
+    if not response['ok']:
+        sys.stderr.write(response['error'] + '\n')
+        return 1
+    _print_result(response['result'])
+    return 0
+
+
+def _print_result(result):
+    if result is None:
+        return
+    if isinstance(result, list):
+        lines = [str(item) for item in result]
+    elif isinstance(result, dict):
+        lines = ['{0}={1}'.format(key, value) for key, value in sorted(result.items())]
+    else:
+        lines = [str(result)]
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+class LibertyCliException (Exception):
+    pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import json
+import os
+import socket
+import SocketServer
+import threading
+
+import instrument
+from liberty import Liberty, LibertyException
+from serveradmin import LibertyAdminTaskException
+from sharding import config_files
+
+
+class Session(object):
+    """The toolkit state of one Liberty home, kept warm between requests.
+
+    Parsed server models are reused for as long as the size and modification
+    time of their server.xml and its fragments stay the same.
+    """
+
+    def __init__(self, liberty_home):
+        self.liberty = Liberty(liberty_home)
+        self.lock = threading.Lock()
+        self._admin_tasks = {}
+
+    def get_admin_task(self, server_name):
+        server = self.liberty.get_server(server_name)
+        stamp = _stamp(server.get_server_xml())
+        cached = self._admin_tasks.get(server_name)
+        if cached is not None and cached[0] == stamp:
+            instrument.incr('cache_hits_total', cache='daemon')
+            return cached[1]
+
+        instrument.incr('cache_misses_total', cache='daemon')
+        admin_task = server.get_server_admin_task()
+        self._admin_tasks[server_name] = (stamp, admin_task)
+        return admin_task
+
+    def save(self, server_name, admin_task):
+        admin_task.save()
+        stamp = _stamp(self.liberty.get_server(server_name).get_server_xml())
+        self._admin_tasks[server_name] = (stamp, admin_task)
+
+    def forget(self, server_name):
+        self._admin_tasks.pop(server_name, None)
+
+
+def _servers(session):
+    return session.liberty.servers()
+
+
+def _ports(session, server_name):
+    return list(session.get_admin_task(server_name).get_ports())
+
+
+def _add_features(session, server_name, *features):
+    admin_task = session.get_admin_task(server_name)
+    admin_task.add_features(features)
+    session.save(server_name, admin_task)
+
+
+def _install_war(session, server_name, name, war_path, roles=None):
+    # The roles are a list, or a comma-separated string from the command line;
+    # without them the roles declared by the WAR are mapped.
+    if roles is None:
+        roles = 'auto'
+    elif not isinstance(roles, list):
+        roles = [role for role in roles.split(',') if role]
+    admin_task = session.get_admin_task(server_name)
+    admin_task.install_war(name, war_path, roles)
+    session.save(server_name, admin_task)
+
+
+def _start(session, server_name):
+    return session.liberty.start_server(server_name)
+
+
+def _stop(session, server_name):
+    return session.liberty.stop_server(server_name)
+
+
+def _status(session, server_name):
+    result = session.liberty.get_server(server_name).status()
+    return {'state': result.state, 'pid': result.pid, 'ports': result.ports}
+
+
+# name: (function, minimum and maximum number of arguments, or None for any, whether it uses the session models)
+COMMANDS = {
+    'servers': (_servers, 0, 0, True),
+    'ports': (_ports, 1, 1, True),
+    'add-features': (_add_features, 2, None, True),
+    'install-war': (_install_war, 3, 4, True),
+    # Starting and stopping take seconds and only run the server script, they do not hold up the other commands.
+    'start': (_start, 1, 1, False),
+    'stop': (_stop, 1, 1, False),
+    'status': (_status, 1, 1, False),
+}
+
+
+def execute(session, command, args):
+    """Runs a command and returns ``{'ok': True, 'result': ...}`` or ``{'ok': False, 'error': ...}``."""
+    entry = COMMANDS.get(command)
+    if entry is None:
+        return {'ok': False, 'error': "Unknown command '{0}'.".format(command)}
+    func, min_args, max_args, locked = entry
+    if len(args) < min_args or (max_args is not None and len(args) > max_args):
+        return {'ok': False, 'error': "Wrong number of arguments for '{0}'.".format(command)}
+
+    with instrument.span('daemon.execute', command=command):
+        if not locked:
+            try:
+                return {'ok': True, 'result': func(session, *args)}
+            except LibertyException as e:
+                return {'ok': False, 'error': str(e)}
+        with session.lock:
+            try:
+                return {'ok': True, 'result': func(session, *args)}
+            except (LibertyException, LibertyAdminTaskException) as e:
+                if args:
+                    session.forget(args[0])
+                return {'ok': False, 'error': str(e)}
+            except Exception:
+                if args:
+                    session.forget(args[0])
+                raise
+
+
+class ToolkitDaemon(object):
+    """Serves toolkit commands over a Unix domain socket.
+
+    Each request is one line of JSON, ``{"home": ..., "command": ..., "args": [...]}``,
+    answered by one line of JSON; a connection may carry several requests.
+    ``ping`` and ``shutdown`` are handled by the daemon itself.
+    """
+
+    def __init__(self, socket_path):
+        self._socket_path = socket_path
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def get_socket_path(self):
+        return self._socket_path
+
+    def bind(self):
+        directory = os.path.dirname(self._socket_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(self._socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self._socket_path)
+            except socket.error:
+                os.remove(self._socket_path)
+            else:
+                raise LibertyDaemonException('A daemon is already listening on {0}.'.format(self._socket_path))
+            finally:
+                probe.close()
+
+        old_umask = os.umask(0o077)
+        try:
+            self._server = _Server(self._socket_path, self._make_handler())
+        finally:
+            os.umask(old_umask)
+        return self
+
+    def _make_handler(self):
+        daemon = self
+
+        class Handler(SocketServer.StreamRequestHandler):
+
+            def handle(self):
+                # Requests may be pipelined, they are answered in the order they arrive.
+                for line in iter(self.rfile.readline, ''):
+                    response, stop = daemon._handle(line)
+                    self.wfile.write(json.dumps(response) + '\n')
+                    self.wfile.flush()
+                    if stop:
+                        threading.Thread(target=daemon.stop).start()
+                        return
+
+        return Handler
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close()
+
+    def start(self):
+        """Serves from a background thread."""
+        if self._server is None:
+            self.bind()
+        self._thread = threading.Thread(target=self.serve_forever, name='liberty-toolkit-daemon')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        server = self._server
+        if server is not None:
+            server.shutdown()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def get_session(self, liberty_home):
+        liberty_home = os.path.abspath(liberty_home)
+        with self._sessions_lock:
+            session = self._sessions.get(liberty_home)
+            if session is None:
+                session = self._sessions[liberty_home] = Session(liberty_home)
+            return session
+
+    def _handle(self, line):
+        try:
+            request = json.loads(line)
+            command = request['command']
+        except (ValueError, KeyError, TypeError):
+            return {'ok': False, 'error': 'Malformed request.'}, False
+
+        response, stop = self._dispatch(command, request)
+        if 'id' in request:
+            response['id'] = request['id']
+        return response, stop
+
+    def _dispatch(self, command, request):
+        if command == 'ping':
+            return {'ok': True, 'result': 'pong'}, False
+        if command == 'shutdown':
+            return {'ok': True, 'result': None}, True
+        if not request.get('home'):
+            return {'ok': False, 'error': 'No Liberty home given.'}, False
+
+        try:
+            return execute(self.get_session(request['home']), command, request.get('args') or []), False
+        except Exception as e:
+            return {'ok': False, 'error': '{0}: {1}'.format(e.__class__.__name__, e)}, False
+
+    def _close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.server_close()
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+
+
+class _Server(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+
+    daemon_threads = True
+
+
+def _stamp(server_xml):
+    stamp = []
+    for path in config_files(server_xml):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        stamp.append((path, stat.st_size, stat.st_mtime))
+    return tuple(stamp)
+
+
+class LibertyDaemonException (Exception):
+    pass
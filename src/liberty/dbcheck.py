@@ -0,0 +1,275 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import collections
+import errno
+import os
+import re
+import select
+import socket
+import threading
+import timeit
+from multiprocessing.pool import ThreadPool
+
+import instrument
+from sharding import load_server_xml
+from serverxml import Datasource, DatasourceProp, DB2JCCProp, OracleProp, GenericElement
+
+
+Endpoint = collections.namedtuple('Endpoint', 'host port')
+
+_DEFAULT_PORTS = {
+    DB2JCCProp: 50000,
+    OracleProp: 1521,
+}
+_CONNECTING = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+_VARIABLE = re.compile(r'\$\{([^}]+)\}')
+
+
+class ProbeResult(object):
+
+    def __init__(self, endpoint, reachable, latency=None, error=None):
+        self.endpoint = endpoint
+        self.reachable = reachable
+        self.latency = latency
+        self.error = error
+        self.cached = False
+        self.datasources = []
+
+    def __repr__(self):
+        return 'ProbeResult({0}:{1}, reachable={2}, latency={3}, error={4!r})'.format(
+            self.endpoint.host, self.endpoint.port, self.reachable, self.latency, self.error)
+
+
+class CheckReport(object):
+
+    def __init__(self, results, unresolved=()):
+        self.results = sorted(results, key=lambda result: result.endpoint)
+        # [(server, jndi, 'host:port')] of the datasources whose endpoint uses an undefined variable
+        self.unresolved = sorted(unresolved)
+
+    def unreachable(self):
+        return [result for result in self.results if not result.reachable]
+
+    def is_ok(self):
+        return not self.unreachable()
+
+    def format(self):
+        lines = []
+        for result in self.results:
+            if result.reachable:
+                state = '{0:.1f} ms'.format(result.latency * 1000)
+            else:
+                state = 'UNREACHABLE ({0})'.format(result.error)
+            datasources = ', '.join('{0}:{1}'.format(server, jndi) for server, jndi in result.datasources)
+            lines.append('{0}:{1}  {2}  [{3}]'.format(result.endpoint.host, result.endpoint.port, state, datasources))
+        for server, jndi, endpoint in self.unresolved:
+            lines.append('{0}  UNRESOLVED  [{1}:{2}]'.format(endpoint, server, jndi))
+        return '\n'.join(lines)
+
+
+class DatasourceChecker(object):
+    """Checks that the database endpoints of datasources accept TCP connections.
+
+    Connections are opened without blocking and multiplexed with ``select``,
+    with at most ``max_connections`` in flight and ``max_per_host`` per host.
+    Every endpoint is probed once however many datasources use it, and results
+    are reused for ``ttl`` seconds. Hosts and ports may use the variables
+    defined in the configuration; endpoints with an undefined variable are
+    reported as unresolved and not probed.
+    """
+
+    def __init__(self, timeout=3.0, max_connections=64, max_per_host=4, ttl=60.0):
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._max_per_host = max_per_host
+        self._ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def collect(self, server_models):
+        """Maps every endpoint of ``{server_name: ServerModel}`` to the ``(server, jndi)`` using it."""
+        return self._collect(server_models)[0]
+
+    def check(self, server_models):
+        endpoints, unresolved = self._collect(server_models)
+        results = self.probe(endpoints.keys())
+        report = []
+        for endpoint, datasources in endpoints.items():
+            result = results[endpoint]
+            result.datasources = datasources
+            report.append(result)
+        return CheckReport(report, unresolved)
+
+    def check_liberty(self, liberty, names=None, workers=8):
+        """Parses the given servers of a Liberty home in parallel and checks all their datasources."""
+        if names is None:
+            names = liberty.servers()
+        server_xmls = [liberty.get_server(name).get_server_xml() for name in names]
+        pool = ThreadPool(workers)
+        try:
+            models = pool.map(lambda server_xml: load_server_xml(server_xml)[0], server_xmls)
+        finally:
+            pool.close()
+            pool.join()
+        return self.check(dict(zip(names, models)))
+
+    def _collect(self, server_models):
+        endpoints = collections.OrderedDict()
+        unresolved = []
+        for server_name, model in sorted(server_models.items()):
+            variables = _variables(model)
+            for datasource in model.find_all(Datasource):
+                for prop in datasource.children():
+                    if not isinstance(prop, DatasourceProp) or not prop.server_name:
+                        continue
+                    port = prop.db_port or _DEFAULT_PORTS.get(prop.__class__)
+                    if port is None:
+                        continue
+                    host, port = _expand(prop.server_name, variables), _expand(str(port), variables)
+                    if host is None or port is None or not port.isdigit():
+                        unresolved.append((server_name, datasource.jndi, '{0}:{1}'.format(prop.server_name, prop.db_port)))
+                        continue
+                    endpoint = Endpoint(host, int(port))
+                    endpoints.setdefault(endpoint, []).append((server_name, datasource.jndi))
+        return endpoints, unresolved
+
+    def probe(self, endpoints):
+        results = {}
+        pending = []
+        now = timeit.default_timer()
+        with self._lock:
+            for endpoint in set(endpoints):
+                cached = self._cache.get(endpoint)
+                if cached is not None and now - cached[0] < self._ttl:
+                    result = _copy_result(cached[1])
+                    result.cached = True
+                    results[endpoint] = result
+                    instrument.incr('cache_hits_total', cache='dbcheck')
+                else:
+                    pending.append(endpoint)
+
+        with instrument.span('dbcheck.probe', endpoints=str(len(pending))):
+            fresh = self._probe_all(sorted(pending))
+        now = timeit.default_timer()
+        with self._lock:
+            for endpoint, result in fresh.items():
+                self._cache[endpoint] = (now, result)
+                results[endpoint] = _copy_result(result)
+        return results
+
+    def _probe_all(self, endpoints):
+        results = {}
+        addresses = self._resolve(set(endpoint.host for endpoint in endpoints))
+        queue = collections.deque()
+        for endpoint in endpoints:
+            address = addresses[endpoint.host]
+            if isinstance(address, Exception):
+                results[endpoint] = ProbeResult(endpoint, False, error=str(address))
+            else:
+                queue.append((endpoint, address))
+
+        in_flight = {}
+        per_host = collections.defaultdict(int)
+        while queue or in_flight:
+            deferred = collections.deque()
+            while queue and len(in_flight) < self._max_connections:
+                endpoint, address = queue.popleft()
+                if per_host[endpoint.host] >= self._max_per_host:
+                    deferred.append((endpoint, address))
+                    continue
+                sock, result = self._start_connect(endpoint, address)
+                if result is not None:
+                    results[endpoint] = result
+                else:
+                    in_flight[sock] = (endpoint, timeit.default_timer())
+                    per_host[endpoint.host] += 1
+            queue.extendleft(reversed(deferred))
+            if not in_flight:
+                continue
+
+            now = timeit.default_timer()
+            wait = max(0.0, min(started + self._timeout for _, started in in_flight.values()) - now)
+            _, writable, errored = select.select([], list(in_flight), list(in_flight), wait)
+            now = timeit.default_timer()
+            for sock in set(writable) | set(errored):
+                endpoint, started = in_flight.pop(sock)
+                per_host[endpoint.host] -= 1
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error == 0:
+                    results[endpoint] = ProbeResult(endpoint, True, latency=now - started)
+                else:
+                    results[endpoint] = ProbeResult(endpoint, False, error=os.strerror(error))
+                sock.close()
+            for sock, (endpoint, started) in list(in_flight.items()):
+                if now - started >= self._timeout:
+                    del in_flight[sock]
+                    per_host[endpoint.host] -= 1
+                    results[endpoint] = ProbeResult(endpoint, False, error='timed out')
+                    sock.close()
+        return results
+
+    def _start_connect(self, endpoint, address):
+        family, address = address
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        code = sock.connect_ex(address[:1] + (endpoint.port,) + address[2:])
+        if code == 0:
+            sock.close()
+            return None, ProbeResult(endpoint, True, latency=0.0)
+        if code not in _CONNECTING:
+            sock.close()
+            return None, ProbeResult(endpoint, False, error=os.strerror(code))
+        return sock, None
+
+    def _resolve(self, hosts):
+        def resolve(host):
+            try:
+                family, _, _, _, address = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)[0]
+                return host, (family, address)
+            except socket.error as e:
+                return host, e
+
+        hosts = sorted(hosts)
+        if not hosts:
+            return {}
+        pool = ThreadPool(min(len(hosts), self._max_connections))
+        try:
+            return dict(pool.map(resolve, hosts))
+        finally:
+            pool.close()
+            pool.join()
+
+
+def _variables(model):
+    variables = {}
+    for child in model.children():
+        if isinstance(child, GenericElement) and child.tag == 'variable' and child.get('name'):
+            value = child.get('value')
+            variables[child.get('name')] = value if value is not None else child.get('defaultValue')
+    return variables
+
+
+def _expand(value, variables, depth=8):
+    """Replaces the ``${name}`` in a value, or returns None if one is not defined."""
+    for _ in range(depth):
+        names = _VARIABLE.findall(value)
+        if not names:
+            return value
+        if any(variables.get(name) is None for name in names):
+            return None
+        value = _VARIABLE.sub(lambda match: variables[match.group(1)], value)
+    return None
+
+
+def _copy_result(result):
+    copy = ProbeResult(result.endpoint, result.reachable, result.latency, result.error)
+    copy.cached = result.cached
+    return copy
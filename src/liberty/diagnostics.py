@@ -0,0 +1,250 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import os
+import shutil
+import signal
+import tarfile
+import tempfile
+import time
+import timeit
+from multiprocessing.pool import ThreadPool
+
+import instrument
+import status
+
+
+DUMP = 'dump'
+JAVADUMP = 'javadump'
+THREADS = 'threads'
+KINDS = (DUMP, JAVADUMP, THREADS)
+
+# Files written to the server output directory by 'server javadump' and by the JVM on SIGQUIT.
+_JAVADUMP_PREFIXES = ('javacore', 'heapdump', 'core', 'Snap')
+_POLL_INTERVAL = 0.1
+# How long a JVM that prints its thread dump to the console is given to write a javacore file first.
+_JAVACORE_GRACE = 2.0
+
+
+class DiagnosticResult(object):
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.files = []
+        self.trigger_seconds = None
+        self.archive_seconds = None
+        self.error = None
+
+    def get_size(self):
+        return sum(size for _, size in self.files)
+
+    def __repr__(self):
+        return 'DiagnosticResult({0!r}, {1!r}, files={2}, error={3!r})'.format(self.name, self.kind, len(self.files), self.error)
+
+
+class DiagnosticsReport(object):
+
+    def __init__(self, archive, results, compressed_size):
+        self.archive = archive
+        self.results = results
+        self.compressed_size = compressed_size
+
+    def failed(self):
+        return [result for result in self.results if result.error is not None]
+
+    def format(self):
+        lines = []
+        for result in sorted(self.results, key=lambda result: (result.name, result.kind)):
+            if result.error is not None:
+                lines.append('{0} {1}: FAILED ({2})'.format(result.name, result.kind, result.error))
+            else:
+                lines.append('{0} {1}: {2} files, {3} bytes, triggered in {4:.1f} s, archived in {5:.1f} s'.format(
+                    result.name, result.kind, len(result.files), result.get_size(), result.trigger_seconds, result.archive_seconds))
+        lines.append('{0}: {1} bytes'.format(self.archive, self.compressed_size))
+        return '\n'.join(lines)
+
+
+class DiagnosticsCollector(object):
+    """Collects dumps from many servers at once into a single ``.tar.gz``.
+
+    Servers are dumped from a pool of ``workers`` threads, and the kinds of
+    one server one after another so that each only collects the files it
+    caused. Thread dumps are requested by sending SIGQUIT to the server JVM
+    rather than through the ``server`` script. As each server finishes, its
+    files are streamed straight from the server output directory through gzip
+    into the archive, without intermediate copies.
+    """
+
+    def __init__(self, liberty, workers=4, timeout=60.0):
+        self._liberty = liberty
+        self._workers = workers
+        self._timeout = timeout
+
+    def collect(self, archive, servers, kinds=(DUMP,), remove=False):
+        """Returns a DiagnosticsReport; ``remove`` deletes the dumps once archived.
+
+        Only the files written by the dumps are removed, never the logs of a server.
+        """
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise LibertyDiagnosticsException("Unknown diagnostic kinds '{0}'.".format("', '".join(sorted(unknown))))
+        jobs = [(server, kinds) for server in servers]
+
+        results = []
+        with instrument.span('diagnostics.collect', servers=str(len(servers))):
+            pool = ThreadPool(max(1, min(self._workers, len(jobs))))
+            tar = tarfile.open(archive, 'w:gz')
+            try:
+                for triggered in pool.imap_unordered(self._trigger_all, jobs):
+                    for result, paths, copies in triggered:
+                        start = timeit.default_timer()
+                        try:
+                            for path in paths:
+                                arcname = '{0}/{1}'.format(result.name, os.path.basename(path))
+                                tar.add(path, arcname)
+                                result.files.append((arcname, os.path.getsize(path)))
+                                if remove and path not in copies:
+                                    os.remove(path)
+                        finally:
+                            for path in copies:
+                                os.remove(path)
+                        result.archive_seconds = timeit.default_timer() - start
+                        results.append(result)
+            finally:
+                tar.close()
+                pool.close()
+                pool.join()
+
+        for result in results:
+            instrument.incr('diagnostic_bytes_total', result.get_size(), kind=result.kind)
+        return DiagnosticsReport(archive, results, os.path.getsize(archive))
+
+    def _trigger_all(self, job):
+        server, kinds = job
+        return [self._trigger(server, kind) for kind in kinds]
+
+    def _trigger(self, server, kind):
+        """Returns the result, the paths to archive and those of them that are temporary copies."""
+        result = DiagnosticResult(server.get_name(), kind)
+        start = timeit.default_timer()
+        copies = []
+        try:
+            if kind == DUMP:
+                paths = self._dump(server)
+            elif kind == JAVADUMP:
+                paths = self._javadump(server)
+            else:
+                paths, copies = self._thread_dump(server)
+        except (LibertyDiagnosticsException, OSError, IOError) as e:
+            result.error = str(e)
+            paths = []
+        result.trigger_seconds = timeit.default_timer() - start
+        return result, paths, copies
+
+    def _dump(self, server):
+        output_dir = server.get_output_dir()
+        archive = os.path.join(output_dir, '{0}.dump-{1}.zip'.format(server.get_name(), time.strftime('%y.%m.%d_%H.%M.%S')))
+        self._execute(['dump', server.get_name(), '--archive=' + archive])
+        if not os.path.exists(archive):
+            raise LibertyDiagnosticsException('server dump did not create {0}'.format(archive))
+        return [archive]
+
+    def _javadump(self, server):
+        before = _javadump_files(server.get_output_dir())
+        self._execute(['javadump', server.get_name()])
+        return _new_files(server.get_output_dir(), before)
+
+    def _thread_dump(self, server):
+        pid = status.read_pid(server.get_pid_file())
+        if pid is None or not status.ProcInspector().is_alive(pid):
+            raise LibertyDiagnosticsException('the server is not running')
+
+        output_dir = server.get_output_dir()
+        before = _javadump_files(output_dir)
+        console_log = os.path.join(output_dir, 'logs', 'console.log')
+        offset = _get_size(console_log)
+        os.kill(pid, signal.SIGQUIT)
+        start = timeit.default_timer()
+        deadline = start + self._timeout
+        console_size = offset
+        while timeit.default_timer() < deadline:
+            paths = _new_files(output_dir, before)
+            if paths:
+                if _is_complete(paths):
+                    return paths, []
+            else:
+                # HotSpot JVMs print the thread dump to the console rather than to a javacore
+                # file, so a console that grew and then stopped growing holds the dump.
+                size = _get_size(console_log)
+                if timeit.default_timer() - start >= _JAVACORE_GRACE and size != offset and size == console_size:
+                    break
+                console_size = size
+            time.sleep(_POLL_INTERVAL)
+
+        copy = _copy_tail(console_log, offset, '{0}.threads.'.format(server.get_name()))
+        if copy is not None:
+            return [copy], [copy]
+        raise LibertyDiagnosticsException('no thread dump was written within {0} s'.format(self._timeout))
+
+    def _execute(self, cmd):
+        exit_code = self._liberty._execute_cmd(cmd)
+        if exit_code:
+            raise LibertyDiagnosticsException("'server {0}' exited with {1}".format(cmd[0], exit_code))
+
+
+def _javadump_files(output_dir):
+    files = {}
+    if os.path.isdir(output_dir):
+        for name in os.listdir(output_dir):
+            if name.startswith(_JAVADUMP_PREFIXES):
+                path = os.path.join(output_dir, name)
+                files[path] = os.path.getmtime(path)
+    return files
+
+
+def _new_files(output_dir, before):
+    return sorted(path for path, mtime in _javadump_files(output_dir).items() if before.get(path) != mtime)
+
+
+def _get_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _copy_tail(path, offset, prefix):
+    """Copies what was appended to a file since it had ``offset`` bytes to a temporary file, if anything."""
+    size = _get_size(path)
+    if size is None:
+        return None
+    if offset is None or size < offset:
+        # Created or rolled over since.
+        offset = 0
+    if size == offset:
+        return None
+    fd, copy = tempfile.mkstemp(prefix=prefix, suffix='.log')
+    with os.fdopen(fd, 'wb') as out:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            shutil.copyfileobj(f, out)
+    return copy
+
+
+def _is_complete(paths):
+    # A dump still being written grows between two polls.
+    sizes = [os.path.getsize(path) for path in paths]
+    time.sleep(_POLL_INTERVAL)
+    return sizes == [os.path.getsize(path) for path in paths]
+
+
+class LibertyDiagnosticsException (Exception):
+    pass
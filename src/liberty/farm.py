@@ -0,0 +1,178 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import itertools
+import os
+from multiprocessing.pool import ThreadPool
+
+import instrument
+from serverxml import XmlOutputter, FragmentCache, FeatureManager, HttpEndpoint, Datasource, DatasourceProp, Application
+
+
+class ServerSpec(object):
+    """The parameters of one generated server; ``None`` keeps the template's value.
+
+    ``datasource_hosts`` maps the JNDI name of a template datasource to
+    ``'host'`` or ``'host:port'``. ``applications`` are names of wars to add,
+    located like ``AdminTask.install_war`` puts them.
+    """
+
+    def __init__(self, name, http_port=None, https_port=None, datasource_hosts=None, applications=None, features=None):
+        self.name = name
+        self.http_port = http_port
+        self.https_port = https_port
+        self.datasource_hosts = datasource_hosts or {}
+        self.applications = applications or []
+        self.features = features or []
+
+
+def matrix(name_format, http_port=None, https_port=None, **axes):
+    """Returns a ServerSpec for every combination of the values of ``axes``.
+
+    ``name_format`` is formatted with ``index`` and the values of the
+    combination. Servers get consecutive ports starting at ``http_port`` and
+    ``https_port``.
+    """
+    keys = sorted(axes)
+    specs = []
+    for index, values in enumerate(itertools.product(*[axes[key] for key in keys])):
+        params = dict(zip(keys, values))
+        spec = ServerSpec(name_format.format(index=index, **params), **params)
+        if http_port is not None:
+            spec.http_port = http_port + index
+        if https_port is not None:
+            spec.https_port = https_port + index
+        specs.append(spec)
+    return specs
+
+
+class ServerFarm(object):
+    """Generates many servers from one template model.
+
+    Generated models share every element they do not change with the
+    template: only the root and the path down to each changed element are
+    copied. Shared subtrees are serialized once and their text reused for
+    every server. The template must not be modified while the farm is used.
+    """
+
+    def __init__(self, template):
+        self._template = template
+        self._cache = FragmentCache()
+        self._cache.share(template)
+
+    def create(self, spec):
+        model = _copy(self._template)
+
+        if spec.http_port is not None or spec.https_port is not None:
+            endpoint = _own_child(model, HttpEndpoint)
+            if endpoint is None:
+                endpoint = HttpEndpoint()
+                endpoint.id = 'defaultHttpEndpoint'
+                endpoint.host = '*'
+                model.add(endpoint)
+            if spec.http_port is not None:
+                endpoint.http_port = spec.http_port
+            if spec.https_port is not None:
+                endpoint.https_port = spec.https_port
+
+        if spec.features:
+            feature_manager = _own_child(model, FeatureManager)
+            if feature_manager is None:
+                feature_manager = FeatureManager()
+                model.add(feature_manager)
+            feature_manager.add_features(spec.features)
+
+        for jndi, address in sorted(spec.datasource_hosts.items()):
+            self._set_datasource_host(model, jndi, address)
+
+        for name in spec.applications:
+            app = Application()
+            app.id = name
+            app.name = name
+            app.type = 'war'
+            app.location = '${server.config.dir}/apps/' + name + '.war'
+            model.add(app)
+
+        return model
+
+    def render(self, spec):
+        return XmlOutputter(self._cache).output(self.create(spec))
+
+    def write(self, specs, servers_dir, workers=8):
+        """Writes ``<servers_dir>/<name>/server.xml`` for every spec in parallel.
+
+        Files whose content would not change are left untouched. Returns
+        ``{server_name: path}``.
+        """
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise LibertyFarmException('Server names must be unique.')
+
+        def write_one(spec):
+            content = self.render(spec)
+            server_dir = os.path.join(servers_dir, spec.name)
+            if not os.path.isdir(server_dir):
+                os.makedirs(server_dir)
+            path = os.path.join(server_dir, 'server.xml')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    if f.read() == content:
+                        return path
+            with open(path, 'wb') as f:
+                f.write(content)
+            return path
+
+        with instrument.span('farm.write', servers=str(len(specs))):
+            pool = ThreadPool(max(1, min(workers, len(specs))))
+            try:
+                paths = pool.map(write_one, specs)
+            finally:
+                pool.close()
+                pool.join()
+        return dict(zip(names, paths))
+
+    def _set_datasource_host(self, model, jndi, address):
+        host, _, port = address.partition(':')
+        for datasource in model.find_all(Datasource):
+            if datasource.jndi == jndi:
+                break
+        else:
+            raise LibertyFarmException("The template has no datasource '{0}'.".format(jndi))
+
+        datasource = _own(model, datasource)
+        for prop in list(datasource.children()):
+            if isinstance(prop, DatasourceProp):
+                prop = _own(datasource, prop)
+                prop.server_name = host
+                if port:
+                    prop.db_port = port
+
+
+def _copy(model):
+    # Unlike ElementModel.fork, the unchanged children stay the very same
+    # objects, which is what lets the fragment cache recognize them.
+    return model.clone()
+
+
+def _own(parent, child):
+    """Replaces ``child`` of an already copied ``parent`` by a copy of its own."""
+    clone = _copy(child)
+    parent.replace(child, [clone])
+    return clone
+
+
+def _own_child(parent, model_clazz):
+    child = parent.find(model_clazz)
+    if child is not None:
+        return _own(parent, child)
+
+
+class LibertyFarmException (Exception):
+    pass
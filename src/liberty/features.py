@@ -0,0 +1,337 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import hashlib
+import json
+import os
+import re
+from multiprocessing.pool import ThreadPool
+
+import instrument
+
+
+_CACHE_VERSION = 2
+_FEATURE_TYPE = 'osgi.subsystem.feature'
+_VERSIONED_NAME = re.compile(r'^(.*)-(\d+(?:\.\d+)*)$')
+
+
+class FeatureCatalog(object):
+    """Index of the features installed in a Liberty home, read from their manifests.
+
+    The manifests under ``lib/features`` and ``usr/extension/lib/features`` are
+    parsed in one parallel scan, and the result is cached in a JSON file that is
+    invalidated when the modification time of one of those directories changes.
+    """
+
+    def __init__(self, liberty_home, cache_file=None, workers=8):
+        self._liberty_home = liberty_home
+        self._workers = workers
+        if cache_file is None:
+            digest = hashlib.sha1(os.path.abspath(liberty_home)).hexdigest()[:12]
+            cache_file = os.path.join(os.path.expanduser('~'), '.liberty-toolkit', 'features-{0}.json'.format(digest))
+        self._cache_file = cache_file
+        self._features = None
+        self._short_names = None
+        self._dir_mtimes = None
+
+    def get_feature_dirs(self):
+        return [os.path.join(self._liberty_home, 'lib', 'features'),
+                os.path.join(self._liberty_home, 'usr', 'extension', 'lib', 'features')]
+
+    def features(self):
+        """Returns the short names of the public features, as used in ``featureManager``."""
+        self._load()
+        return sorted(feature['short_name'] for feature in self._features.values()
+                      if feature['short_name'] and feature['visibility'] == 'public')
+
+    def is_known(self, name):
+        self._load()
+        return self._lookup(name) is not None
+
+    def get_feature(self, name):
+        self._load()
+        symbolic_name = self._lookup(name)
+        if symbolic_name is not None:
+            return dict(self._features[symbolic_name], symbolic_name=symbolic_name)
+
+    def resolve(self, features):
+        """Returns the symbolic names of ``features`` and of everything they pull in.
+
+        A feature required with ``ibm.tolerates`` versions is satisfied by any
+        of them that the rest of the closure requires, so ``jsp-2.2``, which
+        requires ``servlet-3.0`` but tolerates 3.1, goes with ``servlet-3.1``
+        wherever in the closure ``servlet-3.1`` comes from. Raises
+        LibertyFeatureException for unknown names, or when two versions of the
+        same singleton feature end up in the closure, e.g. ``servlet-3.0`` and
+        ``servlet-3.1``.
+        """
+        self._load()
+        unknown = [name for name in features if self._lookup(name) is None]
+        if unknown:
+            raise LibertyFeatureException('Unknown features: {0}.'.format(', '.join(unknown)))
+
+        roots = [self._lookup(name) for name in features]
+        # The version of each singleton feature chosen so far, by the name without version.
+        chosen = {}
+        for symbolic_name in roots:
+            if self._features[symbolic_name]['singleton']:
+                chosen.setdefault(_base_name(symbolic_name), symbolic_name)
+
+        # The first requirement met decides a version, so a tolerated one can be
+        # passed over before the closure reaches the feature that needs it. Each
+        # retry pins a version that every requirement on a conflicting feature
+        # accepts, until no conflict has one.
+        for _ in range(len(self._features) + 1):
+            resolved, wanted = self._closure(roots, chosen)
+            retry = False
+            for base_name, accepted in sorted(wanted.items()):
+                if len([name for name in resolved if _base_name(name) == base_name]) < 2:
+                    continue
+                common = [name for name in accepted[0]
+                          if name in self._features and all(name in candidates for candidates in accepted)]
+                # Prefer a version the closure already requires outright.
+                common.sort(key=lambda name: name not in resolved)
+                if common and chosen.get(base_name) != common[0]:
+                    chosen[base_name] = common[0]
+                    retry = True
+            if not retry:
+                break
+
+        conflicts = self._conflicts(resolved)
+        if conflicts:
+            raise LibertyFeatureException('Conflicting feature versions: {0}.'.format(
+                '; '.join(', '.join(names) for names in conflicts)))
+        return sorted(resolved)
+
+    def refresh(self):
+        self._features = None
+        self._load(use_cache=False)
+
+    def _lookup(self, name):
+        if name in self._features:
+            return name
+        return self._short_names.get(name.lower())
+
+    def _closure(self, roots, chosen):
+        """Returns the features ``roots`` pull in given the ``chosen`` versions, and
+        the versions each requirement on a singleton feature accepts, by base name."""
+        resolved = set()
+        wanted = {}
+        for symbolic_name in roots:
+            if self._features[symbolic_name]['singleton']:
+                wanted.setdefault(_base_name(symbolic_name), []).append([symbolic_name])
+        pending = list(roots)
+        while pending:
+            symbolic_name = pending.pop()
+            if symbolic_name in resolved:
+                continue
+            resolved.add(symbolic_name)
+            feature = self._features[symbolic_name]
+            for required in feature['requires']:
+                candidates = _candidates(required, feature['tolerates'].get(required, []))
+                required = self._choose(candidates, chosen)
+                if required in self._features and self._features[required]['singleton']:
+                    wanted.setdefault(_base_name(required), []).append(candidates)
+                if required in self._features and required not in resolved:
+                    pending.append(required)
+        return resolved, wanted
+
+    def _choose(self, candidates, chosen):
+        required = candidates[0]
+        base_name = _base_name(required)
+        if chosen.get(base_name) in candidates:
+            return chosen[base_name]
+        if required in self._features and self._features[required]['singleton']:
+            chosen.setdefault(base_name, required)
+        return required
+
+    def _conflicts(self, symbolic_names):
+        versions = {}
+        for symbolic_name in symbolic_names:
+            feature = self._features[symbolic_name]
+            if feature['singleton'] and _VERSIONED_NAME.match(symbolic_name):
+                versions.setdefault(_base_name(symbolic_name), set()).add(feature['short_name'] or symbolic_name)
+
+        return [sorted(names) for _, names in sorted(versions.items()) if len(names) > 1]
+
+    def _load(self, use_cache=True):
+        dir_mtimes = self._get_dir_mtimes()
+        if self._features is not None and dir_mtimes == self._dir_mtimes:
+            return
+
+        features = self._read_cache(dir_mtimes) if use_cache else None
+        if features is None:
+            instrument.incr('cache_misses_total', cache='features')
+            features = self._scan()
+            self._write_cache(dir_mtimes, features)
+        else:
+            instrument.incr('cache_hits_total', cache='features')
+
+        self._features = features
+        self._dir_mtimes = dir_mtimes
+        self._short_names = {}
+        for symbolic_name, feature in features.items():
+            if feature['short_name']:
+                self._short_names[feature['short_name'].lower()] = symbolic_name
+
+    def _get_dir_mtimes(self):
+        result = {}
+        for feature_dir in self.get_feature_dirs():
+            if os.path.isdir(feature_dir):
+                result[feature_dir] = os.path.getmtime(feature_dir)
+        return result
+
+    def _scan(self):
+        manifests = []
+        for feature_dir in self.get_feature_dirs():
+            if os.path.isdir(feature_dir):
+                manifests.extend(os.path.join(feature_dir, name) for name in os.listdir(feature_dir)
+                                 if name.endswith('.mf'))
+
+        with instrument.span('features.scan', manifests=str(len(manifests))):
+            pool = ThreadPool(self._workers)
+            try:
+                parsed = pool.map(parse_manifest, manifests)
+            finally:
+                pool.close()
+                pool.join()
+
+        features = {}
+        for feature in parsed:
+            if feature is not None:
+                symbolic_name = feature.pop('symbolic_name')
+                features[symbolic_name] = feature
+        return features
+
+    def _read_cache(self, dir_mtimes):
+        try:
+            with open(self._cache_file, 'r') as f:
+                cache = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        if cache.get('version') != _CACHE_VERSION or cache.get('liberty_home') != self._liberty_home:
+            return None
+        if cache.get('dirs') != dir_mtimes:
+            return None
+        return cache['features']
+
+    def _write_cache(self, dir_mtimes, features):
+        cache = {
+            'version': _CACHE_VERSION,
+            'liberty_home': self._liberty_home,
+            'dirs': dir_mtimes,
+            'features': features,
+        }
+        tmp_file = '{0}.{1}.tmp'.format(self._cache_file, os.getpid())
+        try:
+            cache_dir = os.path.dirname(self._cache_file)
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, 0o700)
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmp_file, self._cache_file)
+        except (IOError, OSError):
+            # The cache only saves time, an unwritable location is not an error.
+            pass
+
+
+def parse_manifest(manifest_file):
+    """Returns the symbolic name, short name, visibility, singleton flag and required features of a feature manifest.
+
+    ``tolerates`` maps a required feature to the other versions of it that
+    satisfy the requirement as well.
+    """
+    headers = _read_headers(manifest_file)
+    symbolic_header = headers.get('Subsystem-SymbolicName')
+    if not symbolic_header:
+        return None
+
+    clauses = _split_clauses(symbolic_header)
+    symbolic_name, params = clauses[0]
+    requires = []
+    tolerates = {}
+    for name, content_params in _split_clauses(headers.get('Subsystem-Content', '')):
+        if content_params.get('type') == _FEATURE_TYPE:
+            requires.append(name)
+            versions = [version.strip() for version in content_params.get('ibm.tolerates', '').split(',') if version.strip()]
+            if versions:
+                tolerates[name] = versions
+
+    return {
+        'symbolic_name': symbolic_name,
+        'short_name': headers.get('IBM-ShortName'),
+        'visibility': params.get('visibility', 'private'),
+        'singleton': params.get('singleton') == 'true',
+        'requires': requires,
+        'tolerates': tolerates,
+    }
+
+
+def _candidates(required, tolerated):
+    base_name = _base_name(required)
+    return [required] + ['{0}-{1}'.format(base_name, version) for version in tolerated]
+
+
+def _base_name(symbolic_name):
+    match = _VERSIONED_NAME.match(symbolic_name)
+    return match.group(1) if match else symbolic_name
+
+
+def _read_headers(manifest_file):
+    headers = {}
+    key = None
+    with open(manifest_file, 'r') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line.startswith(' ') and key is not None:
+                headers[key] += line[1:]
+            elif ':' in line:
+                key, value = line.split(':', 1)
+                key = key.strip()
+                headers[key] = value.strip()
+    return headers
+
+
+def _split_clauses(header):
+    """Splits an OSGi header into ``(name, {param: value})`` clauses."""
+    clauses = []
+    for clause in _split_outside_quotes(header, ','):
+        parts = _split_outside_quotes(clause, ';')
+        name = parts[0].strip()
+        if not name:
+            continue
+        params = {}
+        for part in parts[1:]:
+            match = re.match(r'\s*([\w.\-]+)\s*:?=\s*"?([^"]*)"?\s*$', part)
+            if match:
+                params[match.group(1)] = match.group(2)
+        clauses.append((name, params))
+    return clauses
+
+
+def _split_outside_quotes(text, separator):
+    parts = []
+    current = []
+    quoted = False
+    for c in text:
+        if c == '"':
+            quoted = not quoted
+        if c == separator and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(c)
+    parts.append(''.join(current))
+    return parts
+
+
+class LibertyFeatureException (Exception):
+    pass
@@ -0,0 +1,264 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import hmac
+import json
+import os
+import select
+import socket
+import SocketServer
+import threading
+from multiprocessing.pool import ThreadPool
+
+import instrument
+from daemon import ToolkitDaemon
+
+
+DEFAULT_PORT = 9797
+# Requests sent before reading the answers, so neither side blocks on a full socket buffer.
+_PIPELINE_WINDOW = 64
+
+
+def parse_address(address, default_host='127.0.0.1'):
+    """Turns ``'host:port'``, ``'port'`` or a ``(host, port)`` tuple into a ``(host, port)`` tuple."""
+    if isinstance(address, tuple):
+        return address[0], int(address[1])
+    host, _, port = str(address).rpartition(':')
+    return host or default_host, int(port)
+
+
+class ToolkitAgent(ToolkitDaemon):
+    """Serves the toolkit commands of one Liberty home over TCP, for a FleetController.
+
+    The protocol is the one of the local daemon, except that every request
+    runs against the Liberty home of the agent. Requests that do not carry
+    the ``token`` of the agent are refused; an agent without a token is not
+    started, since anyone who can reach its port could install applications
+    and start or stop servers.
+    """
+
+    def __init__(self, liberty_home, address=('127.0.0.1', DEFAULT_PORT), token=None):
+        if not token:
+            raise LibertyFleetException('An agent needs a token.')
+        ToolkitDaemon.__init__(self, None)
+        self._liberty_home = os.path.abspath(liberty_home)
+        self._address = parse_address(address)
+        self._token = token
+
+    def get_address(self):
+        if self._server is not None:
+            return self._server.server_address
+        return self._address
+
+    def bind(self):
+        self._server = _TcpServer(self._address, self._make_handler())
+        return self
+
+    def _make_handler(self):
+        handler = ToolkitDaemon._make_handler(self)
+        handler.disable_nagle_algorithm = True
+        return handler
+
+    def _dispatch(self, command, request):
+        if not hmac.compare_digest(str(request.get('token') or ''), self._token):
+            return {'ok': False, 'error': 'Not authorized.'}, False
+        request = dict(request, home=self._liberty_home)
+        return ToolkitDaemon._dispatch(self, command, request)
+
+    def _close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.server_close()
+
+
+class FleetController(object):
+    """Runs toolkit commands on many ToolkitAgents at once.
+
+    Commands go to all agents concurrently and results are yielded as each
+    agent answers. Connections are kept open and reused between calls, up to
+    ``pool_size`` per agent, and the commands of a batch are pipelined on a
+    single connection. An agent that can not be reached answers with an
+    error response rather than failing the whole call.
+    """
+
+    def __init__(self, agents, token=None, pool_size=2, timeout=30.0, workers=None):
+        self._agents = [parse_address(agent) for agent in agents]
+        self._token = token
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._pools = dict((agent, _ConnectionPool(agent, pool_size, timeout)) for agent in self._agents)
+        self._workers = workers or max(1, len(self._agents))
+        self._thread_pool = None
+
+    def get_agents(self):
+        return list(self._agents)
+
+    def run(self, command, args=(), agents=None):
+        """Yields ``(agent, response)`` for each agent, in the order they answer."""
+        for agent, responses in self.batch([(command, args)], agents):
+            yield agent, responses[0]
+
+    def batch(self, commands, agents=None):
+        """Yields ``(agent, responses)`` for each agent, in the order they answer.
+
+        ``commands`` is a list of ``(command, args)``; the responses of an
+        agent are in the same order.
+        """
+        agents = self._agents if agents is None else [parse_address(agent) for agent in agents]
+        jobs = [(agent, commands) for agent in agents]
+        with instrument.span('fleet.batch', agents=str(len(agents)), commands=str(len(commands))):
+            for result in self._get_thread_pool().imap_unordered(self._call, jobs):
+                yield result
+
+    def call(self, agent, command, *args):
+        """Runs one command on one agent and returns its response."""
+        return self._call((parse_address(agent), [(command, args)]))[1][0]
+
+    def close(self):
+        if self._thread_pool is not None:
+            self._thread_pool.close()
+            self._thread_pool.join()
+            self._thread_pool = None
+        for pool in self._pools.values():
+            pool.close()
+
+    def _get_thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPool(self._workers)
+        return self._thread_pool
+
+    def _call(self, job):
+        agent, commands = job
+        messages = []
+        for i, (command, args) in enumerate(commands):
+            message = {'id': i, 'command': command, 'args': list(args)}
+            if self._token is not None:
+                message['token'] = self._token
+            messages.append(message)
+
+        pool = self._pools.get(agent)
+        if pool is None:
+            pool = self._pools.setdefault(agent, _ConnectionPool(agent, self._pool_size, self._timeout))
+        try:
+            return agent, pool.call(messages)
+        except (socket.error, ValueError, LibertyFleetException) as e:
+            error = '{0}:{1}: {2}'.format(agent[0], agent[1], e)
+            return agent, [{'ok': False, 'error': error, 'id': message['id']} for message in messages]
+
+
+class _ConnectionPool(object):
+
+    def __init__(self, address, size, timeout):
+        self._address = address
+        self._timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(size)
+
+    def call(self, messages):
+        with self._slots:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is not None and connection.is_closed():
+                connection.close()
+                connection = None
+            try:
+                if connection is not None:
+                    try:
+                        responses = connection.call(messages)
+                    except _Disconnected as e:
+                        # Commands are not idempotent: they are only sent again when they could
+                        # not be sent, never once the agent may have read them.
+                        if not e.retriable:
+                            raise
+                        connection.close()
+                        connection = None
+                if connection is None:
+                    connection = _Connection(self._address, self._timeout)
+                    responses = connection.call(messages)
+            except _Disconnected as e:
+                connection.close()
+                raise LibertyFleetException('Connection lost after {0} of {1} responses.'.format(e.received, len(messages)))
+            except Exception:
+                if connection is not None:
+                    connection.close()
+                raise
+
+            with self._lock:
+                self._idle.append(connection)
+            return responses
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class _Connection(object):
+
+    def __init__(self, address, timeout):
+        self._sock = socket.create_connection(address, timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+
+    def is_closed(self):
+        """Whether the agent closed the connection while it was idle."""
+        # An idle connection has nothing to read, unless it is the end of the stream.
+        return bool(select.select([self._sock], [], [], 0)[0])
+
+    def call(self, messages):
+        responses = []
+        for start in range(0, len(messages), _PIPELINE_WINDOW):
+            window = messages[start:start + _PIPELINE_WINDOW]
+            try:
+                self._sock.sendall(''.join(json.dumps(message) + '\n' for message in window))
+            except socket.timeout:
+                raise LibertyFleetException('Timed out sending request {0}.'.format(window[0]['id']))
+            except socket.error:
+                raise _Disconnected(len(responses), retriable=not responses)
+            for message in window:
+                try:
+                    line = self._reader.readline()
+                except socket.timeout:
+                    # The agent may still run the command, so it must not be sent again.
+                    raise LibertyFleetException('Timed out waiting for response {0}.'.format(message['id']))
+                except socket.error:
+                    raise _Disconnected(len(responses))
+                if not line:
+                    raise _Disconnected(len(responses))
+                response = json.loads(line)
+                if response.get('id') != message['id']:
+                    raise LibertyFleetException('Response {0} does not match request {1}.'.format(response.get('id'), message['id']))
+                responses.append(response)
+        return responses
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+class _Disconnected(Exception):
+
+    def __init__(self, received, retriable=False):
+        Exception.__init__(self, 'disconnected')
+        self.received = received
+        # Whether the requests could not be sent, before any response was read.
+        self.retriable = retriable
+
+
+class _TcpServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class LibertyFleetException (Exception):
+    pass
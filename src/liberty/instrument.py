@@ -0,0 +1,300 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import contextlib
+import os
+import threading
+import timeit
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+# Replaced, never mutated in place, so that emitters can iterate without locking.
+_hooks = ()
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook):
+    global _hooks
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook):
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+def is_enabled():
+    return len(_hooks) > 0
+
+
+def span(name, **tags):
+    if not _hooks:
+        return _NULL_SPAN
+    return Span(name, tags, _hooks)
+
+
+def incr(name, value=1, **labels):
+    hooks = _hooks
+    for hook in hooks:
+        hook.on_counter(name, value, labels)
+
+
+def observe(name, value, **labels):
+    hooks = _hooks
+    for hook in hooks:
+        hook.on_observe(name, value, labels)
+
+
+@contextlib.contextmanager
+def profile():
+    collector = Profile()
+    add_hook(collector)
+    try:
+        yield collector
+    finally:
+        remove_hook(collector)
+
+
+class Hook(object):
+
+    def on_start(self, span):
+        pass
+
+    def on_stop(self, span):
+        pass
+
+    def on_counter(self, name, value, labels):
+        pass
+
+    def on_observe(self, name, value, labels):
+        pass
+
+
+class Span(object):
+
+    def __init__(self, name, tags, hooks):
+        self.name = name
+        self.tags = tags
+        self.start = None
+        self.duration = None
+        self.error = None
+        self._hooks = hooks
+
+    def set_tag(self, key, value):
+        self.tags[key] = value
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        for hook in self._hooks:
+            hook.on_start(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = timeit.default_timer() - self.start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        for hook in self._hooks:
+            hook.on_stop(self)
+        return False
+
+
+class _NullSpan(object):
+
+    def set_tag(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MetricsCollector(Hook):
+    """Aggregates counters, histograms and span durations in memory.
+
+    Span durations are kept in the ``operation_seconds`` histogram, labelled
+    with the span name and its string tags.
+    """
+
+    SPAN_METRIC = 'operation_seconds'
+    ERROR_METRIC = 'operation_errors_total'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def on_stop(self, span):
+        labels = {'operation': span.name}
+        for key, value in span.tags.items():
+            if isinstance(value, basestring):
+                labels[key] = value
+        self.on_observe(MetricsCollector.SPAN_METRIC, span.duration, labels)
+        if span.error:
+            labels['error'] = span.error
+            self.on_counter(MetricsCollector.ERROR_METRIC, 1, labels)
+
+    def on_counter(self, name, value, labels):
+        key = (name, _freeze(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def on_observe(self, name, value, labels):
+        key = (name, _freeze(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self._buckets)
+            histogram.observe(value)
+
+    def counters(self):
+        with self._lock:
+            return dict((key, value) for key, value in self._counters.items())
+
+    def histograms(self):
+        with self._lock:
+            return dict((key, histogram.copy()) for key, histogram in self._histograms.items())
+
+    def get_counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _freeze(labels)), 0)
+
+    def get_histogram(self, name, **labels):
+        with self._lock:
+            histogram = self._histograms.get((name, _freeze(labels)))
+            if histogram is not None:
+                return histogram.copy()
+
+
+class Profile(MetricsCollector):
+    """Collector that also keeps every finished span, in completion order."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        MetricsCollector.__init__(self, buckets)
+        self.spans = []
+
+    def on_stop(self, span):
+        MetricsCollector.on_stop(self, span)
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Returns ``(operation, calls, total_seconds)`` tuples, slowest first."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                calls, total = totals.get(span.name, (0, 0.0))
+                totals[span.name] = (calls + 1, total + span.duration)
+
+        return sorted([(name, calls, total) for name, (calls, total) in totals.items()],
+                      key=lambda d: d[2], reverse=True)
+
+
+class _Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        other = _Histogram(self.buckets)
+        other.counts = list(self.counts)
+        other.sum = self.sum
+        other.count = self.count
+        return other
+
+
+class PrometheusExporter(object):
+    """Renders a ``MetricsCollector`` in the Prometheus text exposition format."""
+
+    def __init__(self, collector, prefix='liberty_toolkit'):
+        self._collector = collector
+        self._prefix = prefix
+
+    def render(self):
+        lines = []
+        by_name = {}
+        for (name, labels), value in self._collector.counters().items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            metric = self._metric_name(name)
+            lines.append('# TYPE {0} counter'.format(metric))
+            for labels, value in sorted(by_name[name]):
+                lines.append('{0}{1} {2}'.format(metric, _format_labels(labels), _format_value(value)))
+
+        by_name = {}
+        for (name, labels), histogram in self._collector.histograms().items():
+            by_name.setdefault(name, []).append((labels, histogram))
+        for name in sorted(by_name):
+            metric = self._metric_name(name)
+            lines.append('# TYPE {0} histogram'.format(metric))
+            for labels, histogram in sorted(by_name[name], key=lambda d: d[0]):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(bound)
+                    lines.append('{0}_bucket{1} {2}'.format(metric, _format_labels(labels + (('le', le),)), cumulative))
+                lines.append('{0}_sum{1} {2}'.format(metric, _format_labels(labels), _format_value(histogram.sum)))
+                lines.append('{0}_count{1} {2}'.format(metric, _format_labels(labels), histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Writes atomically, as required by the node_exporter textfile collector."""
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.rename(tmp_path, path)
+
+    def _metric_name(self, name):
+        if self._prefix:
+            return '{0}_{1}'.format(self._prefix, name)
+        return name
+
+
+def _freeze(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append('{0}="{1}"'.format(key, value))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
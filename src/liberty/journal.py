@@ -0,0 +1,130 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import json
+import os
+import threading
+import timeit
+
+import instrument
+
+
+SYNC_INTERVAL = 0.05
+
+
+class Journal(object):
+    """An append-only file of JSON entries, one per line.
+
+    Every entry is written through to the operating system as it is
+    appended, so it survives the process crashing. Entries reach the disk
+    itself by an fsync at most ``sync_interval`` seconds after they are
+    appended, from a timer thread when no later append comes in time, which
+    lets thousands of appends a second share a handful of syncs; ``sync`` and
+    ``close`` force one.
+    """
+
+    def __init__(self, path, sync_interval=SYNC_INTERVAL):
+        self._path = path
+        self._sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._dirty = False
+        self._last_sync = timeit.default_timer()
+        self._timer = None
+
+    def get_path(self):
+        return self._path
+
+    def read(self):
+        """Returns the entries; a torn last line left by a crash is ignored."""
+        try:
+            with open(self._path, 'rb') as f:
+                lines = f.read().split('\n')
+        except IOError:
+            return []
+
+        entries = []
+        for line in lines:
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+        return entries
+
+    def append(self, entry):
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = self._open('ab')
+            self._file.write(line)
+            self._file.flush()
+            self._dirty = True
+            elapsed = timeit.default_timer() - self._last_sync
+            if elapsed >= self._sync_interval:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._sync_interval - elapsed, self._sync_due)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def reset(self, entry):
+        """Atomically replaces all entries with ``entry``."""
+        with self._lock:
+            self._close()
+            tmp_file = '{0}.tmp'.format(self._path)
+            f = self._open('wb', tmp_file)
+            try:
+                f.write(json.dumps(entry, separators=(',', ':'), sort_keys=True) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                f.close()
+            os.rename(tmp_file, self._path)
+            instrument.incr('journal_syncs_total')
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _open(self, mode, path=None):
+        path = path or self._path
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        # Entries may hold passwords, as server.xml itself does.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if 'a' in mode else os.O_TRUNC), 0o600)
+        return os.fdopen(fd, mode)
+
+    def _sync_due(self):
+        with self._lock:
+            self._timer = None
+            self._sync()
+
+    def _sync(self):
+        if self._dirty and self._file is not None:
+            os.fsync(self._file.fileno())
+            instrument.incr('journal_syncs_total')
+        self._dirty = False
+        self._last_sync = timeit.default_timer()
+
+    def _close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
@@ -11,9 +11,20 @@
 import os
 import platform
 import shutil
+import time
 
+from artifacts import WarInspector
 from commons import process
+from diagnostics import DiagnosticsCollector, DUMP
+from features import FeatureCatalog
+import instrument
+from libraries import LibraryConsolidator
+from packaging import ServerPackager
 from serveradmin import AdminTask
+from sizing import SizingAdvisor
+from startup import StartupAnalyzer
+import status
+from watcher import ServerWatcher
 
 
 if platform.system() == 'Windows':
@@ -26,6 +37,8 @@ class Liberty(object):
     
     def __init__(self, liberty_home):
         self._liberty_home = liberty_home
+        self._feature_catalog = None
+        self._war_inspector = None
 
     def get_home(self):
         return self._liberty_home
@@ -33,6 +46,22 @@ class Liberty(object):
     def get_server_template_dir(self):
         return os.path.join(self.get_home(), 'templates', 'servers')
     
+    def get_output_dir(self):
+        output_dir = os.environ.get('WLP_OUTPUT_DIR')
+        if output_dir:
+            return output_dir
+        return os.path.join(self.get_home(), 'usr', 'servers')
+    
+    def get_feature_catalog(self):
+        if self._feature_catalog is None:
+            self._feature_catalog = FeatureCatalog(self.get_home())
+        return self._feature_catalog
+    
+    def get_war_inspector(self):
+        if self._war_inspector is None:
+            self._war_inspector = WarInspector()
+        return self._war_inspector
+    
     def get_server(self, server_name):
         if not self._is_server_exist(server_name):
             raise LibertyException("the server named '{0}' doesn't exist".format(server_name))
@@ -40,11 +69,11 @@ class Liberty(object):
     
     def start_server(self, server_name):
         _cmd = ['start', server_name]
-        self._execute_cmd(_cmd)
+        return self._execute_cmd(_cmd)
     
     def stop_server(self, server_name):
         _cmd = ['stop', server_name]
-        self._execute_cmd(_cmd)
+        return self._execute_cmd(_cmd)
     
     def create_server(self, server_name, template_name='defaultServer'):
         if self._is_server_exist(server_name):
@@ -74,13 +103,94 @@ class Liberty(object):
                 names.append(child)
                 
         return names
+    
+    def statuses(self, names=None, confirm=False):
+        existing = self.servers()
+        if names is None:
+            names = existing
+        
+        unknown = set(names) - set(existing)
+        if unknown:
+            raise LibertyException("the servers named '{0}' don't exist".format("', '".join(sorted(unknown))))
+        
+        inspector = status.ProcInspector()
+        return [LibertyServer(self, name).status(confirm, inspector) for name in names]
+    
+    def collect_diagnostics(self, names=None, kinds=(DUMP,), archive=None, workers=4, timeout=60.0, remove=False):
+        """Dumps the given servers concurrently into one ``.tar.gz`` and returns a DiagnosticsReport.
+        
+        ``kinds`` are any of 'dump', 'javadump' and 'threads'. The archive
+        defaults to ``diagnostics-<timestamp>.tar.gz`` in the output directory.
+        """
+        existing = self.servers()
+        if names is None:
+            names = existing
+        
+        unknown = set(names) - set(existing)
+        if unknown:
+            raise LibertyException("the servers named '{0}' don't exist".format("', '".join(sorted(unknown))))
+        
+        if archive is None:
+            archive = os.path.join(self.get_output_dir(), 'diagnostics-{0}.tar.gz'.format(time.strftime('%Y%m%d-%H%M%S')))
+        servers = [LibertyServer(self, name) for name in names]
+        return DiagnosticsCollector(self, workers, timeout).collect(archive, servers, kinds, remove)
+    
+    def advise_sizing(self, names=None, host=None):
+        return SizingAdvisor(host).advise(self, names)
+    
+    def rank_startups(self, names=None):
+        """A StartupRanking of the servers by the slowest phase of their latest start."""
+        if names is None:
+            names = self.servers()
+        return StartupAnalyzer().rank([self.get_server(name) for name in names])
+    
+    def consolidate_libraries(self, names=None, dry_run=True, workers=8):
+        """Finds identical library files used from different directories and returns a ConsolidationReport.
+        
+        Unless ``dry_run``, each duplicated library is copied once under
+        ``${shared.resource.dir}`` and the servers are rewritten to use it.
+        """
+        consolidator = LibraryConsolidator(self, workers)
+        report = consolidator.plan(names)
+        if not dry_run:
+            consolidator.apply(report)
+        return report
+    
+    def package_servers(self, names, directory, processes=None):
+        """Packages servers incrementally into ``directory`` without the JVM and returns a PackageReport.
+        
+        All servers are packaged when ``names`` is None. Their ``logs`` and
+        ``workarea`` directories are left out, identical files are stored
+        once and only content that is not in ``directory`` yet is written.
+        """
+        return ServerPackager(self, processes=processes).package(names, directory)
+    
+    def restore_servers(self, directory, names=None, processes=None):
+        """Restores servers packaged by package_servers and returns a RestoreReport.
+        
+        Only files that differ from the package are written; other files of
+        the servers are left as they are.
+        """
+        return ServerPackager(self, processes=processes).restore(directory, names)
+    
+    def watch(self, callback=None, debounce=0.2, poll_interval=2.0, use_inotify=True):
+        watcher = ServerWatcher(self, debounce, poll_interval, use_inotify)
+        if callback is not None:
+            watcher.subscribe(callback)
+        return watcher.start()
             
     def _execute_cmd(self, _cmd):
         _bin_dir = os.path.join(self.get_home(), 'bin')
         cmd = [os.path.join(_bin_dir, _SERVER)] + _cmd
         proc = process.SubProcess(cmd)
         proc.set_cwd(_bin_dir)
-        return proc.run()
+        with instrument.span('liberty.execute_cmd', command=_cmd[0]) as span:
+            result = proc.run()
+            span.set_tag('exit_code', result)
+            
+        if isinstance(result, int):
+            instrument.incr('subprocess_exits_total', command=_cmd[0], code=result)
+        return result
     
 
 class LibertyServer(object):
@@ -105,11 +215,33 @@ class LibertyServer(object):
     def stop(self):
         self._liberty.stop_server(self.get_name())
     
+    def get_output_dir(self):
+        return os.path.join(self._liberty.get_output_dir(), self.get_name())
+    
+    def get_pid_file(self):
+        return os.path.join(self._liberty.get_output_dir(), '.pid', self.get_name() + '.pid')
+    
+    def status(self, confirm=False, inspector=None):
+        if inspector is None:
+            inspector = status.ProcInspector()
+        if os.path.exists(self.get_pid_file()):
+            result = inspector.inspect(self.get_name(), self.get_pid_file())
+        else:
+            result = status.ServerStatus(self.get_name(), status.STOPPED)
+        
+        if confirm:
+            # 'server status' exits with 0 when the server is running and 1 when it is not.
+            exit_code = self._liberty._execute_cmd(['status', self.get_name()])
+            if exit_code in (0, 1):
+                result.state = status.RUNNING if exit_code == 0 else status.STOPPED
+                result.confirmed = True
+        return result
+    
     def get_server_xml(self):
         return os.path.join(self.get_home(), 'server.xml')
     
     def get_jvm_options(self):
-        jvm_options = os.path.join(self.get_home(), 'jvm.properties') 
+        jvm_options = os.path.join(self.get_home(), 'jvm.options')
         if os.path.exists(jvm_options):
             return jvm_options
         
@@ -118,8 +250,22 @@ class LibertyServer(object):
         if os.path.exists(bootstrap_prop):
             return bootstrap_prop
     
-    def get_server_admin_task(self):
-        return AdminTask(self)
+    def get_feature_catalog(self):
+        return self._liberty.get_feature_catalog()
+    
+    def get_war_inspector(self):
+        return self._liberty.get_war_inspector()
+    
+    def analyze_startup(self):
+        """StartupProfiles of the starts of this server found in its logs and history, the latest last."""
+        return StartupAnalyzer().analyze(self)
+    
+    def get_toolkit_dir(self):
+        """Where the toolkit keeps its own files for this server, such as the AdminTask journal."""
+        return os.path.join(self.get_home(), '.toolkit')
+    
+    def get_server_admin_task(self, journal=False, compact_after=None, concurrent=False):
+        return AdminTask(self, journal, compact_after, concurrent)
     
 
 class LibertyException (Exception):
@@ -0,0 +1,257 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import fnmatch
+import hashlib
+import os
+import re
+import shutil
+from multiprocessing.pool import ThreadPool
+
+import instrument
+from serverxml import Fileset
+from sharding import LoadedPolicy, load_server_xml, output_sharded
+
+
+SHARED_RESOURCE_DIR = '${shared.resource.dir}'
+
+_PATTERN_SEPARATOR = re.compile(r'[,\s]+')
+_VARIABLE = re.compile(r'\$\{[^}]*\}')
+
+
+class LibraryCopy(object):
+    """The files one ``fileset`` of one server matches."""
+
+    def __init__(self, server_name, fileset, directory, files):
+        self.server_name = server_name
+        self.fileset = fileset
+        self.directory = directory
+        # [(name, size, digest)], sorted by name
+        self.files = files
+
+    def get_key(self):
+        return tuple((name, digest) for name, _, digest in self.files)
+
+    def get_size(self):
+        return sum(size for _, size, _ in self.files)
+
+
+class DuplicateLibrary(object):
+    """Identical sets of files found in several directories, to be replaced by one shared copy."""
+
+    def __init__(self, copies, target):
+        self.copies = copies
+        self.target = target
+
+    def get_directories(self):
+        return sorted(set(copy.directory for copy in self.copies))
+
+    def get_size(self):
+        return self.copies[0].get_size()
+
+    def get_wasted_bytes(self):
+        """The bytes on disk taken by every copy but one."""
+        return self.get_size() * (len(self.get_directories()) - 1)
+
+
+class ConsolidationReport(object):
+
+    def __init__(self, duplicates, skipped, shared_dir):
+        self.duplicates = duplicates
+        self.skipped = skipped
+        self.shared_dir = shared_dir
+        self.applied = False
+
+    def get_wasted_bytes(self):
+        return sum(duplicate.get_wasted_bytes() for duplicate in self.duplicates)
+
+    def format(self):
+        lines = []
+        for duplicate in self.duplicates:
+            lines.append('{0}: {1} files, {2} bytes, {3} copies, {4} bytes duplicated'.format(
+                duplicate.target, len(duplicate.copies[0].files), duplicate.get_size(),
+                len(duplicate.get_directories()), duplicate.get_wasted_bytes()))
+            for copy in sorted(duplicate.copies, key=lambda copy: (copy.server_name, copy.directory)):
+                lines.append('    {0}: {1}'.format(copy.server_name, copy.directory))
+        for server_name, directory, reason in self.skipped:
+            lines.append('skipped {0}: {1} ({2})'.format(server_name, directory, reason))
+        lines.append('{0} duplicated libraries, {1} bytes duplicated{2}'.format(
+            len(self.duplicates), self.get_wasted_bytes(), '' if self.applied else ' (dry run)'))
+        return '\n'.join(lines)
+
+
+class LibraryConsolidator(object):
+    """Finds libraries whose filesets match identical files in different directories.
+
+    The files of every ``fileset`` are hashed in parallel. Applying the
+    report copies each duplicated set once under ``${shared.resource.dir}``
+    and points all the filesets at that copy; the original files are left
+    in place, since they may be used by more than these servers.
+    """
+
+    def __init__(self, liberty, workers=8):
+        self._liberty = liberty
+        self._workers = workers
+        self._models = {}
+
+    def get_shared_dir(self):
+        return os.path.join(self._liberty.get_home(), 'usr', 'shared', 'resources')
+
+    def plan(self, names=None):
+        if names is None:
+            names = self._liberty.servers()
+        servers = [self._liberty.get_server(name) for name in names]
+
+        with instrument.span('libraries.plan', servers=str(len(servers))):
+            pool = ThreadPool(self._workers)
+            try:
+                configs = pool.map(lambda server: load_server_xml(server.get_server_xml()), servers)
+                found = []
+                skipped = []
+                for server, (model, fragments) in zip(servers, configs):
+                    self._models[server.get_name()] = (server, model, fragments)
+                    for fileset in _filesets(model):
+                        directory = self._resolve(fileset.dir, server)
+                        if directory is None or not os.path.isdir(directory):
+                            skipped.append((server.get_name(), fileset.dir, 'directory not found'))
+                            continue
+                        paths = _match(directory, fileset.includes, fileset.get('excludes'))
+                        if not paths:
+                            skipped.append((server.get_name(), fileset.dir, 'no files'))
+                            continue
+                        found.append((server.get_name(), fileset, directory, paths))
+
+                unique_paths = sorted(set(path for _, _, _, paths in found for path in paths))
+                digests = dict(zip(unique_paths, pool.map(_hash_file, unique_paths)))
+            finally:
+                pool.close()
+                pool.join()
+
+        groups = {}
+        for server_name, fileset, directory, paths in found:
+            files = [(os.path.basename(path), os.path.getsize(path), digests[path]) for path in paths]
+            copy = LibraryCopy(server_name, fileset, directory, files)
+            groups.setdefault(copy.get_key(), []).append(copy)
+
+        duplicates = []
+        for key, copies in sorted(groups.items()):
+            if len(set(copy.directory for copy in copies)) < 2:
+                continue
+            duplicates.append(DuplicateLibrary(copies, self._target(key, copies)))
+        instrument.incr('library_duplicated_bytes', sum(duplicate.get_wasted_bytes() for duplicate in duplicates))
+        return ConsolidationReport(duplicates, skipped, self.get_shared_dir())
+
+    def apply(self, report):
+        """Copies each duplicated library to its shared directory and rewrites the servers that use it."""
+        changed = set()
+        for duplicate in report.duplicates:
+            _copy_files(duplicate.copies[0], duplicate.target)
+            location = SHARED_RESOURCE_DIR + '/' + os.path.relpath(duplicate.target, report.shared_dir).replace(os.sep, '/')
+            for copy in duplicate.copies:
+                if copy.fileset.dir != location:
+                    copy.fileset.dir = location
+                    changed.add(copy.server_name)
+
+        for server_name in sorted(changed):
+            server, model, fragments = self._models[server_name]
+            # Filesets in fragments are written back to the fragment they were read from.
+            contents, _, _ = output_sharded(model, os.path.dirname(server.get_server_xml()), fragments, LoadedPolicy(fragments))
+            for path, content in contents.items():
+                _write(path, content)
+        report.applied = True
+        return report
+
+    def _target(self, key, copies):
+        shared_dir = os.path.join(self.get_shared_dir(), '')
+        names = [name for name, _ in key]
+        for copy in copies:
+            # A shared directory holding other jars too would hand them to every
+            # fileset pointed at it, so only one holding exactly these is reused.
+            if os.path.join(copy.directory, '').startswith(shared_dir) and _jars(copy.directory) == names:
+                return copy.directory
+        stem = os.path.splitext(key[0][0])[0]
+        return os.path.join(self.get_shared_dir(), '{0}-{1}'.format(stem, hashlib.sha1(repr(key)).hexdigest()[:8]))
+
+    def _resolve(self, directory, server):
+        if not directory:
+            return None
+        user_dir = os.path.join(self._liberty.get_home(), 'usr')
+        variables = {
+            '${server.config.dir}': server.get_home(),
+            '${server.output.dir}': server.get_home(),
+            SHARED_RESOURCE_DIR: self.get_shared_dir(),
+            '${shared.config.dir}': os.path.join(user_dir, 'shared', 'config'),
+            '${wlp.user.dir}': user_dir,
+            '${wlp.install.dir}': self._liberty.get_home(),
+        }
+        for variable, value in variables.items():
+            directory = directory.replace(variable, value)
+        if _VARIABLE.search(directory):
+            return None
+        return os.path.normpath(os.path.join(server.get_home(), directory))
+
+
+def _filesets(model):
+    stack = [model]
+    while stack:
+        model = stack.pop()
+        if isinstance(model, Fileset):
+            yield model
+        stack.extend(reversed(model.children()))
+
+
+def _match(directory, includes, excludes):
+    """The files of ``directory`` matching a Liberty fileset, whose patterns default to '*'."""
+    include_patterns = _PATTERN_SEPARATOR.split((includes or '*').strip())
+    exclude_patterns = _PATTERN_SEPARATOR.split((excludes or '').strip()) if excludes else []
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        if any(fnmatch.fnmatch(name, pattern) for pattern in include_patterns) and \
+                not any(fnmatch.fnmatch(name, pattern) for pattern in exclude_patterns):
+            paths.append(path)
+    return paths
+
+
+def _jars(directory):
+    return [os.path.basename(path) for path in _match(directory, '*.jar', None)]
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_files(copy, target):
+    if not os.path.isdir(target):
+        os.makedirs(target)
+    for name, size, digest in copy.files:
+        path = os.path.join(target, name)
+        if os.path.exists(path) and os.path.getsize(path) == size and _hash_file(path) == digest:
+            continue
+        tmp_file = path + '.tmp'
+        shutil.copy2(os.path.join(copy.directory, name), tmp_file)
+        os.rename(tmp_file, path)
+
+
+def _write(path, content):
+    with open(path, 'rb') as f:
+        if f.read() == content:
+            return
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(content)
+    shutil.copymode(path, tmp_file)
+    os.rename(tmp_file, path)
@@ -0,0 +1,161 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import contextlib
+import threading
+
+import instrument
+
+
+class ReadWriteLock(object):
+    """Lets many threads read, or one thread write, at a time.
+
+    A thread may also hold the update lock: it excludes writers and other
+    updaters but not readers, and can be turned into the write lock without
+    letting a writer in between, e.g. to write files from a model while
+    others still query it and then record that they were written. Waiting
+    writers and upgrades go before new readers so that they are not starved.
+    The write and update locks are reentrant, and their holder may also
+    read; a reader can not write or update.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writes = 0
+        self._updater = None
+        self._updates = 0
+        self._waiting_writers = 0
+        self._upgrading = False
+
+    @contextlib.contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def updating(self):
+        self.acquire_update()
+        try:
+            yield
+        finally:
+            self.release_update()
+
+    @contextlib.contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self):
+        me = threading.current_thread()
+        with self._condition:
+            if me in (self._writer, self._updater) or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            if self._is_read_blocked():
+                instrument.incr('lock_waits_total', mode='read')
+                while self._is_read_blocked():
+                    self._condition.wait()
+            self._readers[me] = 1
+
+    def release_read(self):
+        me = threading.current_thread()
+        with self._condition:
+            count = self._readers[me] - 1
+            if count:
+                self._readers[me] = count
+            else:
+                del self._readers[me]
+                self._condition.notify_all()
+
+    def acquire_update(self):
+        me = threading.current_thread()
+        with self._condition:
+            if me in (self._writer, self._updater):
+                self._updates += 1
+                return
+            if me in self._readers:
+                raise LibertyLockException('A reader can not update.')
+            if self._writer is not None or self._updater is not None:
+                instrument.incr('lock_waits_total', mode='update')
+                while self._writer is not None or self._updater is not None:
+                    self._condition.wait()
+            self._updater = me
+            self._updates = 1
+
+    def release_update(self):
+        with self._condition:
+            self._updates -= 1
+            if not self._updates:
+                self._updater = None
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.current_thread()
+        with self._condition:
+            if me is self._writer:
+                self._writes += 1
+                return
+            if me in self._readers:
+                raise LibertyLockException('A reader can not write.')
+            if me is self._updater:
+                # The updater already keeps writers out, only the readers have to finish.
+                self._upgrading = True
+                try:
+                    while self._readers:
+                        self._condition.wait()
+                finally:
+                    self._upgrading = False
+            else:
+                self._waiting_writers += 1
+                try:
+                    if self._is_write_blocked():
+                        instrument.incr('lock_waits_total', mode='write')
+                        while self._is_write_blocked():
+                            self._condition.wait()
+                finally:
+                    self._waiting_writers -= 1
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self):
+        with self._condition:
+            self._writes -= 1
+            if not self._writes:
+                self._writer = None
+                self._condition.notify_all()
+
+    def _is_read_blocked(self):
+        # Writers waiting for an updater can not go first anyway.
+        return self._writer is not None or self._upgrading or (self._waiting_writers and self._updater is None)
+
+    def _is_write_blocked(self):
+        return self._writer is not None or self._updater is not None or bool(self._readers)
+
+
+class NullLock(object):
+    """Has the interface of a ReadWriteLock but does not lock."""
+
+    @contextlib.contextmanager
+    def reading(self):
+        yield
+
+    updating = writing = reading
+
+
+class LibertyLockException (Exception):
+    pass
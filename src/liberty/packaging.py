@@ -0,0 +1,313 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+from multiprocessing.pool import ThreadPool
+
+import instrument
+
+
+MANIFEST = 'manifest.json'
+OBJECTS_DIR = 'objects'
+# Directories of a server that only hold what it produces while it runs, and
+# the toolkit directory, whose journal may hold passwords in plain text.
+SKIPPED_DIRS = ('logs', 'workarea', '.toolkit')
+CHUNK_SIZE = 1024 * 1024
+
+_MANIFEST_VERSION = 1
+
+
+class PackageReport(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.servers = []
+        self.files = 0
+        self.total_bytes = 0
+        # Files whose digest was computed rather than taken from the previous manifest.
+        self.hashed_files = 0
+        self.new_objects = 0
+        self.written_bytes = 0
+
+    def format(self):
+        return '{0}: {1} servers, {2} files, {3} bytes, {4} hashed, {5} new objects, {6} bytes written'.format(
+            self.directory, len(self.servers), self.files, self.total_bytes, self.hashed_files, self.new_objects,
+            self.written_bytes)
+
+
+class RestoreReport(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.servers = []
+        # [(server name, path)], the files that were written
+        self.restored = []
+        # [(server name, path)], the files that were not in the manifest
+        self.removed = []
+        self.unchanged = 0
+        self.restored_bytes = 0
+
+    def format(self):
+        lines = ['restored {0}: {1}'.format(server_name, path) for server_name, path in self.restored]
+        lines.extend('removed {0}: {1}'.format(server_name, path) for server_name, path in self.removed)
+        lines.append('{0}: {1} servers, {2} files restored, {3} removed, {4} unchanged, {5} bytes restored'.format(
+            self.directory, len(self.servers), len(self.restored), len(self.removed), self.unchanged, self.restored_bytes))
+        return '\n'.join(lines)
+
+
+class ServerPackager(object):
+    """Packages servers into a directory of gzipped objects named by the SHA-1 of their content.
+
+    A manifest lists the files of each server with their size, modification
+    time, mode and digest. Identical files, within a server or across
+    servers, are stored once, and packaging into the same directory again
+    only hashes the files whose size or modification time changed and only
+    writes the objects that are not there yet. Files are compressed and
+    decompressed ``CHUNK_SIZE`` bytes at a time in parallel processes.
+    Objects no longer listed in the manifest are kept. Restoring a server
+    removes its files that the manifest does not list, except in
+    ``SKIPPED_DIRS``, so that it is the server that was packaged.
+    """
+
+    def __init__(self, liberty, workers=8, processes=None):
+        self._liberty = liberty
+        self._workers = workers
+        self._processes = processes
+
+    def package(self, names, directory):
+        if names is None:
+            names = self._liberty.servers()
+        servers = [self._liberty.get_server(name) for name in names]
+        manifest = _load_manifest(directory)
+        report = PackageReport(directory)
+
+        with instrument.span('packaging.package', servers=str(len(servers))):
+            listings = {}
+            to_hash = set()
+            for server in servers:
+                previous = manifest['servers'].get(server.get_name(), {})
+                files = _list_files(server.get_home())
+                for path, (source, size, mtime, mode) in files.items():
+                    entry = previous.get(path)
+                    if entry is None or entry[:2] != [size, mtime]:
+                        to_hash.add(source)
+                listings[server.get_name()] = (previous, files)
+
+            pool = ThreadPool(self._workers)
+            try:
+                paths = sorted(to_hash)
+                digests = dict(zip(paths, pool.map(_hash_file, paths)))
+            finally:
+                pool.close()
+                pool.join()
+            report.hashed_files = len(digests)
+
+            jobs = {}
+            for server in servers:
+                previous, files = listings[server.get_name()]
+                entries = {}
+                for path, (source, size, mtime, mode) in sorted(files.items()):
+                    digest = digests[source] if source in digests else previous[path][3]
+                    entries[path] = [size, mtime, mode, digest]
+                    report.files += 1
+                    report.total_bytes += size
+                    if digest not in jobs and not os.path.exists(_object_path(directory, digest)):
+                        jobs[digest] = (source, _object_path(directory, digest), digest)
+                manifest['servers'][server.get_name()] = entries
+                report.servers.append(server.get_name())
+
+            for digest, written_bytes in _run(_compress, sorted(jobs.values()), self._processes):
+                report.new_objects += 1
+                report.written_bytes += written_bytes
+            _save_manifest(directory, manifest)
+
+        instrument.incr('package_bytes_written_total', report.written_bytes)
+        return report
+
+    def restore(self, directory, names=None):
+        manifest = _load_manifest(directory)
+        if not manifest['servers']:
+            raise LibertyPackageException('{0} has no packaged servers.'.format(directory))
+        if names is None:
+            names = sorted(manifest['servers'])
+        unknown = set(names) - set(manifest['servers'])
+        if unknown:
+            raise LibertyPackageException("{0} has no servers named '{1}'".format(directory, "', '".join(sorted(unknown))))
+
+        report = RestoreReport(directory)
+        servers_dir = os.path.join(self._liberty.get_home(), 'usr', 'servers')
+        with instrument.span('packaging.restore', servers=str(len(names))):
+            jobs = []
+            for name in names:
+                server_dir = os.path.join(servers_dir, name)
+                # Removed first, a file may be in the way of a directory to restore or the other way round.
+                for path in _remove_extra_files(server_dir, manifest['servers'][name]):
+                    report.removed.append((name, path))
+                for path, (size, mtime, mode, digest) in sorted(manifest['servers'][name].items()):
+                    target = os.path.join(server_dir, *path.split('/'))
+                    if _is_unchanged(target, size, mtime, digest):
+                        report.unchanged += 1
+                        continue
+                    target_dir = os.path.dirname(target)
+                    if not os.path.isdir(target_dir):
+                        os.makedirs(target_dir)
+                    source = _object_path(directory, digest)
+                    if not os.path.exists(source):
+                        raise LibertyPackageException('{0} misses the object {1} of {2}.'.format(directory, digest, path))
+                    jobs.append((source, target, mode, mtime))
+                    report.restored.append((name, path))
+                    report.restored_bytes += size
+                report.servers.append(name)
+
+            _run(_decompress, jobs, self._processes)
+        return report
+
+
+def _list_files(server_dir):
+    """``{path: (absolute path, size, modification time, mode)}`` of the files of a server, by path with '/' separators."""
+    files = {}
+    for root, dirs, names in os.walk(server_dir):
+        if root == server_dir:
+            dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+        for name in names:
+            source = os.path.join(root, name)
+            if not os.path.isfile(source):
+                continue
+            stat = os.stat(source)
+            path = os.path.relpath(source, server_dir).replace(os.sep, '/')
+            files[path] = (source, stat.st_size, _mtime(stat), stat.st_mode & 0o7777)
+    return files
+
+
+def _remove_extra_files(server_dir, entries):
+    """Removes the files of a server that are not in ``entries``, and the directories they leave empty."""
+    removed = sorted(set(_list_files(server_dir)) - set(entries))
+    for path in removed:
+        target = os.path.join(server_dir, *path.split('/'))
+        os.remove(target)
+        directory = os.path.dirname(target)
+        while directory != server_dir and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+    return removed
+
+
+def _is_unchanged(target, size, mtime, digest):
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return False
+    if stat.st_size != size:
+        return False
+    if _mtime(stat) == mtime:
+        return True
+    if _hash_file(target) != digest:
+        return False
+    os.utime(target, (stat.st_atime, mtime))
+    return True
+
+
+def _run(function, jobs, processes):
+    if len(jobs) < 2 or processes == 1:
+        return [function(job) for job in jobs]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return list(pool.imap_unordered(function, jobs))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _compress(job):
+    source, target, digest = job
+    directory = os.path.dirname(target)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Made by another process in the meantime.
+            if not os.path.isdir(directory):
+                raise
+    tmp_file = '{0}.{1}.tmp'.format(target, os.getpid())
+    actual = hashlib.sha1()
+    with open(source, 'rb') as f:
+        with open(tmp_file, 'wb') as raw:
+            # Without a name or timestamp the same content always gives the same object.
+            with gzip.GzipFile(filename='', mode='wb', compresslevel=6, fileobj=raw, mtime=0) as out:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    actual.update(chunk)
+                    out.write(chunk)
+    if actual.hexdigest() != digest:
+        os.remove(tmp_file)
+        raise LibertyPackageException('{0} changed while it was packaged.'.format(source))
+    os.rename(tmp_file, target)
+    return digest, os.path.getsize(target)
+
+
+def _decompress(job):
+    source, target, mode, mtime = job
+    tmp_file = '{0}.{1}.tmp'.format(target, os.getpid())
+    with gzip.open(source, 'rb') as f:
+        with open(tmp_file, 'wb') as out:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                out.write(chunk)
+    os.chmod(tmp_file, mode)
+    os.utime(tmp_file, (mtime, mtime))
+    os.rename(tmp_file, target)
+    return target
+
+
+def _mtime(stat):
+    # Milliseconds survive the float of the manifest and os.utime on every platform.
+    return round(stat.st_mtime, 3)
+
+
+def _object_path(directory, digest):
+    return os.path.join(directory, OBJECTS_DIR, digest[:2], digest + '.gz')
+
+
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except IOError:
+        return {'version': _MANIFEST_VERSION, 'servers': {}}
+    except ValueError:
+        raise LibertyPackageException('{0} is not a valid manifest.'.format(os.path.join(directory, MANIFEST)))
+    if manifest.get('version') != _MANIFEST_VERSION:
+        raise LibertyPackageException('{0} has the unsupported version {1}.'.format(os.path.join(directory, MANIFEST),
+                                                                                   manifest.get('version')))
+    return manifest
+
+
+def _save_manifest(directory, manifest):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    path = os.path.join(directory, MANIFEST)
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.rename(tmp_file, path)
+
+
+class LibertyPackageException (Exception):
+    pass
@@ -0,0 +1,159 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import abc
+import base64
+
+from serverxml import BasicRegistry, User, Datasource, DatasourceProp, KeyStore
+
+
+_XOR_KEY = 0x5F
+_XOR_TABLE = ''.join(chr(i ^ _XOR_KEY) for i in range(256))
+# The schemes of securityUtility, which values may already be encoded with even when no encoder is registered.
+_LIBERTY_SCHEMES = ('xor', 'aes', 'hash')
+
+
+class PasswordEncoder(object):
+    """Encodes passwords as ``{SCHEME}`` followed by the encoded value.
+
+    Subclasses set ``SCHEME`` and implement ``encode`` and ``decode``, and
+    are registered with ``register_encoder``.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    SCHEME = None
+
+    def get_prefix(self):
+        return '{' + self.SCHEME + '}'
+
+    @abc.abstractmethod
+    def encode(self, password):
+        pass
+
+    @abc.abstractmethod
+    def decode(self, encoded):
+        pass
+
+    def encode_all(self, passwords):
+        return [self.encode(password) for password in passwords]
+
+    def is_encoded(self, value):
+        return value is not None and value.startswith(self.get_prefix())
+
+
+class XorPasswordEncoder(PasswordEncoder):
+    """Liberty's ``{xor}`` scheme: the UTF-8 bytes XOR-ed with ``_`` and base64 encoded."""
+
+    SCHEME = 'xor'
+
+    def encode(self, password):
+        return self.get_prefix() + base64.b64encode(_to_bytes(password).translate(_XOR_TABLE))
+
+    def decode(self, encoded):
+        if not self.is_encoded(encoded):
+            raise LibertySecurityException('Not a {xor} encoded password.')
+        return base64.b64decode(encoded[len(self.get_prefix()):]).translate(_XOR_TABLE)
+
+    def encode_all(self, passwords):
+        # One translate over all passwords at once instead of one call per password.
+        raw = [_to_bytes(password) for password in passwords]
+        translated = ''.join(raw).translate(_XOR_TABLE)
+        prefix = self.get_prefix()
+        result = []
+        offset = 0
+        for password in raw:
+            result.append(prefix + base64.b64encode(translated[offset:offset + len(password)]))
+            offset += len(password)
+        return result
+
+
+_encoders = {XorPasswordEncoder.SCHEME: XorPasswordEncoder()}
+
+
+def register_encoder(encoder):
+    _encoders[encoder.SCHEME] = encoder
+
+
+def get_encoder(scheme):
+    if isinstance(scheme, PasswordEncoder):
+        return scheme
+    encoder = _encoders.get(scheme)
+    if encoder is None:
+        raise LibertySecurityException("No password encoder registered for '{0}'.".format(scheme))
+    return encoder
+
+
+def is_encoded(value):
+    """Whether a value starts with the tag of a Liberty or registered scheme, e.g. ``{xor}``."""
+    if value is None or not value.startswith('{'):
+        return False
+    scheme, closed, _ = value[1:].partition('}')
+    return bool(closed) and (scheme.lower() in _LIBERTY_SCHEMES or scheme in _encoders)
+
+
+def encode_password(password, scheme='xor'):
+    return get_encoder(scheme).encode(password)
+
+
+def encode_models(models, scheme='xor'):
+    """Encodes the ``password`` of every model in one pass, skipping values already encoded."""
+    encoder = get_encoder(scheme)
+    pending = [model for model in models if model.password and not is_encoded(model.password)]
+    for model, encoded in zip(pending, encoder.encode_all([model.password for model in pending])):
+        model.password = encoded
+    return len(pending)
+
+
+def encode_registry(basic_registry, scheme='xor'):
+    return encode_models(basic_registry.find_all(User), scheme)
+
+
+def encode_datasources(server_model, scheme='xor'):
+    props = []
+    for datasource in server_model.find_all(Datasource):
+        for child in datasource.children():
+            if isinstance(child, DatasourceProp):
+                props.append(child)
+    return encode_models([_DatasourcePassword(prop) for prop in props], scheme)
+
+
+def encode_server(server_model, scheme='xor'):
+    """Encodes the registry users, datasource and key store passwords of a server model."""
+    count = 0
+    for basic_registry in server_model.find_all(BasicRegistry):
+        count += encode_registry(basic_registry, scheme)
+    count += encode_datasources(server_model, scheme)
+    count += encode_models(server_model.find_all(KeyStore), scheme)
+    return count
+
+
+class _DatasourcePassword(object):
+
+    def __init__(self, prop):
+        self._prop = prop
+
+    @property
+    def password(self):
+        return self._prop.db_password
+
+    @password.setter
+    def password(self, value):
+        self._prop.db_password = value
+
+
+def _to_bytes(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class LibertySecurityException (Exception):
+    pass
@@ -0,0 +1,199 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import collections
+import itertools
+import re
+import threading
+
+
+CACHE_SIZE = 256
+
+_TOKEN = re.compile(r'''
+    (?P<descendant>//)
+  | (?P<child>/)
+  | (?P<predicate>\[\s*(?:
+        @(?P<attr>[\w.:\-]+)\s*(?:(?P<op>!?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'))?
+      | (?P<text>text\(\))\s*(?P<text_op>!?=)\s*(?:"(?P<text_dq>[^"]*)"|'(?P<text_sq>[^']*)')
+      | (?P<position>\d+)
+    )\s*\])
+  | (?P<name>\*|[\w.:\-]+)
+''', re.VERBOSE)
+
+
+class Step(object):
+
+    def __init__(self, name, descendant):
+        self.name = name
+        self.descendant = descendant
+        self.conditions = []
+        self.position = None
+
+    def matches(self, model):
+        if self.name != '*' and model.get_element_name() != self.name:
+            return False
+        for condition in self.conditions:
+            if not condition(model):
+                return False
+        return True
+
+    def indexed_id(self):
+        for condition in self.conditions:
+            if getattr(condition, 'id_value', None) is not None:
+                return condition.id_value
+
+
+class Selector(object):
+    """A compiled path over ElementModel trees, e.g. ``dataSource[@jdbcDriverRef='db2']/properties.db2.jcc``.
+
+    Steps are element names or ``*``, separated by ``/`` for children or ``//``
+    for descendants, each with optional ``[@attr]``, ``[@attr='value']``,
+    ``[@attr!='value']``, ``[text()='value']`` or 1-based ``[n]`` predicates.
+    Matches are produced lazily.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.steps = _parse(text)
+
+    def select(self, model, index=None):
+        """Yields the matches below ``model``.
+
+        ``index`` may be a validator IdIndex built over ``model``; a leading
+        ``//name[@id='...']`` step is then answered from it without a traversal.
+        """
+        nodes = iter([model])
+        for i, step in enumerate(self.steps):
+            if i == 0 and index is not None and step.descendant and step.position is None and step.indexed_id() is not None:
+                nodes = (candidate for candidate in index.find_all(step.indexed_id())
+                         if candidate is not model and step.matches(candidate))
+            else:
+                nodes = _apply(step, nodes)
+        return nodes
+
+    def select_one(self, model, index=None):
+        for match in self.select(model, index):
+            return match
+
+
+def compile_selector(text):
+    with _cache_lock:
+        selector = _cache.get(text)
+        if selector is not None:
+            del _cache[text]
+            _cache[text] = selector
+            return selector
+
+    selector = Selector(text)
+    with _cache_lock:
+        _cache[text] = selector
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return selector
+
+
+def select(model, text, index=None):
+    return compile_selector(text).select(model, index)
+
+
+def select_one(model, text, index=None):
+    return compile_selector(text).select_one(model, index)
+
+
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _apply(step, nodes):
+    for node in nodes:
+        if step.descendant:
+            candidates = _descendants(node)
+        else:
+            candidates = iter(node.children())
+        matches = (candidate for candidate in candidates if step.matches(candidate))
+        if step.position is not None:
+            matches = itertools.islice(matches, step.position - 1, step.position)
+        for match in matches:
+            yield match
+
+
+def _descendants(model):
+    stack = model.children()[::-1]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = node.children()
+        if children:
+            stack.extend(children[::-1])
+
+
+def _parse(text):
+    steps = []
+    pos = 0
+    descendant = False
+    expect_step = True
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise SelectorException("Invalid selector '{0}' at position {1}.".format(text, pos))
+        pos = match.end()
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+
+        if match.group('descendant') or match.group('child'):
+            if steps and expect_step:
+                raise SelectorException("Invalid selector '{0}': empty step.".format(text))
+            descendant = bool(match.group('descendant'))
+            expect_step = True
+        elif match.group('name'):
+            if not expect_step:
+                raise SelectorException("Invalid selector '{0}': missing '/' before '{1}'.".format(text, match.group('name')))
+            steps.append(Step(match.group('name'), descendant))
+            descendant = False
+            expect_step = False
+        else:
+            if expect_step:
+                raise SelectorException("Invalid selector '{0}': predicate without a step.".format(text))
+            _add_predicate(steps[-1], match)
+
+    if not steps or expect_step:
+        raise SelectorException("Invalid selector '{0}'.".format(text))
+    return steps
+
+
+def _add_predicate(step, match):
+    if match.group('position'):
+        step.position = int(match.group('position'))
+        if step.position < 1:
+            raise SelectorException('Positions start at 1.')
+        return
+
+    if match.group('text'):
+        value = match.group('text_dq') if match.group('text_dq') is not None else match.group('text_sq')
+        negate = match.group('text_op') == '!='
+        step.conditions.append(lambda model: (model.value == value) != negate)
+        return
+
+    attr = match.group('attr')
+    if match.group('op') is None:
+        step.conditions.append(lambda model: model.get(attr) is not None)
+        return
+
+    value = match.group('dq') if match.group('dq') is not None else match.group('sq')
+    negate = match.group('op') == '!='
+    condition = lambda model: (model.get(attr) == value) != negate
+    if attr == 'id' and not negate:
+        condition.id_value = value
+    step.conditions.append(condition)
+
+
+class SelectorException (Exception):
+    pass
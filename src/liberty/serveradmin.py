@@ -8,34 +8,230 @@
 # been deposited with the U.S Copyright Office.
 #
 
+import contextlib
+import functools
+import hashlib
+import inspect
+import collections
 import os
 import shutil
+import time
 
-from serverxml import Builder, FeatureManager, XmlOutputter, BasicRegistry, User, Group, HttpEndpoint, JdbcDriver, Library, \
-    Fileset, Datasource, DB2JCCProp, OracleProp, Application, SecurityRole, ManagedExecutorService
+import instrument
+from locking import NullLock, ReadWriteLock
+from serverxml import FeatureManager, XmlOutputter, BasicRegistry, User, Group, HttpEndpoint, JdbcDriver, Library, \
+    Fileset, Datasource, DB2JCCProp, OracleProp, Application, SecurityRole, ManagedExecutorService, ConnectionManager, \
+    Executor, HttpOptions, ConcurrencyPolicy, AccessLogging
+
+
+def _journaled(method):
+    """Runs an AdminTask operation under its write lock and appends each
+    successful call to its journal, if it has one."""
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.writing():
+            # Operations made by another operation are replayed by it.
+            if self._journal is None or self._operation is not None:
+                return method(self, *args, **kwargs)
+            
+            arguments = inspect.getcallargs(method, self, *args, **kwargs)
+            del arguments['self']
+            self._operation = {'op': method.__name__, 'args': arguments}
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                operation, self._operation = self._operation, None
+            if not self._replaying:
+                self._record(operation)
+            return result
+    
+    return wrapper
 
 
 class AdminTask(object):
     
-    def __init__(self, liberty_server):
+    def __init__(self, liberty_server, journal=False, compact_after=None, concurrent=False):
+        """With ``journal`` every operation is also appended to a journal in the
+        toolkit directory of the server as it is made, and operations a
+        previous AdminTask made but did not save are replayed. ``compact_after``
+        saves, and so empties the journal, once it holds that many operations.
+        
+        With ``concurrent`` the AdminTask can be shared between threads: its
+        operations take a write lock, while queries such as get_ports, the
+        ``reading`` block and save only take read locks, so many threads can
+        query the model, also while it is being saved.
+        """
         self._liberty_server = liberty_server
+        self._lock = ReadWriteLock() if concurrent else NullLock()
+        self._journal = None
+        self._compact_after = compact_after
+        self._operation = None
+        self._replaying = False
+        
+        # The modules of other operations are imported by the operations, so
+        # that a process only pays for the ones it uses.
+        from sharding import load_server_xml
+        self._server_model, self._fragments = load_server_xml(self._liberty_server.get_server_xml())
+        if journal:
+            from journal import Journal
+            self._open_journal(Journal(os.path.join(liberty_server.get_toolkit_dir(), 'admin.journal')))
+    
+    def save(self, validate=False, sharded=None, policy=None):
+        """Writes the configuration back, leaving identical files untouched.
+        
+        With ``sharded`` the top-level elements chosen by ``policy``, a
+        ShardingPolicy, are written to ``<include>`` fragments in the
+        fragments directory next to server.xml, so a change rewrites only
+        the fragments it touches and Liberty reloads less. With
+        ``sharded=False`` the fragments are merged back into server.xml; by
+        default server.xml stays sharded if it was.
+        """
+        with self._lock.updating():
+            self._save(validate, sharded, policy)
+            
+    def _save(self, validate, sharded, policy):
+        if validate:
+            report = self.validate()
+            if not report.is_valid():
+                raise LibertyAdminTaskException('Invalid configuration, not saved:\n' + report.format())
+            
+        with instrument.span('admin.save', server=self._liberty_server.get_name()):
+            server_xml = self._liberty_server.get_server_xml()
+            if sharded is None:
+                sharded = bool(self._fragments)
+            if sharded:
+                from sharding import ShardingPolicy, output_sharded
+                contents, fragments, stale = output_sharded(self._server_model, os.path.dirname(server_xml), self._fragments,
+                                                            policy or ShardingPolicy())
+            else:
+                contents = collections.OrderedDict([(server_xml, XmlOutputter().output(self._server_model))])
+                fragments = collections.OrderedDict()
+                stale = [os.path.join(os.path.dirname(server_xml), *location.split('/')) for location in self._fragments]
+            digest = _digest_contents(contents)
+            if self._journal is not None:
+                # Tells a replay that the operations before it are in the files with this digest.
+                self._journal.append({'compact': digest})
+                self._journal.sync()
+            
+            # server.xml comes last, once the fragments it includes are in place.
+            for path, content in contents.items():
+                _write_if_changed(path, content)
+            for path in stale:
+                if os.path.exists(path):
+                    os.remove(path)
+            self._fragments = fragments
+            
+            if self._journal is not None:
+                with self._lock.writing():
+                    self._journal.reset({'base': digest})
+                    self._base = self._server_model.snapshot()
+                    self._operations = []
+    
+    @contextlib.contextmanager
+    def reading(self):
+        """Yields the server model to query under the read lock; it must not be changed."""
+        with self._lock.reading():
+            yield self._server_model
+    
+    def history(self):
+        """The journaled operations made since server.xml was last saved, oldest first."""
+        if self._journal is None:
+            return []
+        with self._lock.reading():
+            return [dict(operation) for operation in self._operations]
+    
+    def undo(self, count=1):
+        """Reverts the last ``count`` journaled operations made since server.xml was last saved.
+        
+        The model is rebuilt from a snapshot taken at the last save by
+        replaying the remaining operations; WAR files copied by install_war
+        stay in place.
+        """
+        if self._journal is None:
+            raise LibertyAdminTaskException('Undo needs an AdminTask with a journal.')
+        with self._lock.writing():
+            if count < 1 or count > len(self._operations):
+                raise LibertyAdminTaskException('Can not undo {0} of {1} operations.'.format(count, len(self._operations)))
+            
+            self._journal.append({'undo': count, 't': round(time.time(), 3)})
+            operations = self._operations[:len(self._operations) - count]
+            self._server_model = self._base.fork()
+            self._replay(operations)
         
-        builder = Builder()
-        self._server_model = builder.build(self._liberty_server.get_server_xml())
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
     
-    def save(self):
-        outputter = XmlOutputter()
-        with open(self._liberty_server.get_server_xml(), 'w') as f:
-            f.write(outputter.output(self._server_model))
+    def _open_journal(self, journal):
+        server_xml = self._liberty_server.get_server_xml()
+        server_dir = os.path.dirname(server_xml)
+        paths = [server_xml] + [os.path.join(server_dir, *location.split('/')) for location in self._fragments]
+        digest = _digest_files(paths)
+        entries = journal.read()
+        start = None
+        for i, entry in enumerate(entries):
+            if digest in (entry.get('base'), entry.get('compact')):
+                start = i + 1
+        
+        if start is None:
+            if _effective_operations(entries[1:]):
+                raise LibertyAdminTaskException('{0} was changed outside of the journal {1}, which has operations that are not saved.'.format(
+                    server_xml, journal.get_path()))
+            journal.reset({'base': digest})
+            start = 1
+            entries = []
+        
+        self._journal = journal
+        self._base = self._server_model.snapshot()
+        self._replay(_effective_operations(entries[start:]))
+        
+    def _replay(self, operations):
+        self._operations = []
+        self._replaying = True
+        try:
+            for operation in operations:
+                getattr(self, operation['op'])(**operation['args'])
+                self._operations.append(operation)
+        finally:
+            self._replaying = False
+            
+    def _record(self, operation):
+        operation['t'] = round(time.time(), 3)
+        self._journal.append(operation)
+        self._operations.append(operation)
+        if self._compact_after is not None and len(self._operations) >= self._compact_after:
+            self.save()
+            
+    def _record_as(self, **arguments):
+        """Journals the current operation with these arguments instead of the ones it was called with."""
+        if self._operation is not None:
+            self._operation['args'].update(arguments)
     
-    def add_features(self, features):
+    def validate(self):
+        from sharding import load_includes
+        from validator import ConfigValidator
+        with self._lock.reading():
+            server_dir = os.path.dirname(self._liberty_server.get_server_xml())
+            return ConfigValidator().validate(self._server_model, *load_includes(self._server_model, server_dir))
+    
+    @_journaled
+    def add_features(self, features, validate=False):
+        from features import LibertyFeatureException
         feature_manager = self._server_model.find(FeatureManager)
         if feature_manager is None:
             feature_manager = FeatureManager()
             self._server_model.add(feature_manager)
-            
-        feature_manager.add_features(features)
+        
+        catalog = None
+        if validate:
+            catalog = self._liberty_server.get_feature_catalog()
+        try:
+            feature_manager.add_features(features, catalog)
+        except LibertyFeatureException as e:
+            raise LibertyAdminTaskException(str(e))
     
+    @_journaled
     def modify_http_endpoints(self, http_port, https_port):
         http_endpoints = self._server_model.find(HttpEndpoint)
         if http_endpoints is None:
@@ -47,6 +243,7 @@ class AdminTask(object):
         http_endpoints.http_port = http_port
         http_endpoints.https_port = https_port
     
+    @_journaled
     def create_basic_registry(self, id_, realm_name):
         basic_register = self._server_model.find(BasicRegistry)
         if basic_register is None:
@@ -55,7 +252,13 @@ class AdminTask(object):
             basic_registry.realm = realm_name
             self._server_model.add(basic_registry)
         
-    def create_user(self, username, password):
+    @_journaled
+    def create_user(self, username, password, encode=None):
+        if encode:
+            import security
+            password = security.encode_password(password, encode)
+            self._record_as(password=password, encode=None)
+        
         basic_register = self._server_model.find(BasicRegistry)
         members = []
         for member in basic_register.find_all(User):
@@ -67,6 +270,7 @@ class AdminTask(object):
             user.password = password
             basic_register.add(user)
     
+    @_journaled
     def create_group(self, group_name):
         basic_register = self._server_model.find(BasicRegistry)
         groups = []
@@ -78,6 +282,7 @@ class AdminTask(object):
             new_group.name = group_name
             basic_register.add(new_group)
     
+    @_journaled
     def add_user_to_group(self, user, group_name):
         basic_register = self._server_model.find(BasicRegistry)
         if basic_register is None:
@@ -88,14 +293,18 @@ class AdminTask(object):
             if group.name == group_name:
                 group.add_members([user])
     
-    def create_jdbc_driver(self, jdbc_driver_id, driver_path):
+    @_journaled
+    def create_jdbc_driver(self, jdbc_driver_id, driver_path, library_id=None):
+        if library_id is None:
+            library_id = jdbc_driver_id + 'Lib'
+            
         jdbc_driver = JdbcDriver()
         jdbc_driver.id = jdbc_driver_id
-        jdbc_driver.library_ref = 'jdbcLib'
+        jdbc_driver.library_ref = library_id
         self._server_model.add(jdbc_driver)
         
         lib = Library()
-        lib.id = 'jdbcLib'
+        lib.id = library_id
         jdbc_driver.add(lib)
         
         fileset = Fileset()
@@ -103,7 +312,12 @@ class AdminTask(object):
         fileset.includes = '*.jar'
         lib.add(fileset)
     
-    def create_db2_datasource(self, jndi_name, jdbc_driver_id, db_name, db_user, db_pwd, db_host, db_port, schema=None, isolation_level=None):
+    @_journaled
+    def create_db2_datasource(self, jndi_name, jdbc_driver_id, db_name, db_user, db_pwd, db_host, db_port, schema=None, isolation_level=None, encode=None):
+        if encode:
+            import security
+            db_pwd = security.encode_password(db_pwd, encode)
+            self._record_as(db_pwd=db_pwd, encode=None)
         datasource = self._create_datasource(jndi_name, jdbc_driver_id, isolation_level)
         
         prop = DB2JCCProp()
@@ -117,7 +331,12 @@ class AdminTask(object):
         
         datasource.add(prop)
     
-    def create_oracle_datasource(self, jndi_name, jdbc_driver_id, db_name, db_user, db_pwd, db_host, db_port, isolation_level=None):
+    @_journaled
+    def create_oracle_datasource(self, jndi_name, jdbc_driver_id, db_name, db_user, db_pwd, db_host, db_port, isolation_level=None, encode=None):
+        if encode:
+            import security
+            db_pwd = security.encode_password(db_pwd, encode)
+            self._record_as(db_pwd=db_pwd, encode=None)
         datasource = self._create_datasource(jndi_name, jdbc_driver_id, isolation_level)
         
         prop = OracleProp()
@@ -140,11 +359,27 @@ class AdminTask(object):
         
         return datasource
     
-    def install_war(self, name, war_path, mapping_roles):
-        if not os.path.exists(war_path):
+    @_journaled
+    def install_war(self, name, war_path, mapping_roles='auto'):
+        """Installs a WAR, mapping each role to the group of the same name.
+        
+        With ``mapping_roles='auto'`` the roles are the ``security-role``
+        names declared in the ``WEB-INF/web.xml`` of the WAR.
+        """
+        # A replayed install finds the WAR already copied and its roles in the journal.
+        if not self._replaying and not os.path.exists(war_path):
             raise LibertyAdminTaskException('Can not find war application {0} in {1}.'.format(name, war_path))
         
-        shutil.copy(war_path, self._liberty_server.get_apps_dir())
+        if mapping_roles == 'auto':
+            from artifacts import LibertyArtifactException
+            try:
+                mapping_roles = self._liberty_server.get_war_inspector().get_roles(war_path)
+            except LibertyArtifactException as e:
+                raise LibertyAdminTaskException('Can not read war application {0}: {1}'.format(name, e))
+            self._record_as(mapping_roles=mapping_roles)
+        
+        if not self._replaying:
+            shutil.copy(war_path, self._liberty_server.get_apps_dir())
         app = Application()
         app.id = name
         app.name = name
@@ -158,14 +393,178 @@ class AdminTask(object):
             security_role.add_groups([role])
             app.add_security_role(security_role)
             
+    def sync_app(self, name, source_dir):
+        """Updates an exploded application from ``source_dir``, copying only what changed.
+        
+        The application is the directory ``<name>``, ``<name>.war`` or
+        ``<name>.ear`` in the apps or dropins directory of the server; one
+        that is not found yet is created as ``dropins/<name>.war``. Returns a
+        SyncReport. See AppSynchronizer on how the application monitor sees
+        the changes.
+        """
+        if not os.path.isdir(source_dir):
+            raise LibertyAdminTaskException('Can not find application directory {0}.'.format(source_dir))
+        
+        # The configuration is only read, but two syncs must not share the staging directory and digest cache.
+        with self._lock.updating():
+            return self._sync_app(name, source_dir)
+    
+    def _sync_app(self, name, source_dir):
+        server_dir = self._liberty_server.get_home()
+        candidates = [os.path.join(server_dir, directory, name + extension)
+                      for directory in ('apps', 'dropins') for extension in ('', '.war', '.ear')]
+        target_dir = None
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                raise LibertyAdminTaskException('Application {0} is the archive {1}, only exploded applications can be synchronized.'.format(
+                    name, candidate))
+            if os.path.isdir(candidate):
+                target_dir = candidate
+                break
+        if target_dir is None:
+            target_dir = os.path.join(server_dir, 'dropins', name + '.war')
+        
+        from appsync import AppSynchronizer, FileIndex
+        toolkit_dir = self._liberty_server.get_toolkit_dir()
+        index = FileIndex(os.path.join(toolkit_dir, 'app-digests.json'))
+        return AppSynchronizer(index, os.path.join(toolkit_dir, 'staging')).sync(source_dir, target_dir)
+        
+    @_journaled
     def add_managed_executor_service(self, jndi_name):
         model = ManagedExecutorService()
         model.jndi_name = jndi_name
         self._server_model.add(model) 
         
+    @_journaled
+    def set_connection_pool(self, jndi_name, max_pool_size=None, min_pool_size=None, aged_timeout=None, connection_timeout=None):
+        datasource = self._find_by_jndi(Datasource, 'jndi', jndi_name)
+        manager = _find_or_add(datasource, ConnectionManager)
+        _set_values(manager, max_pool_size=max_pool_size, min_pool_size=min_pool_size,
+                    aged_timeout=aged_timeout, connection_timeout=connection_timeout)
+        
+    @_journaled
+    def set_executor(self, core_threads=None, max_threads=None):
+        executor = _find_or_add(self._server_model, Executor)
+        _set_values(executor, core_threads=core_threads, max_threads=max_threads)
+        
+    @_journaled
+    def set_http_options(self, keep_alive_enabled=None, persist_timeout=None, max_keep_alive_requests=None):
+        http_endpoint = self._server_model.find(HttpEndpoint)
+        if http_endpoint is None:
+            raise LibertyAdminTaskException('Can not find httpEndpoint element in server.xml.')
+        
+        http_options = _find_or_add(http_endpoint, HttpOptions)
+        _set_values(http_options, keep_alive_enabled=keep_alive_enabled, persist_timeout=persist_timeout,
+                    max_keep_alive_requests=max_keep_alive_requests)
+        
+    @_journaled
+    def enable_access_logging(self, log_format=None, file_path=None, max_file_size=None, max_files=None):
+        """Turns on the access log of the HTTP endpoint, by default in a format accesslog can analyze."""
+        if log_format is None:
+            from accesslog import DEFAULT_LOG_FORMAT
+            log_format = DEFAULT_LOG_FORMAT
+            self._record_as(log_format=log_format)
+        http_endpoint = self._server_model.find(HttpEndpoint)
+        if http_endpoint is None:
+            raise LibertyAdminTaskException('Can not find httpEndpoint element in server.xml.')
+        
+        access_logging = _find_or_add(http_endpoint, AccessLogging)
+        _set_values(access_logging, log_format=log_format, file_path=file_path, max_file_size=max_file_size, max_files=max_files)
+        
+    @_journaled
+    def set_concurrency_policy(self, jndi_name, max_concurrency=None, max_queue_size=None):
+        executor_service = self._find_by_jndi(ManagedExecutorService, 'jndi_name', jndi_name)
+        policy = _find_or_add(executor_service, ConcurrencyPolicy)
+        _set_values(policy, max_concurrency=max_concurrency, max_queue_size=max_queue_size)
+        
+    def apply_sizing(self, sizing):
+        """Applies the ServerSizing proposed for this server by a SizingAdvisor."""
+        with self._lock.writing():
+            self.set_executor(sizing.core_threads, sizing.max_threads)
+            for jndi_name, (min_pool_size, max_pool_size) in sorted(sizing.pools.items()):
+                self.set_connection_pool(jndi_name, max_pool_size, min_pool_size)
+            for jndi_name, max_concurrency in sorted(sizing.concurrency.items()):
+                self.set_concurrency_policy(jndi_name, max_concurrency)
+            
+    def _find_by_jndi(self, model_clazz, attribute, jndi_name):
+        for model in self._server_model.find_all(model_clazz):
+            if getattr(model, attribute) == jndi_name:
+                return model
+        raise LibertyAdminTaskException('Can not find {0} {1} in server.xml.'.format(model_clazz.ELEMENT_NAME, jndi_name))
+        
+    @_journaled
+    def encode_passwords(self, scheme='xor'):
+        import security
+        return security.encode_server(self._server_model, scheme)
+        
     def get_ports(self):
-        http_endpoints = self._server_model.find(HttpEndpoint)
-        return (http_endpoints.http_port, http_endpoints.https_port)
+        with self._lock.reading():
+            http_endpoints = self._server_model.find(HttpEndpoint)
+            return (http_endpoints.http_port, http_endpoints.https_port)
+    
+    
+
+def _effective_operations(entries):
+    operations = []
+    for entry in entries:
+        if 'op' in entry:
+            operations.append(entry)
+        elif 'undo' in entry:
+            del operations[len(operations) - entry['undo']:]
+    return operations
+
+
+def _digest_contents(contents):
+    digest = hashlib.sha1()
+    for path in sorted(contents):
+        digest.update(contents[path])
+    return digest.hexdigest()
+
+
+def _digest_files(paths):
+    contents = {}
+    try:
+        for path in paths:
+            with open(path, 'rb') as f:
+                contents[path] = f.read()
+    except IOError:
+        return None
+    return _digest_contents(contents)
+
+
+def _write_if_changed(path, content):
+    # An identical file is left untouched so Liberty's config monitor does not reload it.
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(content)
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_file)
+    os.rename(tmp_file, path)
+    return True
+
+
+def _find_or_add(parent, model_clazz):
+    model = parent.find(model_clazz)
+    if model is None:
+        model = model_clazz()
+        parent.add(model)
+    return model
+
+
+def _set_values(model, **values):
+    for name, value in sorted(values.items()):
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        setattr(model, name, value)
     
     
 class LibertyAdminTaskException (Exception):
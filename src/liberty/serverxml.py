@@ -8,46 +8,223 @@
 # been deposited with the U.S Copyright Office.
 #
 
+import collections
 import copy
 import inspect
+import itertools
+import re
 import string
 import sys
-from xml.etree import ElementTree
+import weakref
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+import instrument
+import selector
 
 
 class Builder():
 
     def build(self, xml_file):
-        root = ElementTree.parse(xml_file).getroot()
-        self._element_mapping = self._get_mapping()
-        
-        return self._build_tree(root)
-    
-    def _build_tree(self, element):
-        tag = element.tag
-        model = self._element_mapping.get(tag, lambda: None)()
-        model.attributes = element.attrib
-        model.value = element.text
-        for child in element.getchildren():
-            model.add(self._build_tree(child))
-         
+        with instrument.span('builder.build'):
+            if hasattr(xml_file, 'read'):
+                source = xml_file.read()
+            else:
+                with open(xml_file, 'rb') as f:
+                    source = f.read()
+            self._element_mapping = self._get_mapping()
+            self._element_count = 0
+            
+            model = self._build_tree(source)
+            
+        instrument.incr('parse_bytes_total', len(source))
+        instrument.incr('parsed_elements_total', self._element_count)
+        return model
+    
+    def _build_tree(self, source):
+        parser = _SourceParser(self, source)
+        return parser.parse()
+    
+    def _create_model(self, tag, attrs):
+        self._element_count += 1
+        clazz = self._element_mapping.get(tag)
+        if clazz is None:
+            model = GenericElement(tag)
+            model.attributes = collections.OrderedDict(attrs)
+        else:
+            model = clazz()
+            model.attributes = dict(attrs)
+            
         return model
 
     def _get_mapping(self):
+        global _element_mapping
+        if _element_mapping is not None:
+            return _element_mapping
+        
         element_mapping = {}
         clsmembers = inspect.getmembers(sys.modules[self.__module__], lambda member: inspect.isclass(member))
         for _, clz in clsmembers:
-            if ElementModel in inspect.getmro(clz):
+            if ElementModel in inspect.getmro(clz) and clz.ELEMENT_NAME:
                 element_mapping[clz.ELEMENT_NAME] = clz
                 
+        _element_mapping = element_mapping
         return element_mapping
     
 
-class XmlOutputter(object):
+# The element classes of this module, collected by the first Builder.
+_element_mapping = None
+    
+
+class _Source(object):
+    """The raw text of a parsed document, shared by all the models built from it."""
+    
+    def __init__(self, text):
+        self.text = text
+        self.root_span = None
+        
+
+class _SourceParser(object):
+    """Builds models with expat, remembering where each element sits in the source.
+    
+    Every model gets the span of its element, the end of its start tag, the
+    end of the raw text following it and a snapshot of its original state,
+    which lets XmlOutputter reuse the original bytes of unchanged parts.
+    Models only keep offsets into the shared text, never copies of it.
+    """
+    
+    def __init__(self, builder, source):
+        self._builder = builder
+        self._source = _Source(source)
+        self._stack = []
+        self._root = None
+        self._texts = []
+        
+        self._parser = expat.ParserCreate()
+        self._parser.ordered_attributes = 1
+        self._parser.buffer_text = 1
+        try:
+            self._parser.returns_unicode = False
+        except AttributeError:
+            pass
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._data
+        
+    def parse(self):
+        try:
+            self._parser.Parse(self._source.text, True)
+        finally:
+            # The handlers of the parser refer back to this object.
+            self._parser = None
+        return self._root
+    
+    def _start(self, tag, attrs):
+        start = self._parser.CurrentByteIndex
+        model = self._builder._create_model(tag, zip(attrs[0::2], attrs[1::2]))
+        model._source = self._source
+        model._head_end = _find_tag_end(self._source.text, start)
+        model._span = (start, None)
+        
+        if self._stack:
+            parent = self._stack[-1]
+            if not parent.has_children():
+                parent.value = self._flush_text()
+            else:
+                previous = parent.children()[-1]
+                previous._tail = start
+            parent.add(model)
+        else:
+            self._root = model
+        
+        self._texts = []
+        self._stack.append(model)
+        
+    def _end(self, tag):
+        model = self._stack.pop()
+        text = self._source.text
+        if text[model._head_end - 2:model._head_end] == '/>':
+            end = close = model._head_end
+        else:
+            close = self._parser.CurrentByteIndex
+            end = text.index('>', close) + 1
+        model._span = (model._span[0], end)
+        model._close = close
+        
+        if model.has_children():
+            last = model.children()[-1]
+            last._tail = close
+        else:
+            model.value = self._flush_text()
+        model._snapshot_origin()
+        
+        if not self._stack:
+            self._source.root_span = model._span
+        self._texts = []
+    
+    def _data(self, data):
+        self._texts.append(data)
+        
+    def _flush_text(self):
+        text = ''.join(self._texts) if self._texts else None
+        self._texts = []
+        return text
+        
+
+_START_TAG = re.compile(r'''<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*/?>''')
+
+
+def _find_tag_end(text, start):
+    return _START_TAG.match(text, start).end()
+
+
+def _indent_before(text, start):
+    line_start = text.rfind('\n', 0, start) + 1
+    indent = text[line_start:start]
+    if indent.strip():
+        return ''
+    return indent
+
+
+class FragmentCache(object):
+    """Serialized text of subtrees shared by several models, reused across outputs.
+    
+    Only subtrees registered with ``share`` are cached; they must not be
+    modified while the cache is in use.
+    """
     
     def __init__(self):
+        self._shared = {}
+        self._entries = {}
+        
+    def share(self, model):
+        stack = [model]
+        while stack:
+            node = stack.pop()
+            self._shared[id(node)] = node
+            stack.extend(node.children())
+            
+    def is_shared(self, model):
+        return self._shared.get(id(model)) is model
+    
+    def get(self, model, key):
+        entry = self._entries.get((id(model), key))
+        if entry is not None:
+            instrument.incr('cache_hits_total', cache='fragments')
+        return entry
+    
+    def put(self, model, key, value):
+        instrument.incr('cache_misses_total', cache='fragments')
+        self._entries[(id(model), key)] = value
+        
+
+class XmlOutputter(object):
+    
+    def __init__(self, cache=None):
         self._indent = 0
         self._content = []
+        self._clean = {}
+        self._cache = cache
     
     def _add_indent(self, num=4):
         self._indent += num
@@ -63,6 +240,19 @@ class XmlOutputter(object):
         return string.join(self._content, '\n')
             
     def _output_element(self, model):
+        if self._cache is None or not self._cache.is_shared(model):
+            self._write_element(model)
+            return
+        
+        lines = self._cache.get(model, self._indent)
+        if lines is None:
+            start = len(self._content)
+            self._write_element(model)
+            self._cache.put(model, self._indent, self._content[start:])
+        else:
+            self._content.extend(lines)
+            
+    def _write_element(self, model):
         if model.has_children():
             self._println('<{0}{1}>'.format(model.get_element_name(), self._output_attributes(model.attributes)))
             self._add_indent()
@@ -72,7 +262,7 @@ class XmlOutputter(object):
             self._println('</{0}>'.format(model.get_element_name()))
             
         elif model.value:
-            self._println('<{0}{1}>{2}</{0}>'.format(model.get_element_name(), self._output_attributes(model.attributes), model.value))
+            self._println('<{0}{1}>{2}</{0}>'.format(model.get_element_name(), self._output_attributes(model.attributes), escape(model.value)))
 
         else:
             self._println('<{0}{1} />'.format(model.get_element_name(), self._output_attributes(model.attributes)))
@@ -81,18 +271,134 @@ class XmlOutputter(object):
         attrs_dict = copy.copy(attrib)
         result = '' 
         
-        if attrs_dict.has_key('id'):
-            result += ' id="{0}"'.format(attrs_dict.pop('id'))
+        if isinstance(attrs_dict, collections.OrderedDict):
+            items = attrs_dict.iteritems()
+        else:
+            if attrs_dict.has_key('id'):
+                result += ' id="{0}"'.format(_escape_attr(attrs_dict.pop('id')))
+            items = sorted(attrs_dict.iteritems(), key=lambda d:d[0])
     
-        for (k, v) in sorted(attrs_dict.iteritems(), key=lambda d:d[0]):
-            result += ' {0}="{1}"'.format(k, v)
+        for (k, v) in items:
+            result += ' {0}="{1}"'.format(k, _escape_attr(v))
         
         return result
     
+    def _output_source_element(self, model):
+        """Writes a parsed model, reusing the original text of everything unchanged."""
+        if self._cache is None or not self._cache.is_shared(model):
+            return self._write_source_element(model)
+        
+        content = self._cache.get(model, 'source')
+        if content is None:
+            content = self._write_source_element(model)
+            self._cache.put(model, 'source', content)
+        return content
+    
+    def _write_source_element(self, model):
+        text = model._source.text
+        start, end = model._span
+        if self._is_clean(model):
+            return text[start:end]
+        
+        children = model.children()
+        origin_children = model._origin[2]
+        if not origin_children and (children or model._close == end):
+            return self._indented(self._generate(model), _indent_before(text, start))
+            
+        if model.attributes == model._origin[0]:
+            head = text[start:model._head_end]
+        else:
+            head = '<{0}{1}>'.format(model.get_element_name(), self._output_attributes(model.attributes))
+        
+        if not children:
+            if model.value != model._origin[1]:
+                inner = escape(model.value or '')
+            elif origin_children:
+                # All children were removed, only the indentation of the close tag stays.
+                inner = text[origin_children[1]:model._close]
+            else:
+                inner = text[model._head_end:model._close]
+            return head + inner + text[model._close:end]
+        
+        first_start, last_end = origin_children
+        child_indent = _indent_before(text, first_start)
+        separator = '\n' + child_indent
+        
+        parts = [head, text[model._head_end:first_start]]
+        for i, child in enumerate(children):
+            if child._source is not None:
+                parts.append(self._output_source_element(child))
+            else:
+                parts.append(self._indented(self._generate(child), child_indent))
+            
+            if i == len(children) - 1:
+                parts.append(text[last_end:model._close])
+            elif child._source is model._source and child._tail is not None and child._span[1] != last_end:
+                parts.append(text[child._span[1]:child._tail])
+            else:
+                parts.append(separator)
+        parts.append(text[model._close:end])
+        
+        return ''.join(parts)
+    
+    def _is_clean(self, model):
+        key = id(model)
+        clean = self._clean.get(key)
+        if clean is None:
+            shared = self._cache is not None and self._cache.is_shared(model)
+            if shared:
+                clean = self._cache.get(model, 'clean')
+            if clean is None:
+                clean = model._is_unchanged() and all(self._is_clean(child) for child in model.children())
+                if shared:
+                    self._cache.put(model, 'clean', clean)
+            self._clean[key] = clean
+            
+        return clean
+    
+    def _generate(self, model):
+        outputter = XmlOutputter(self._cache)
+        outputter._output_element(model)
+        return outputter._get_content()
+    
+    def _indented(self, content, indent):
+        return content.replace('\n', '\n' + indent)
+    
     def output(self, model):
-        self._output_element(model)
-        return self._get_content()
+        with instrument.span('xml.output'):
+            source = model._source
+            if source is None:
+                self._output_element(model)
+                content = self._get_content()
+            elif source.root_span == model._span:
+                root_start, root_end = source.root_span
+                content = source.text[:root_start] + self._output_source_element(model) + source.text[root_end:]
+            else:
+                content = self._output_source_element(model)
+            
+        instrument.incr('output_bytes_total', len(content))
+        return content
+    
+
+def _escape_attr(value):
+    if not isinstance(value, basestring):
+        value = str(value)
+    return escape(value, {'"': '&quot;'})
+
+
+# Forks and changes are ordered by generation; a change made after a fork
+# keeps the state the fork still needs to see, see ElementModel.fork.
+_generations = itertools.count(1)
+_latest_fork = 0
+_live_forks = weakref.WeakSet()
+
+
+class _ForkPoint(object):
+    """The generation of a fork, kept alive by the parts of the fork that still read their base."""
     
+    def __init__(self, generation):
+        self.generation = generation
+        
 
 class ElementModel(object):
     
@@ -103,7 +409,20 @@ class ElementModel(object):
         self._children = []
         
         self.attributes = {}
-        self.value = None
+        self._value = None
+        
+        self._source = None
+        self._span = None
+        self._head_end = None
+        self._close = None
+        self._tail = None
+        self._origin = None
+        
+        self._base = None
+        self._fork_point = None
+        self._shared_attributes = False
+        self._history = None
+        self._changed_at = _latest_fork
     
     @property
     def id(self):
@@ -112,28 +431,151 @@ class ElementModel(object):
     @id.setter
     def id(self, id_):
         self.set(HttpEndpoint.ID_KEY, id_)
+        
+    @property
+    def value(self):
+        return self._value
+    
+    @value.setter
+    def value(self, value):
+        self._keep_state()
+        self._value = value
     
     def add(self, model):
+        self._keep_state()
         self._children.append(model)
     
     def children(self):
+        if self._base is not None:
+            self._detach()
         return self._children
     
     def has_children(self):
-        if len(self._children) > 0:
+        if len(self.children()) > 0:
             return True
         return False
     
     def remove(self, model):
-        if model in self._children:
+        if model in self.children():
+            self._keep_state()
             self._children.remove(model)
             
+    def replace(self, model, models):
+        """Puts ``models`` in the place of the child ``model``."""
+        index = self.children().index(model)
+        self._keep_state()
+        self._children[index:index + 1] = models
+            
     def get(self, key):
         if self.attributes.has_key(key):
             return self.attributes[key]
     
     def set(self, key, value):
+        self._keep_state()
+        if self._shared_attributes:
+            self.attributes = copy.copy(self.attributes)
+            self._shared_attributes = False
         self.attributes[key] = value
+    
+    def fork(self):
+        """Returns an independent copy of this subtree in constant time.
+        
+        The copy shares the attributes and children of this element until one
+        side changes them through ``add``, ``remove``, ``replace``, ``set`` or
+        ``value``. A change to this side keeps the old state for the fork in
+        the changed element only, so reading this side never copies anything.
+        The fork makes its own handle of a child when it reaches it, one level
+        at a time, and an edit there copies only the path down to the change.
+        """
+        global _latest_fork
+        point = _ForkPoint(next(_generations))
+        _live_forks.add(point)
+        _latest_fork = point.generation
+        return self._fork_at(point)
+    
+    def snapshot(self):
+        """A fork to keep as it is, e.g. to compare against or restore later."""
+        return self.fork()
+    
+    def clone(self, children=None):
+        """A copy of this element alone, with attributes of its own and ``children``, or the same children."""
+        if children is None:
+            children = self.children()
+        clone = copy.copy(self)
+        clone.attributes = copy.copy(self.attributes)
+        clone._children = list(children)
+        clone._base = None
+        clone._fork_point = None
+        clone._shared_attributes = False
+        clone._history = None
+        clone._changed_at = _latest_fork
+        return clone
+    
+    def _fork_at(self, point):
+        attributes, value = self._state_at(point.generation)
+        if attributes is self.attributes:
+            # The fork may outlive its fork point once it has read its children,
+            # so the next set on this side has to copy the attributes first.
+            self._shared_attributes = True
+        clone = copy.copy(self)
+        clone.attributes = attributes
+        clone._value = value
+        clone._children = None
+        clone._base = self
+        clone._fork_point = point
+        clone._shared_attributes = True
+        clone._history = None
+        clone._changed_at = point.generation
+        return clone
+    
+    def _state_at(self, generation):
+        for end, attributes, value, _ in self._history or ():
+            if generation < end:
+                return attributes, value
+        return self.attributes, self._value
+    
+    def _children_at(self, point):
+        """The children at a fork point, with the fork point their own state is to be read at."""
+        for end, _, _, children in self._history or ():
+            if point.generation < end:
+                return children, point
+        if self._base is not None:
+            # Unchanged since it was forked, so its children are still those of its base.
+            return self._base._children_at(self._fork_point)
+        return self._children, point
+    
+    def _detach(self):
+        base, point = self._base, self._fork_point
+        if base is None or point is None:
+            # Detached by a concurrent reader meanwhile; either list of handles is as good.
+            return
+        children, point = base._children_at(point)
+        self._children = [child._fork_at(point) for child in children]
+        self._base = None
+        self._fork_point = None
+        
+    def _keep_state(self):
+        """Called before each change, keeps the current state for the forks taken since the last one."""
+        if self._base is not None:
+            self._detach()
+        if _latest_fork <= self._changed_at:
+            if self._history is not None and not _live_forks:
+                self._history = None
+            return
+        
+        live = [point.generation for point in list(_live_forks)]
+        if not live:
+            self._history = None
+            self._changed_at = _latest_fork
+            return
+        oldest = min(live)
+        history = [entry for entry in self._history or () if entry[0] > oldest]
+        self._changed_at = next(_generations)
+        history.append((self._changed_at, self.attributes, self._value, self._children))
+        self._history = history
+        self.attributes = copy.copy(self.attributes)
+        self._shared_attributes = False
+        self._children = list(self._children)
         
     def get_element_name(self):
         return self.__class__.ELEMENT_NAME
@@ -151,6 +593,63 @@ class ElementModel(object):
                 
         return result
     
+    def select(self, path, index=None):
+        return selector.select(self, path, index)
+    
+    def select_one(self, path, index=None):
+        return selector.select_one(self, path, index)
+    
+    def _snapshot_origin(self):
+        # The attributes are shared until set copies them, and the children are
+        # only remembered by where the text of the first and the last one are.
+        children = self.children()
+        child_range = (children[0]._span[0], children[-1]._span[1]) if children else None
+        self._origin = (self.attributes, self.value, child_range)
+        self._shared_attributes = True
+        
+    def _is_unchanged(self):
+        if self._origin is None:
+            return False
+        
+        attributes, value, child_range = self._origin
+        if self.value != value or (self.attributes is not attributes and self.attributes != attributes):
+            return False
+        
+        children = self.children()
+        if not children or child_range is None:
+            return not children and child_range is None
+        for child in children:
+            if child._source is not self._source:
+                return False
+        if children[0]._span[0] != child_range[0] or children[-1]._span[1] != child_range[1]:
+            return False
+        # Original siblings follow each other in the text, so a chain from the
+        # first to the last one is the original list.
+        for child, following in zip(children, children[1:]):
+            if child._tail != following._span[0]:
+                return False
+        return True
+    
+
+class GenericElement(ElementModel):
+    """Any element without a model class of its own.
+    
+    The tag and the attribute order are kept so that unmodelled configuration
+    such as ``logging``, ``include`` or ``variable`` is written back as found.
+    """
+    
+    def __init__(self, tag):
+        ElementModel.__init__(self)
+        self._tag = tag
+        self.attributes = collections.OrderedDict()
+        
+    @property
+    def tag(self):
+        return self._tag
+    
+    def get_element_name(self):
+        return self._tag
+    
 
 class ServerModel(ElementModel):
     
@@ -177,9 +676,14 @@ class FeatureManager(ElementModel):
             
         return result
     
-    def add_features(self, features):
+    def add_features(self, features, catalog=None):
+        if catalog is not None:
+            catalog.resolve(self.list_features() + list(features))
+            
+        existing = set(self.list_features())
         for name in features:
-            if name not in self.list_features():
+            if name not in existing:
+                existing.add(name)
                 feature = Feature()
                 feature.value = name
                 self.add(feature)
@@ -564,4 +1068,164 @@ class ManagedExecutorService(ElementModel):
     
     @jndi_name.setter
     def jndi_name(self, name):
-        self.set(ManagedExecutorService.JNDI_NAME_KEY, name)
\ No newline at end of file
+        self.set(ManagedExecutorService.JNDI_NAME_KEY, name)
+
+
+class ConnectionManager(ElementModel):
+    
+    ELEMENT_NAME = 'connectionManager'
+    MAX_POOL_SIZE_KEY = 'maxPoolSize'
+    MIN_POOL_SIZE_KEY = 'minPoolSize'
+    AGED_TIMEOUT_KEY = 'agedTimeout'
+    CONNECTION_TIMEOUT_KEY = 'connectionTimeout'
+    
+    @property
+    def max_pool_size(self):
+        return self.get(ConnectionManager.MAX_POOL_SIZE_KEY)
+    
+    @max_pool_size.setter
+    def max_pool_size(self, value):
+        self.set(ConnectionManager.MAX_POOL_SIZE_KEY, value)
+        
+    @property
+    def min_pool_size(self):
+        return self.get(ConnectionManager.MIN_POOL_SIZE_KEY)
+    
+    @min_pool_size.setter
+    def min_pool_size(self, value):
+        self.set(ConnectionManager.MIN_POOL_SIZE_KEY, value)
+        
+    @property
+    def aged_timeout(self):
+        return self.get(ConnectionManager.AGED_TIMEOUT_KEY)
+    
+    @aged_timeout.setter
+    def aged_timeout(self, value):
+        self.set(ConnectionManager.AGED_TIMEOUT_KEY, value)
+        
+    @property
+    def connection_timeout(self):
+        return self.get(ConnectionManager.CONNECTION_TIMEOUT_KEY)
+    
+    @connection_timeout.setter
+    def connection_timeout(self, value):
+        self.set(ConnectionManager.CONNECTION_TIMEOUT_KEY, value)
+
+
+class Executor(ElementModel):
+    
+    ELEMENT_NAME = 'executor'
+    CORE_THREADS_KEY = 'coreThreads'
+    MAX_THREADS_KEY = 'maxThreads'
+    
+    @property
+    def core_threads(self):
+        return self.get(Executor.CORE_THREADS_KEY)
+    
+    @core_threads.setter
+    def core_threads(self, value):
+        self.set(Executor.CORE_THREADS_KEY, value)
+        
+    @property
+    def max_threads(self):
+        return self.get(Executor.MAX_THREADS_KEY)
+    
+    @max_threads.setter
+    def max_threads(self, value):
+        self.set(Executor.MAX_THREADS_KEY, value)
+
+
+class HttpOptions(ElementModel):
+    
+    ELEMENT_NAME = 'httpOptions'
+    KEEP_ALIVE_ENABLED_KEY = 'keepAliveEnabled'
+    PERSIST_TIMEOUT_KEY = 'persistTimeout'
+    MAX_KEEP_ALIVE_REQUESTS_KEY = 'maxKeepAliveRequests'
+    
+    @property
+    def keep_alive_enabled(self):
+        return self.get(HttpOptions.KEEP_ALIVE_ENABLED_KEY)
+    
+    @keep_alive_enabled.setter
+    def keep_alive_enabled(self, value):
+        self.set(HttpOptions.KEEP_ALIVE_ENABLED_KEY, value)
+        
+    @property
+    def persist_timeout(self):
+        return self.get(HttpOptions.PERSIST_TIMEOUT_KEY)
+    
+    @persist_timeout.setter
+    def persist_timeout(self, value):
+        self.set(HttpOptions.PERSIST_TIMEOUT_KEY, value)
+        
+    @property
+    def max_keep_alive_requests(self):
+        return self.get(HttpOptions.MAX_KEEP_ALIVE_REQUESTS_KEY)
+    
+    @max_keep_alive_requests.setter
+    def max_keep_alive_requests(self, value):
+        self.set(HttpOptions.MAX_KEEP_ALIVE_REQUESTS_KEY, value)
+
+
+class ConcurrencyPolicy(ElementModel):
+    
+    ELEMENT_NAME = 'concurrencyPolicy'
+    MAX_KEY = 'max'
+    MAX_QUEUE_SIZE_KEY = 'maxQueueSize'
+    
+    @property
+    def max_concurrency(self):
+        return self.get(ConcurrencyPolicy.MAX_KEY)
+    
+    @max_concurrency.setter
+    def max_concurrency(self, value):
+        self.set(ConcurrencyPolicy.MAX_KEY, value)
+        
+    @property
+    def max_queue_size(self):
+        return self.get(ConcurrencyPolicy.MAX_QUEUE_SIZE_KEY)
+    
+    @max_queue_size.setter
+    def max_queue_size(self, value):
+        self.set(ConcurrencyPolicy.MAX_QUEUE_SIZE_KEY, value)
+
+
+class AccessLogging(ElementModel):
+    
+    ELEMENT_NAME = 'accessLogging'
+    FILE_PATH_KEY = 'filePath'
+    LOG_FORMAT_KEY = 'logFormat'
+    MAX_FILE_SIZE_KEY = 'maxFileSize'
+    MAX_FILES_KEY = 'maxFiles'
+    
+    @property
+    def file_path(self):
+        return self.get(AccessLogging.FILE_PATH_KEY)
+    
+    @file_path.setter
+    def file_path(self, value):
+        self.set(AccessLogging.FILE_PATH_KEY, value)
+        
+    @property
+    def log_format(self):
+        return self.get(AccessLogging.LOG_FORMAT_KEY)
+    
+    @log_format.setter
+    def log_format(self, value):
+        self.set(AccessLogging.LOG_FORMAT_KEY, value)
+        
+    @property
+    def max_file_size(self):
+        return self.get(AccessLogging.MAX_FILE_SIZE_KEY)
+    
+    @max_file_size.setter
+    def max_file_size(self, value):
+        self.set(AccessLogging.MAX_FILE_SIZE_KEY, value)
+        
+    @property
+    def max_files(self):
+        return self.get(AccessLogging.MAX_FILES_KEY)
+    
+    @max_files.setter
+    def max_files(self, value):
+        self.set(AccessLogging.MAX_FILES_KEY, value)
@@ -0,0 +1,197 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import collections
+import glob
+import os
+import re
+
+from serverxml import Builder, XmlOutputter, GenericElement, ServerModel, BasicRegistry, Datasource, JdbcDriver, Application
+
+
+# Relative to the directory of server.xml; only includes below it are managed here.
+FRAGMENT_DIR = 'fragments'
+INCLUDE = 'include'
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+class ShardingPolicy(object):
+    """Decides which top-level elements of server.xml move to which include fragment.
+
+    The elements of a ``by_class`` class share one fragment, named after the
+    element, e.g. ``basicRegistry.xml``. Each element of a ``by_id`` class
+    gets a fragment of its own, named after the element and its id, e.g.
+    ``dataSource-jdbc_db.xml``; those without an id stay in server.xml.
+    """
+
+    def __init__(self, by_class=(BasicRegistry,), by_id=(Datasource, JdbcDriver, Application)):
+        self._by_class = tuple(by_class)
+        self._by_id = tuple(by_id)
+
+    def get_fragment(self, model):
+        """The file name of the fragment for a top-level element, or None to keep it in server.xml."""
+        if isinstance(model, self._by_class):
+            return model.get_element_name() + '.xml'
+        if isinstance(model, self._by_id) and model.get(model.ID_KEY):
+            return '{0}-{1}.xml'.format(model.get_element_name(), _UNSAFE.sub('_', model.get(model.ID_KEY)))
+        return None
+
+
+class LoadedPolicy(ShardingPolicy):
+    """Keeps each element in the fragment it was loaded from, and new elements in server.xml."""
+
+    def __init__(self, fragments):
+        self._names = {}
+        for location, fragment in fragments.items():
+            if fragment.root is not None:
+                for child in fragment.root.children():
+                    self._names[id(child)] = location[len(FRAGMENT_DIR) + 1:]
+
+    def get_fragment(self, model):
+        return self._names.get(id(model))
+
+
+class Fragment(object):
+    """An include fragment of server.xml; ``root`` is None for one not read from disk."""
+
+    def __init__(self, location, include, root):
+        self.location = location
+        self.include = include
+        self.root = root
+
+
+def is_fragment_include(model):
+    return isinstance(model, GenericElement) and model.tag == INCLUDE and \
+        (model.get('location') or '').startswith(FRAGMENT_DIR + '/')
+
+
+def load_server_xml(server_xml):
+    """Builds a server.xml with the elements of its fragments in place of their includes.
+
+    Returns the model and the loaded Fragments by location; anything that
+    reads the configuration of a server should build it this way.
+    """
+    model = Builder().build(server_xml)
+    return model, load_fragments(model, os.path.dirname(server_xml))
+
+
+def config_files(server_xml):
+    """server.xml and the fragment files next to it, e.g. to tell whether the configuration changed."""
+    return [server_xml] + sorted(glob.glob(os.path.join(os.path.dirname(server_xml), FRAGMENT_DIR, '*.xml')))
+
+
+def load_includes(model, server_dir):
+    """Builds the files included by a server model other than its fragments, and those they include.
+
+    Returns their root models, e.g. to resolve references into them; they are
+    read, never written. Locations under ``${server.config.dir}`` and
+    ``${shared.config.dir}`` are resolved, as are directories; others with
+    variables, URLs and files that do not exist are skipped.
+    """
+    variables = {
+        '${server.config.dir}': server_dir,
+        '${shared.config.dir}': os.path.join(server_dir, os.pardir, os.pardir, 'shared', 'config'),
+    }
+    roots = []
+    seen = set()
+    pending = [(model, server_dir)]
+    while pending:
+        parent, parent_dir = pending.pop(0)
+        for child in parent.children():
+            if not isinstance(child, GenericElement) or child.tag != INCLUDE or is_fragment_include(child):
+                continue
+            location = child.get('location') or ''
+            for variable, value in variables.items():
+                location = location.replace(variable, value)
+            if '${' in location or '://' in location:
+                continue
+            path = os.path.join(parent_dir, location)
+            if os.path.isdir(path):
+                paths = sorted(glob.glob(os.path.join(path, '*.xml')))
+            else:
+                paths = [path]
+            for path in paths:
+                real_path = os.path.realpath(path)
+                if real_path in seen or not os.path.isfile(path):
+                    continue
+                seen.add(real_path)
+                root = Builder().build(path)
+                roots.append(root)
+                pending.append((root, os.path.dirname(path)))
+    return roots
+
+
+def load_fragments(model, server_dir):
+    """Replaces the fragment includes of a server model by the elements of their fragments.
+
+    Returns the loaded Fragments by location. Includes of files that do not
+    exist are left as they are.
+    """
+    fragments = collections.OrderedDict()
+    for child in list(model.children()):
+        if is_fragment_include(child):
+            location = child.get('location')
+            path = os.path.join(server_dir, *location.split('/'))
+            if os.path.exists(path):
+                root = Builder().build(path)
+                fragments[location] = Fragment(location, child, root)
+                model.replace(child, root.children())
+    return fragments
+
+
+def output_sharded(model, server_dir, fragments, policy):
+    """Splits a server model into server.xml and include fragments.
+
+    Returns the content of each file by path, server.xml last, the
+    Fragments now included by location and the paths of fragments no longer
+    included. Unchanged elements keep their original text, whether they stay
+    in server.xml or were read from a fragment, so unchanged files come out
+    byte for byte as they were read.
+    """
+    main_children = []
+    includes = {}
+    fragment_children = collections.OrderedDict()
+    for child in model.children():
+        name = policy.get_fragment(child)
+        if name is None:
+            main_children.append(child)
+            continue
+        location = '{0}/{1}'.format(FRAGMENT_DIR, name)
+        if location not in fragment_children:
+            fragment_children[location] = []
+            fragment = fragments.get(location)
+            if fragment is not None:
+                include = fragment.include
+            else:
+                include = GenericElement(INCLUDE)
+                include.set('location', location)
+            includes[location] = len(main_children)
+            main_children.append(include)
+        fragment_children[location].append(child)
+
+    contents = collections.OrderedDict()
+    written = collections.OrderedDict()
+    for location, children in fragment_children.items():
+        fragment = fragments.get(location)
+        if fragment is None:
+            fragment = Fragment(location, main_children[includes[location]], None)
+        if fragment.root is not None:
+            content = XmlOutputter().output(fragment.root.clone(children))
+        else:
+            content = _DECLARATION + XmlOutputter().output(ServerModel().clone(children))
+        contents[os.path.join(server_dir, *location.split('/'))] = content
+        written[location] = fragment
+    contents[os.path.join(server_dir, 'server.xml')] = XmlOutputter().output(model.clone(main_children))
+
+    stale = [os.path.join(server_dir, *location.split('/')) for location in fragments if location not in fragment_children]
+    return contents, written, stale
+
@@ -0,0 +1,197 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import multiprocessing
+import os
+import re
+
+from serverxml import Datasource, ManagedExecutorService
+from sharding import load_server_xml
+
+
+_MB = 1024 * 1024
+_SIZE = re.compile(r'^(\d+)([kKmMgGtT]?)$')
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': _MB, 'g': 1024 * _MB, 't': 1024 * 1024 * _MB}
+# Heap budgeted for every request thread when capping maxThreads.
+_HEAP_PER_THREAD = 8 * _MB
+# Share of the host memory the heaps of all servers may take; the rest is
+# left to native JVM memory and the operating system.
+_HEAP_SHARE = 0.8
+_MIN_POOL_SIZE = 5
+
+
+class HostInfo(object):
+
+    def __init__(self, cpus, memory):
+        self.cpus = cpus
+        self.memory = memory
+
+    @classmethod
+    def read(cls, proc_dir='/proc'):
+        """Reads the logical CPU count and the total memory in bytes from ``/proc``."""
+        cpus = 0
+        try:
+            with open(os.path.join(proc_dir, 'cpuinfo'), 'r') as f:
+                for line in f:
+                    if line.startswith('processor'):
+                        cpus += 1
+        except IOError:
+            pass
+        if cpus == 0:
+            cpus = multiprocessing.cpu_count()
+
+        memory = None
+        with open(os.path.join(proc_dir, 'meminfo'), 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    memory = int(line.split()[1]) * 1024
+                    break
+        if memory is None:
+            raise LibertySizingException('No MemTotal in {0}/meminfo.'.format(proc_dir))
+        return cls(cpus, memory)
+
+
+def parse_size(text):
+    """Converts a JVM size such as ``512m`` or ``2g`` to bytes."""
+    match = _SIZE.match(text.strip())
+    if match is None:
+        raise LibertySizingException("Invalid size '{0}'.".format(text))
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).lower()]
+
+
+def read_heap(jvm_options):
+    """Returns the maximum heap set with ``-Xmx`` in a jvm.options file, or None.
+
+    The last setting wins, as it does for the JVM.
+    """
+    heap = None
+    if jvm_options is None or not os.path.exists(jvm_options):
+        return heap
+    with open(jvm_options, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('-Xmx'):
+                heap = parse_size(line[len('-Xmx'):])
+    return heap
+
+
+class ServerSizing(object):
+    """The executor, connection pool and concurrency policy sizes proposed for one server.
+
+    ``pools`` maps datasource JNDI names to ``(min_pool_size, max_pool_size)``
+    and ``concurrency`` managed executor JNDI names to a policy maximum.
+    """
+
+    def __init__(self, name, heap, core_threads, max_threads):
+        self.name = name
+        self.heap = heap
+        self.core_threads = core_threads
+        self.max_threads = max_threads
+        self.pools = {}
+        self.concurrency = {}
+
+    def __repr__(self):
+        return 'ServerSizing({0!r}, core_threads={1}, max_threads={2})'.format(self.name, self.core_threads, self.max_threads)
+
+
+class SizingReport(object):
+
+    def __init__(self, host, servers, warnings):
+        self.host = host
+        self.servers = servers
+        self.warnings = warnings
+
+    def get(self, name):
+        for sizing in self.servers:
+            if sizing.name == name:
+                return sizing
+
+    def format(self):
+        lines = ['host: {0} cpus, {1} MB'.format(self.host.cpus, self.host.memory // _MB)]
+        for sizing in self.servers:
+            lines.append('{0}: heap {1} MB, executor {2}/{3} threads'.format(
+                sizing.name, sizing.heap // _MB, sizing.core_threads, sizing.max_threads))
+            for jndi_name, (min_pool_size, max_pool_size) in sorted(sizing.pools.items()):
+                lines.append('    dataSource {0}: pool {1}..{2}'.format(jndi_name, min_pool_size, max_pool_size))
+            for jndi_name, max_concurrency in sorted(sizing.concurrency.items()):
+                lines.append('    managedExecutorService {0}: max {1}'.format(jndi_name, max_concurrency))
+        lines.extend('WARNING: ' + warning for warning in self.warnings)
+        return '\n'.join(lines)
+
+
+class SizingAdvisor(object):
+    """Proposes consistent thread and pool sizes for the servers sharing a host.
+
+    Every server gets an equal share of the CPUs: ``coreThreads`` is twice
+    its share, as Liberty's own default is for a whole host, and
+    ``maxThreads`` four times that, capped by the heap. The datasources of a
+    server split ``maxThreads`` evenly between their pools, which assumes a
+    request holds one connection at a time; requests that keep connections
+    to several datasources open at once may wait for one. Concurrency
+    policies are limited to half the core threads so that asynchronous work
+    cannot starve requests.
+    Servers without ``-Xmx`` are assumed to use the JVM default of a quarter
+    of the host memory.
+    """
+
+    def __init__(self, host=None):
+        if host is None:
+            host = HostInfo.read()
+        self._host = host
+
+    def advise(self, liberty, names=None):
+        if names is None:
+            names = liberty.servers()
+        servers = []
+        for name in names:
+            server = liberty.get_server(name)
+            servers.append((name, load_server_xml(server.get_server_xml())[0], read_heap(server.get_jvm_options())))
+        return self.advise_models(servers)
+
+    def advise_models(self, servers):
+        """Sizes ``[(name, ServerModel, heap or None)]`` sharing the host."""
+        host = self._host
+        warnings = []
+        if not servers:
+            return SizingReport(host, [], warnings)
+
+        share = float(host.cpus) / len(servers)
+        if share < 1:
+            warnings.append('{0} servers share {1} cpus.'.format(len(servers), host.cpus))
+
+        result = []
+        total_heap = 0
+        for name, model, heap in servers:
+            if heap is None:
+                heap = host.memory // 4
+            total_heap += heap
+
+            core_threads = max(2, int(round(2 * share)))
+            max_threads = max(core_threads, min(core_threads * 4, heap // _HEAP_PER_THREAD))
+            sizing = ServerSizing(name, heap, core_threads, max_threads)
+
+            datasources = [datasource.jndi for datasource in model.find_all(Datasource) if datasource.jndi]
+            if datasources:
+                max_pool_size = max(_MIN_POOL_SIZE, max_threads // len(datasources))
+                for jndi_name in datasources:
+                    sizing.pools[jndi_name] = (max(1, max_pool_size // 4), max_pool_size)
+            for executor_service in model.find_all(ManagedExecutorService):
+                if executor_service.jndi_name:
+                    sizing.concurrency[executor_service.jndi_name] = max(1, core_threads // 2)
+            result.append(sizing)
+
+        if total_heap > host.memory * _HEAP_SHARE:
+            warnings.append('The heaps add up to {0} MB, more than {1:.0%} of the {2} MB of memory.'.format(
+                total_heap // _MB, _HEAP_SHARE, host.memory // _MB))
+        return SizingReport(host, result, warnings)
+
+
+class LibertySizingException (Exception):
+    pass
@@ -0,0 +1,317 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import calendar
+import glob
+import json
+import os
+import re
+
+import instrument
+
+
+LAUNCHED = 'CWWKE0001I'
+FEATURE_UPDATE_STARTED = 'CWWKF0007I'
+FEATURES_INSTALLED = 'CWWKF0012I'
+APPLICATION_STARTING = 'CWWKZ0018I'
+APPLICATION_STARTED = 'CWWKZ0001I'
+PORT_LISTENING = 'CWWKO0219I'
+READY = 'CWWKF0011I'
+HISTORY_SIZE = 50
+
+_CODES = (LAUNCHED, FEATURE_UPDATE_STARTED, FEATURES_INSTALLED, APPLICATION_STARTING, APPLICATION_STARTED, PORT_LISTENING, READY)
+_LINE = re.compile(r'^\[([^\]]+)\].*?\b(CWWK[A-Z]\d{4}[A-Z]): (.*)$')
+# The default en_US format, e.g. 3/10/16 10:21:31:123 EST, and ISO 8601.
+_US_STAMP = re.compile(r'^(\d+)/(\d+)/(\d+),? (\d+):(\d+):(\d+)[:.,](\d+)')
+_ISO_STAMP = re.compile(r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)[.,:](\d+)')
+_APPLICATION = re.compile(r'[Aa]pplication (\S+) started in ([\d.,]+) seconds')
+_STARTING = re.compile(r'[Ss]tarting application (\S+?)\.?\s*$')
+_PORT = re.compile(r'port (\d+)')
+_FEATURES = re.compile(r'\[(.*)\]')
+
+
+class StartupProfile(object):
+    """Where the time went in one start of a server, in seconds since it was launched."""
+
+    def __init__(self, server_name, launched):
+        self.server_name = server_name
+        # Seconds since the epoch, taking the log timestamps as UTC.
+        self.launched = launched
+        self.kernel = None
+        self.features = None
+        self.installed_features = []
+        self.applications = {}
+        self.ports = {}
+        self.ready = None
+
+    def is_complete(self):
+        return self.ready is not None
+
+    def phases(self):
+        """Seconds spent in 'kernel', 'features', 'ports' and each 'app:<name>'."""
+        phases = {}
+        if self.kernel is not None:
+            phases['kernel'] = self.kernel
+        if self.features is not None:
+            phases['features'] = self.features
+        if self.ports:
+            phases['ports'] = max(0.0, max(self.ports.values()) - (self.kernel or 0.0))
+        for name, seconds in self.applications.items():
+            phases['app:' + name] = seconds
+        return phases
+
+    def slowest_phase(self):
+        phases = self.phases()
+        if not phases:
+            return None, None
+        name = max(sorted(phases), key=lambda name: phases[name])
+        return name, phases[name]
+
+    def diff(self, older):
+        """A StartupDiff of what changed since an ``older`` start of the same server."""
+        return StartupDiff(older, self)
+
+    def to_json(self):
+        return {'server': self.server_name, 'launched': self.launched, 'kernel': self.kernel, 'features': self.features,
+                'installed_features': self.installed_features, 'applications': self.applications,
+                'ports': dict((str(port), seconds) for port, seconds in self.ports.items()), 'ready': self.ready}
+
+    @staticmethod
+    def from_json(value):
+        profile = StartupProfile(value['server'], value['launched'])
+        profile.kernel = value['kernel']
+        profile.features = value['features']
+        profile.installed_features = value['installed_features']
+        profile.applications = value['applications']
+        profile.ports = dict((int(port), seconds) for port, seconds in value['ports'].items())
+        profile.ready = value['ready']
+        return profile
+
+    def format(self):
+        lines = ['{0}: {1}'.format(self.server_name, 'ready in {0:.3f} s'.format(self.ready) if self.is_complete() else 'not ready')]
+        for name, seconds in sorted(self.phases().items(), key=lambda item: -item[1]):
+            lines.append('    {0:<40}{1:>10.3f} s'.format(name, seconds))
+        return '\n'.join(lines)
+
+
+class StartupDiff(object):
+
+    def __init__(self, older, newer):
+        self.older = older
+        self.newer = newer
+        old_phases = older.phases()
+        new_phases = newer.phases()
+        # [(phase, seconds before or None, seconds after or None)], the biggest change first
+        self.changes = sorted(((name, old_phases.get(name), new_phases.get(name)) for name in set(old_phases) | set(new_phases)),
+                              key=lambda change: (-abs((change[2] or 0.0) - (change[1] or 0.0)), change[0]))
+        self.added_features = sorted(set(newer.installed_features) - set(older.installed_features))
+        self.removed_features = sorted(set(older.installed_features) - set(newer.installed_features))
+
+    def get_delta(self):
+        if not (self.older.is_complete() and self.newer.is_complete()):
+            return None
+        return self.newer.ready - self.older.ready
+
+    def format(self):
+        delta = self.get_delta()
+        lines = ['{0}: {1}'.format(self.newer.server_name, 'incomplete start' if delta is None else '{0:+.3f} s'.format(delta))]
+        if self.added_features:
+            lines.append('    features added: {0}'.format(', '.join(self.added_features)))
+        if self.removed_features:
+            lines.append('    features removed: {0}'.format(', '.join(self.removed_features)))
+        for name, before, after in self.changes:
+            lines.append('    {0:<40}{1:>10}{2:>10}{3:>+10.3f}'.format(
+                name, _seconds(before), _seconds(after), (after or 0.0) - (before or 0.0)))
+        return '\n'.join(lines)
+
+
+class StartupRanking(object):
+
+    def __init__(self, profiles):
+        # [(server name, slowest phase, seconds, ready)], the slowest first
+        entries = []
+        for profile in profiles:
+            phase, seconds = profile.slowest_phase()
+            if phase is not None:
+                entries.append((profile.server_name, phase, seconds, profile.ready))
+        self.entries = sorted(entries, key=lambda entry: (-entry[2], entry[0]))
+
+    def format(self):
+        lines = ['{0:<24}{1:<40}{2:>10}{3:>10}'.format('server', 'slowest phase', 'seconds', 'ready')]
+        for server_name, phase, seconds, ready in self.entries:
+            lines.append('{0:<24}{1:<40}{2:>10.3f}{3:>10}'.format(server_name, phase, seconds, _seconds(ready)))
+        return '\n'.join(lines)
+
+
+class StartupAnalyzer(object):
+    """Profiles server starts from the message codes in ``messages.log``.
+
+    Every start found in the current and rotated logs is kept in a history
+    file in the toolkit directory of the server, so starts remain
+    comparable after their logs are gone.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._history_size = history_size
+
+    def analyze(self, liberty_server):
+        """Returns the profiles of all known starts of a server, the latest last."""
+        with instrument.span('startup.analyze', server=liberty_server.get_name()):
+            profiles = {}
+            history_file = os.path.join(liberty_server.get_toolkit_dir(), 'startup-history.json')
+            for profile in _load(history_file):
+                profiles[profile.launched] = profile
+            for path in _message_logs(liberty_server):
+                with open(path, 'r') as f:
+                    for profile in parse_messages(f, liberty_server.get_name()):
+                        profiles[profile.launched] = profile
+
+            history = [profiles[launched] for launched in sorted(profiles)][-self._history_size:]
+            _save(history_file, history)
+        return history
+
+    def rank(self, liberty_servers):
+        """A StartupRanking of the latest complete start of each server."""
+        latest = []
+        for liberty_server in liberty_servers:
+            complete = [profile for profile in self.analyze(liberty_server) if profile.is_complete()]
+            if complete:
+                latest.append(complete[-1])
+        return StartupRanking(latest)
+
+
+def parse_messages(lines, server_name=None):
+    """Returns a StartupProfile for each start found in the lines of a messages.log."""
+    profiles = []
+    profile = launched = None
+    feature_update = None
+    starting = {}
+    running = []
+    for line in lines:
+        if 'CWWK' not in line:
+            continue
+        match = _LINE.match(line)
+        if match is None or match.group(2) not in _CODES:
+            continue
+        stamp = parse_timestamp(match.group(1))
+        if stamp is None:
+            continue
+        code, message = match.group(2), match.group(3)
+
+        if code == LAUNCHED:
+            profile = StartupProfile(server_name, stamp)
+            profiles.append(profile)
+            launched = stamp
+            feature_update = None
+            starting = {}
+            running = []
+            continue
+        if profile is None or profile.is_complete():
+            continue
+
+        offset = stamp - launched
+        if profile.kernel is None:
+            # The kernel is up once anything else happens.
+            profile.kernel = offset
+        if code == FEATURE_UPDATE_STARTED:
+            feature_update = offset
+        elif code == FEATURES_INSTALLED:
+            # Applications start while features are installed, their time is their own.
+            start = feature_update if feature_update is not None else profile.kernel
+            profile.features = offset - start - _overlap(running, start, offset)
+            features = _FEATURES.search(message)
+            if features:
+                profile.installed_features = sorted(name.strip() for name in features.group(1).split(',') if name.strip())
+        elif code == APPLICATION_STARTING:
+            name = _STARTING.search(message)
+            if name:
+                starting[name.group(1)] = offset
+        elif code == APPLICATION_STARTED:
+            application = _APPLICATION.search(message)
+            if application:
+                name = application.group(1)
+                seconds = _float(application.group(2))
+                if seconds is None and name in starting:
+                    seconds = offset - starting[name]
+                profile.applications[name] = seconds if seconds is not None else 0.0
+                running.append((starting.get(name, offset - profile.applications[name]), offset))
+        elif code == PORT_LISTENING:
+            port = _PORT.search(message)
+            if port:
+                profile.ports[int(port.group(1))] = offset
+        elif code == READY:
+            profile.ready = offset
+    return profiles
+
+
+def parse_timestamp(stamp):
+    """Seconds since the epoch of a messages.log timestamp, ignoring its time zone."""
+    match = _US_STAMP.match(stamp)
+    if match:
+        month, day, year, hour, minute, second, fraction = match.groups()
+        if len(year) == 2:
+            year = '20' + year
+    else:
+        match = _ISO_STAMP.match(stamp)
+        if match is None:
+            return None
+        year, month, day, hour, minute, second, fraction = match.groups()
+    try:
+        epoch = calendar.timegm((int(year), int(month), int(day), int(hour), int(minute), int(second)))
+    except ValueError:
+        return None
+    return epoch + int(fraction) / float(10 ** len(fraction))
+
+
+def _overlap(intervals, start, end):
+    """The time within ``start`` and ``end`` covered by any of the intervals."""
+    covered = 0.0
+    position = start
+    for interval_start, interval_end in sorted(intervals):
+        interval_start = max(interval_start, position)
+        interval_end = min(interval_end, end)
+        if interval_end > interval_start:
+            covered += interval_end - interval_start
+            position = interval_end
+    return covered
+
+
+def _message_logs(liberty_server):
+    logs_dir = os.path.join(liberty_server.get_output_dir(), 'logs')
+    return sorted(glob.glob(os.path.join(logs_dir, 'messages_*.log'))) + glob.glob(os.path.join(logs_dir, 'messages.log'))
+
+
+def _load(history_file):
+    try:
+        with open(history_file, 'r') as f:
+            return [StartupProfile.from_json(value) for value in json.load(f)]
+    except (IOError, ValueError, KeyError):
+        return []
+
+
+def _save(history_file, history):
+    directory = os.path.dirname(history_file)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_file = history_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump([profile.to_json() for profile in history], f)
+    os.rename(tmp_file, history_file)
+
+
+def _float(value):
+    try:
+        return float(value.replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _seconds(value):
+    return '-' if value is None else '{0:.3f}'.format(value)
@@ -0,0 +1,132 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import os
+
+
+RUNNING = 'running'
+STOPPED = 'stopped'
+
+_TCP_LISTEN = '0A'
+_PID_REUSE_SLACK = 5.0
+
+
+class ServerStatus(object):
+
+    def __init__(self, name, state, pid=None, ports=None):
+        self.name = name
+        self.state = state
+        self.pid = pid
+        self.ports = ports or []
+        self.confirmed = False
+
+    def is_running(self):
+        return self.state == RUNNING
+
+    def __repr__(self):
+        return 'ServerStatus({0!r}, {1!r}, pid={2!r}, ports={3!r})'.format(self.name, self.state, self.pid, self.ports)
+
+
+class ProcInspector(object):
+    """Reads process liveness and listening sockets from ``/proc``.
+
+    The socket tables are read once per inspector, so one inspector should be
+    shared when checking many servers.
+    """
+
+    def __init__(self, proc_dir='/proc'):
+        self._proc_dir = proc_dir
+        self._listening = None
+        self._boot_time = None
+        self._clock_ticks = None
+
+    def inspect(self, name, pid_file):
+        pid = read_pid(pid_file)
+        if pid is None or not self.is_alive(pid, os.path.getmtime(pid_file)):
+            return ServerStatus(name, STOPPED)
+        return ServerStatus(name, RUNNING, pid, self.listening_ports(pid))
+
+    def is_alive(self, pid, started_before=None):
+        stat = self._read_stat(pid)
+        if stat is None or stat[0] == 'Z':
+            return False
+        if started_before is not None:
+            # A process started well after the pid file was written reuses a recycled pid.
+            start_time = self._start_time(stat)
+            if start_time is not None and start_time > started_before + _PID_REUSE_SLACK:
+                return False
+        return True
+
+    def listening_ports(self, pid):
+        if self._listening is None:
+            self._listening = {}
+            for table in ('tcp', 'tcp6'):
+                self._listening.update(self._read_listening(os.path.join(self._proc_dir, 'net', table)))
+
+        ports = set()
+        fd_dir = os.path.join(self._proc_dir, str(pid), 'fd')
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            return []
+        for fd in fds:
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if target.startswith('socket:['):
+                port = self._listening.get(target[8:-1])
+                if port is not None:
+                    ports.add(port)
+        return sorted(ports)
+
+    def _read_listening(self, table):
+        result = {}
+        try:
+            with open(table, 'r') as f:
+                lines = f.readlines()[1:]
+        except IOError:
+            return result
+        for line in lines:
+            fields = line.split()
+            if len(fields) > 9 and fields[3] == _TCP_LISTEN:
+                result[fields[9]] = int(fields[1].rsplit(':', 1)[1], 16)
+        return result
+
+    def _read_stat(self, pid):
+        try:
+            with open(os.path.join(self._proc_dir, str(pid), 'stat'), 'r') as f:
+                content = f.read()
+        except IOError:
+            return None
+        # The command name may contain spaces, the remaining fields follow its closing parenthesis.
+        return content[content.rindex(')') + 2:].split()
+
+    def _start_time(self, stat):
+        if self._boot_time is None:
+            try:
+                with open(os.path.join(self._proc_dir, 'stat'), 'r') as f:
+                    for line in f:
+                        if line.startswith('btime '):
+                            self._boot_time = int(line.split()[1])
+                self._clock_ticks = os.sysconf('SC_CLK_TCK')
+            except (IOError, ValueError, OSError):
+                return None
+        if self._boot_time is None:
+            return None
+        return self._boot_time + float(stat[19]) / self._clock_ticks
+
+
+def read_pid(pid_file):
+    try:
+        with open(pid_file, 'r') as f:
+            return int(f.read().strip())
+    except (IOError, ValueError):
+        return None
@@ -0,0 +1,179 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import multiprocessing
+import os
+
+import instrument
+from sharding import load_server_xml, load_includes
+
+
+MISSING_REFERENCE = 'missing-reference'
+WRONG_REFERENCE_TYPE = 'wrong-reference-type'
+
+_REF_SUFFIX = 'Ref'
+# Reference attributes whose target element is not simply the attribute name without 'Ref'.
+_REF_TARGETS = {
+    'commonLibraryRef': 'library',
+    'privateLibraryRef': 'library',
+    'trustStoreRef': 'keyStore',
+    'containerAuthDataRef': 'authData',
+    'recoveryAuthDataRef': 'authData',
+    'accessLoggingRef': 'httpAccessLogging',
+    'loginModuleRef': 'jaasLoginModule',
+    'keyStoreRef': 'keyStore',
+    'sslRef': 'ssl',
+    'outboundSSLRef': 'ssl',
+    'longRunningPolicyRef': 'concurrencyPolicy',
+    'taskStoreRef': 'databaseStore',
+    'classProviderRef': 'resourceAdapter',
+}
+
+
+class ValidationIssue(object):
+
+    def __init__(self, kind, message, element_name, element_id=None):
+        self.kind = kind
+        self.message = message
+        self.element_name = element_name
+        self.element_id = element_id
+
+    def __repr__(self):
+        return 'ValidationIssue({0!r}, {1!r})'.format(self.kind, self.message)
+
+
+class ValidationReport(object):
+
+    def __init__(self, issues, source=None):
+        self.issues = issues
+        self.source = source
+
+    def is_valid(self):
+        return not self.issues
+
+    def format(self):
+        prefix = '{0}: '.format(self.source) if self.source else ''
+        return '\n'.join('{0}{1}: {2}'.format(prefix, issue.kind, issue.message) for issue in self.issues)
+
+
+class IdIndex(object):
+    """Every element with an id, and every ``*Ref`` attribute, found in one traversal.
+
+    As in Liberty, ids are scoped by element type, and the elements of one
+    type with the same id are merged: a reference attribute set on several of
+    them counts once, with the value of the last one.
+    """
+
+    def __init__(self, models):
+        # {(element name, id): [elements]}
+        self.ids = {}
+        # {id: [element names]}
+        self.types = {}
+        self.references = []
+        merged = {}
+        stack = list(reversed(models))
+        while stack:
+            model = stack.pop()
+            id_ = model.id
+            if id_ is not None:
+                elements = self.ids.setdefault((model.get_element_name(), id_), [])
+                if not elements:
+                    self.types.setdefault(id_, []).append(model.get_element_name())
+                elements.append(model)
+            for key, value in model.attributes.items():
+                if not key.endswith(_REF_SUFFIX):
+                    continue
+                if id_ is None:
+                    if value:
+                        self.references.append((model, key, value))
+                    continue
+                slot = (model.get_element_name(), id_, key)
+                if slot in merged:
+                    first, _, _ = self.references[merged[slot]]
+                    self.references[merged[slot]] = (first, key, value)
+                else:
+                    merged[slot] = len(self.references)
+                    self.references.append((model, key, value))
+            stack.extend(reversed(model.children()))
+        self.references = [(model, key, value) for model, key, value in self.references if value]
+
+    def get(self, element_name, id_):
+        models = self.ids.get((element_name, id_))
+        if models:
+            return models[0]
+
+    def find_all(self, id_):
+        """The elements with an id, whatever their type."""
+        return [model for element_name in self.types.get(id_, ()) for model in self.ids[(element_name, id_)]]
+
+
+class ConfigValidator(object):
+    """Checks that every ``*Ref`` attribute points to an element of the right kind.
+
+    References are resolved against the models given together, so the
+    files pulled in by ``<include>`` should be passed along with server.xml.
+    Values containing ``${...}`` variables are not checked.
+    """
+
+    def validate(self, *models):
+        with instrument.span('validator.validate'):
+            index = IdIndex(models)
+            issues = []
+            for model, key, value in index.references:
+                if '${' in value:
+                    continue
+                expected = _REF_TARGETS.get(key, key[:-len(_REF_SUFFIX)])
+                for ref in value.split(','):
+                    ref = ref.strip()
+                    if not ref:
+                        continue
+                    if index.get(expected, ref) is not None:
+                        continue
+                    types = index.types.get(ref)
+                    if not types:
+                        issues.append(ValidationIssue(MISSING_REFERENCE, "{0} {1}='{2}' does not match any element id".format(
+                            _describe(model), key, ref), model.get_element_name(), model.id))
+                    else:
+                        issues.append(ValidationIssue(WRONG_REFERENCE_TYPE, "{0} {1}='{2}' points to a {3}, not a {4}".format(
+                            _describe(model), key, ref, ' or '.join(types), expected), model.get_element_name(), model.id))
+        return ValidationReport(issues)
+
+
+def validate_file(xml_file):
+    model = load_server_xml(xml_file)[0]
+    report = ConfigValidator().validate(model, *load_includes(model, os.path.dirname(xml_file)))
+    report.source = xml_file
+    return report
+
+
+def validate_servers(liberty, names=None, processes=None):
+    """Validates the server.xml of the given servers of a Liberty home in parallel processes.
+
+    Returns ``{server_name: ValidationReport}``.
+    """
+    if names is None:
+        names = liberty.servers()
+    xml_files = [os.path.join(liberty.get_home(), 'usr', 'servers', name, 'server.xml') for name in names]
+    if len(xml_files) < 2:
+        return dict(zip(names, map(validate_file, xml_files)))
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        reports = pool.map(validate_file, xml_files)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(names, reports))
+
+
+def _describe(model):
+    if model.id is not None:
+        return "<{0} id='{1}'>".format(model.get_element_name(), model.id)
+    return '<{0}>'.format(model.get_element_name())
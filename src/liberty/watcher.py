@@ -0,0 +1,432 @@
+#
+# IBM Confidential
+# OCO Source Materials
+# 5725-B69
+# Copyright IBM Corp. 2015
+# The source code for this program is not published or otherwise
+# divested of its trade secrets, irrespective of what has
+# been deposited with the U.S Copyright Office.
+#
+
+import collections
+import ctypes
+import ctypes.util
+import errno
+import os
+import Queue
+import select
+import struct
+import threading
+import time
+
+import instrument
+from serverxml import Builder, GenericElement
+
+
+ElementChange = collections.namedtuple('ElementChange', 'kind element')
+
+ADDED = 'added'
+MODIFIED = 'modified'
+REMOVED = 'removed'
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0x00000800
+_IN_CLOEXEC = 0x00080000
+_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class ServerWatcher(object):
+    """Keeps the parsed models of every server under a Liberty home up to date.
+
+    Changes are detected with inotify where available, otherwise by polling
+    file modification times. Events are coalesced until ``debounce`` seconds
+    pass without a new one, then only the files that changed are parsed again
+    and subscribers receive ``(server_name, [ElementChange, ...])``.
+    """
+
+    def __init__(self, liberty, debounce=0.2, poll_interval=2.0, use_inotify=True):
+        self._liberty = liberty
+        self._debounce = debounce
+        self._servers_dir = os.path.join(liberty.get_home(), 'usr', 'servers')
+        self._servers = {}
+        self._subscribers = []
+        self._queues = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self._backend = None
+        if use_inotify:
+            try:
+                self._backend = _InotifyBackend()
+            except (OSError, AttributeError):
+                self._backend = None
+        if self._backend is None:
+            self._backend = _PollingBackend(poll_interval)
+
+        self._backend.watch_dir(self._servers_dir)
+        self._sync_servers()
+
+    def uses_inotify(self):
+        return isinstance(self._backend, _InotifyBackend)
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def changes(self, timeout=None):
+        """Returns an iterator of ``(server_name, changes)`` tuples published from now on.
+
+        The iterator ends when the watcher stops, or after ``timeout`` seconds
+        without a change when a timeout is given.
+        """
+        queue = Queue.Queue()
+        with self._lock:
+            self._queues.append(queue)
+        return self._drain(queue, timeout)
+
+    def _drain(self, queue, timeout):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    item = queue.get(timeout=timeout if timeout is not None else 0.5)
+                except Queue.Empty:
+                    if timeout is not None:
+                        return
+                    continue
+                yield item
+        finally:
+            with self._lock:
+                self._queues.remove(queue)
+
+    def servers(self):
+        with self._lock:
+            return sorted(self._servers)
+
+    def get_model(self, server_name):
+        with self._lock:
+            server = self._servers.get(server_name)
+            if server is not None:
+                return server.models.get(server.server_xml)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='liberty-server-watcher')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._backend.close()
+
+    def poll(self, timeout=0):
+        """Processes one burst of changes synchronously, returning what was published."""
+        paths = self._backend.wait(timeout)
+        if not paths:
+            return []
+
+        while True:
+            more = self._backend.wait(self._debounce)
+            if not more:
+                break
+            paths.update(more)
+
+        return self._process(paths)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.poll(0.5)
+
+    def _process(self, paths):
+        published = []
+        with instrument.span('watcher.process', paths=str(len(paths))):
+            with self._lock:
+                servers = dict(self._servers)
+                known_files = set()
+                for server in servers.values():
+                    known_files |= server.files()
+            if paths - known_files:
+                published.extend(self._sync_servers())
+
+            for name, server in sorted(servers.items()):
+                changes = []
+                # get_model reads the models of a server from other threads.
+                with self._lock:
+                    for path in sorted(server.files() & paths):
+                        changes.extend(server.reparse(path))
+                if changes:
+                    self._watch_includes(server)
+                    published.append((name, changes))
+
+        for item in published:
+            self._publish(item)
+        return published
+
+    def _sync_servers(self):
+        current = set()
+        if os.path.isdir(self._servers_dir):
+            current = set(self._liberty.servers())
+            for child in os.listdir(self._servers_dir):
+                self._backend.watch_dir(os.path.join(self._servers_dir, child))
+        published = []
+        with self._lock:
+            known = set(self._servers)
+        for name in sorted(current - known):
+            server = _WatchedServer(name, os.path.join(self._servers_dir, name))
+            with self._lock:
+                self._servers[name] = server
+            self._backend.watch_dir(server.home)
+            self._watch_includes(server)
+            model = server.models.get(server.server_xml)
+            if model is not None:
+                published.append((name, [ElementChange(ADDED, child) for child in model.children()]))
+        for name in sorted(known - current):
+            with self._lock:
+                server = self._servers.pop(name)
+            model = server.models.get(server.server_xml)
+            if model is not None:
+                published.append((name, [ElementChange(REMOVED, child) for child in model.children()]))
+        return published
+
+    def _watch_includes(self, server):
+        with self._lock:
+            files = server.files()
+        for path in files:
+            self._backend.watch_dir(os.path.dirname(path))
+            self._backend.watch_file(path)
+
+    def _publish(self, item):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            queues = list(self._queues)
+        for callback in subscribers:
+            callback(*item)
+        for queue in queues:
+            queue.put(item)
+
+
+class _WatchedServer(object):
+
+    def __init__(self, name, home):
+        self.name = name
+        self.home = home
+        self.server_xml = os.path.join(home, 'server.xml')
+        self.models = {}
+        self.signatures = {}
+        # server.xml and the files it includes, directly or not, whether they exist or not
+        self.reachable = set([self.server_xml])
+        self.reparse(self.server_xml)
+
+    def files(self):
+        return set(self.models) | self.reachable
+
+    def reparse(self, path):
+        """Parses a file again and returns its ElementChanges and those of the includes it added or dropped."""
+        return self._reparse(path) + self._sync_includes()
+
+    def _reparse(self, path):
+        model = None
+        if os.path.exists(path):
+            try:
+                model = Builder().build(path)
+            except Exception:
+                # A file caught in the middle of a write; the next event re-reads it.
+                return []
+
+        old_model = self.models.get(path)
+        old_signatures = self.signatures.get(path, {})
+        if model is None:
+            self.models.pop(path, None)
+            self.signatures.pop(path, None)
+            new_signatures = {}
+        else:
+            self.models[path] = model
+            new_signatures = _child_signatures(model)
+            self.signatures[path] = new_signatures
+
+        changes = []
+        new_children = _keyed_children(model) if model is not None else {}
+        old_children = _keyed_children(old_model) if old_model is not None else {}
+        for key, child in sorted(new_children.items()):
+            if key not in old_signatures:
+                changes.append(ElementChange(ADDED, child))
+            elif old_signatures[key] != new_signatures[key]:
+                changes.append(ElementChange(MODIFIED, child))
+        for key, child in sorted(old_children.items()):
+            if key not in new_signatures:
+                changes.append(ElementChange(REMOVED, child))
+        return changes
+
+    def _sync_includes(self):
+        changes = []
+        reachable = set([self.server_xml])
+        pending = [self.server_xml]
+        while pending:
+            for include in self._includes(self.models.get(pending.pop())):
+                if include not in reachable:
+                    reachable.add(include)
+                    if include not in self.models:
+                        changes.extend(self._reparse(include))
+                    pending.append(include)
+        self.reachable = reachable
+
+        for path in sorted(set(self.models) - reachable):
+            # No longer included: its elements are gone from the configuration.
+            self.signatures.pop(path, None)
+            changes.extend(ElementChange(REMOVED, child) for _, child in sorted(_keyed_children(self.models.pop(path)).items()))
+        return changes
+
+    def _includes(self, model):
+        result = []
+        if model is None:
+            return result
+        for child in model.children():
+            if isinstance(child, GenericElement) and child.tag == 'include' and child.get('location'):
+                result.append(self._resolve(child.get('location')))
+        return result
+
+    def _resolve(self, location):
+        user_dir = os.path.dirname(os.path.dirname(self.home))
+        variables = {
+            '${server.config.dir}': self.home,
+            '${server.output.dir}': self.home,
+            '${shared.config.dir}': os.path.join(user_dir, 'shared', 'config'),
+            '${wlp.user.dir}': user_dir,
+            '${wlp.install.dir}': os.path.dirname(user_dir),
+        }
+        for variable, value in variables.items():
+            location = location.replace(variable, value)
+        return os.path.normpath(os.path.join(self.home, location))
+
+
+def _keyed_children(model):
+    result = {}
+    counts = {}
+    for child in model.children():
+        name = child.get_element_name()
+        key = child.id
+        if key is None:
+            key = counts.get(name, 0)
+            counts[name] = key + 1
+        result[(name, key)] = child
+    return result
+
+
+def _child_signatures(model):
+    return dict((key, _signature(child)) for key, child in _keyed_children(model).items())
+
+
+def _signature(model):
+    return (model.get_element_name(), tuple(sorted(model.attributes.items())), model.value,
+            tuple(_signature(child) for child in model.children()))
+
+
+class _InotifyBackend(object):
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        self._wds = {}
+
+    def watch_dir(self, path):
+        if path in self._dirs or not os.path.isdir(path):
+            return
+        wd = self._add_watch(self._fd, path, _WATCH_MASK)
+        if wd >= 0:
+            self._dirs[path] = wd
+            self._wds[wd] = path
+
+    def watch_file(self, path):
+        # Files are observed through the events of their directory, which also catches atomic renames.
+        pass
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        paths = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip('\0')
+                offset += length
+                directory = self._wds.get(wd)
+                if directory is not None:
+                    paths.add(os.path.join(directory, name) if name else directory)
+        return paths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend(object):
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._stats = {}
+        self._last_scan = 0
+
+    def watch_dir(self, path):
+        self._stats.setdefault(path, self._stat(path))
+
+    def watch_file(self, path):
+        self._stats.setdefault(path, self._stat(path))
+
+    def wait(self, timeout):
+        delay = self._last_scan + self._interval - time.time()
+        if delay > 0:
+            if delay > timeout:
+                time.sleep(timeout)
+                return set()
+            time.sleep(delay)
+        self._last_scan = time.time()
+
+        changed = set()
+        for path, stat in self._stats.items():
+            current = self._stat(path)
+            if current != stat:
+                self._stats[path] = current
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size, st.st_ino)
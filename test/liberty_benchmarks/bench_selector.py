@@ -0,0 +1,110 @@
+"""Compares compiled selectors with hand-written traversals on large models.
+
+Run from the ``test`` directory with ``src`` on the ``PYTHONPATH``::
+
+    python -m liberty_benchmarks.bench_selector --scales medium,large --output selector.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from liberty_benchmarks.bench_serverxml import Timer, compare, DEFAULT_THRESHOLD
+from liberty_benchmarks.generator import SCALES, ServerXmlGenerator
+
+
+def _hand_datasource_props(model, Datasource, DB2JCCProp):
+    result = []
+    for datasource in model.find_all(Datasource):
+        prop = datasource.find(DB2JCCProp)
+        if prop is not None:
+            result.append(prop)
+    return result
+
+
+def _hand_user(model, BasicRegistry, User, name):
+    for user in model.find(BasicRegistry).find_all(User):
+        if user.name == name:
+            return user
+
+
+def _hand_by_id(model, id_):
+    stack = [model]
+    while stack:
+        node = stack.pop()
+        for child in node.children():
+            if child.id == id_:
+                return child
+            stack.append(child)
+
+
+def run_scale(scale, repeat):
+    from liberty.serverxml import Builder, Datasource, DB2JCCProp, BasicRegistry, User
+    from liberty.validator import IdIndex
+
+    generator = ServerXmlGenerator.for_scale(scale)
+    tmp_dir = tempfile.mkdtemp(prefix='liberty-bench-')
+    try:
+        model = Builder().build(generator.write(os.path.join(tmp_dir, 'server.xml')))
+    finally:
+        shutil.rmtree(tmp_dir)
+    index = IdIndex([model])
+    last_user = 'user{0}'.format(generator.users - 1)
+    last_ds = 'jdbc/ds{0}'.format(generator.datasources - 1)
+
+    cases = [
+        ('props/hand', lambda: _hand_datasource_props(model, Datasource, DB2JCCProp)),
+        ('props/select', lambda: list(model.select('dataSource/properties.db2.jcc'))),
+        ('user/hand', lambda: _hand_user(model, BasicRegistry, User, last_user)),
+        ('user/select', lambda: model.select_one("basicRegistry/user[@name='{0}']".format(last_user))),
+        ('id/hand', lambda: _hand_by_id(model, last_ds)),
+        ('id/select', lambda: model.select_one("//*[@id='{0}']".format(last_ds))),
+        ('id/select_indexed', lambda: model.select_one("//*[@id='{0}']".format(last_ds), index)),
+    ]
+
+    results = {}
+    for name, func in cases:
+        timer = Timer(name)
+        timer.measure(func, repeat)
+        summary = timer.summary()
+        summary['elements'] = generator.element_count()
+        results['{0}/{1}'.format(scale, name)] = summary
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark selectors against hand-written traversals.')
+    parser.add_argument('--scales', default='medium', help='comma separated scales out of: ' + ', '.join(sorted(SCALES)))
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = {'results': {}}
+    for scale in args.scales.split(','):
+        report['results'].update(run_scale(scale.strip(), args.repeat))
+
+    sys.stdout.write('{0:<32}{1:>12}{2:>12}\n'.format('case', 'p50 (ms)', 'p99 (ms)'))
+    for name, result in sorted(report['results'].items()):
+        sys.stdout.write('{0:<32}{1:>12.4f}{2:>12.4f}\n'.format(name, result['p50'] * 1000, result['p99'] * 1000))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for name, before, after in regressions:
+            sys.stdout.write('REGRESSION {0}: p50 {1:.4f} ms -> {2:.4f} ms\n'.format(name, before * 1000, after * 1000))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Benchmarks for the server.xml parse/serialize paths and AdminTask operations.
+
+Run from the ``test`` directory with ``src`` on the ``PYTHONPATH``::
+
+    python -m liberty_benchmarks.bench_serverxml --scales small,medium --output bench.json
+    python -m liberty_benchmarks.bench_serverxml --compare bench.json --threshold 0.25
+
+Each scale runs in a fresh child process so that the reported peak memory
+belongs to that scale alone.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+from liberty_benchmarks.generator import SCALES, ServerXmlGenerator, create_liberty_home
+
+
+DEFAULT_SCALES = ['small', 'medium']
+DEFAULT_THRESHOLD = 0.25
+_SERVER_NAME = 'benchServer'
+
+
+class Timer(object):
+
+    def __init__(self, name, units=1):
+        self.name = name
+        self.units = units
+        self.samples = []
+
+    def measure(self, func, repeat):
+        for _ in range(repeat):
+            start = timeit.default_timer()
+            func()
+            self.samples.append(timeit.default_timer() - start)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        total = sum(samples)
+        return {
+            'runs': len(samples),
+            'mean': total / len(samples),
+            'p50': percentile(samples, 50),
+            'p99': percentile(samples, 99),
+            'throughput': self.units * len(samples) / total if total else 0.0,
+        }
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    # Nearest-rank definition, so p99 of fewer than 100 samples is the maximum.
+    rank = int(math.ceil(pct / 100.0 * len(sorted_samples))) - 1
+    return sorted_samples[max(rank, 0)]
+
+
+def run_scale(scale, repeat):
+    # Imported here so the parent process stays free of the package state.
+    from liberty.liberty import Liberty
+    from liberty.serverxml import Builder, XmlOutputter
+
+    generator = ServerXmlGenerator.for_scale(scale)
+    elements = generator.element_count()
+    home = tempfile.mkdtemp(prefix='liberty-bench-')
+    try:
+        create_liberty_home(home, [_SERVER_NAME], generator)
+        server = Liberty(home).get_server(_SERVER_NAME)
+        xml_file = server.get_server_xml()
+        model = Builder().build(xml_file)
+
+        timers = []
+
+        timer = Timer('parse', elements)
+        timer.measure(lambda: Builder().build(xml_file), repeat)
+        timers.append(timer)
+
+        timer = Timer('serialize', elements)
+        timer.measure(lambda: XmlOutputter().output(model), repeat)
+        timers.append(timer)
+
+        admin_task = server.get_server_admin_task()
+        counter = [0]
+
+        def admin_ops():
+            counter[0] += 1
+            n = counter[0]
+            admin_task.add_features(['benchFeature{0}-1.0'.format(n)])
+            admin_task.create_user('benchUser{0}'.format(n), 'pwd')
+            admin_task.create_group('benchGroup{0}'.format(n))
+            admin_task.add_user_to_group('benchUser{0}'.format(n), 'benchGroup{0}'.format(n))
+            admin_task.get_ports()
+
+        timer = Timer('admin_ops', 5)
+        timer.measure(admin_ops, repeat)
+        timers.append(timer)
+
+        timer = Timer('save', elements)
+        timer.measure(admin_task.save, repeat)
+        timers.append(timer)
+
+        results = {}
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for timer in timers:
+            summary = timer.summary()
+            summary['elements'] = elements
+            summary['peak_rss_kb'] = peak_rss_kb
+            results['{0}/{1}'.format(scale, timer.name)] = summary
+        return results
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def run(scales, repeat):
+    results = {}
+    for scale in scales:
+        pool = multiprocessing.Pool(1)
+        try:
+            results.update(pool.apply(run_scale, (scale, repeat)))
+        finally:
+            pool.close()
+            pool.join()
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Returns the ``(name, baseline_p50, current_p50)`` of every case that regressed."""
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None or base['p50'] <= 0:
+            continue
+        if result['p50'] > base['p50'] * (1 + threshold):
+            regressions.append((name, base['p50'], result['p50']))
+    return regressions
+
+
+def _print_report(report):
+    sys.stdout.write('{0:<22}{1:>10}{2:>12}{3:>12}{4:>16}{5:>14}\n'.format(
+        'case', 'elements', 'p50 (ms)', 'p99 (ms)', 'elements/s', 'peak rss (kB)'))
+    for name, result in sorted(report['results'].items()):
+        sys.stdout.write('{0:<22}{1:>10}{2:>12.3f}{3:>12.3f}{4:>16.0f}{5:>14}\n'.format(
+            name, result['elements'], result['p50'] * 1000, result['p99'] * 1000,
+            result['throughput'], result['peak_rss_kb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark server.xml parsing, serialization and AdminTask.')
+    parser.add_argument('--scales', default=','.join(DEFAULT_SCALES),
+                        help='comma separated scales out of: ' + ', '.join(sorted(SCALES)))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative p50 slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    report = run([scale.strip() for scale in args.scales.split(',') if scale.strip()], args.repeat)
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, before, after in regressions:
+            sys.stdout.write('REGRESSION {0}: p50 {1:.3f} ms -> {2:.3f} ms\n'.format(name, before * 1000, after * 1000))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
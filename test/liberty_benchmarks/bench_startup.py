@@ -0,0 +1,99 @@
+"""Compares the latency of CLI calls answered by the daemon with calls run in-process.
+
+Every sample is a whole ``python -m liberty ... ports`` process, interpreter
+startup included. Run from the ``test`` directory with ``src`` on the
+``PYTHONPATH``::
+
+    python -m liberty_benchmarks.bench_startup --scales small,medium --output startup.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from liberty_benchmarks.bench_serverxml import Timer, compare, DEFAULT_THRESHOLD
+from liberty_benchmarks.generator import SCALES, ServerXmlGenerator, create_liberty_home
+
+
+_SERVER_NAME = 'benchServer'
+
+
+def _wait_for_socket(socket_path, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+            return
+        except socket.error:
+            time.sleep(0.05)
+        finally:
+            sock.close()
+    raise RuntimeError('The daemon did not start listening on {0}.'.format(socket_path))
+
+
+def run_scale(scale, repeat):
+    tmp_dir = tempfile.mkdtemp(prefix='liberty-bench-')
+    socket_path = os.path.join(tmp_dir, 'toolkit.sock')
+    liberty_home = create_liberty_home(os.path.join(tmp_dir, 'wlp'), [_SERVER_NAME], ServerXmlGenerator.for_scale(scale))
+    command = [sys.executable, '-m', 'liberty', '--home', liberty_home, '--socket', socket_path, 'ports', _SERVER_NAME]
+    devnull = open(os.devnull, 'w')
+    daemon = subprocess.Popen([sys.executable, '-m', 'liberty', '--socket', socket_path, 'daemon'])
+    try:
+        _wait_for_socket(socket_path)
+        # The first call parses server.xml in the daemon; later ones find it warm.
+        subprocess.check_call(command, stdout=devnull)
+
+        results = {}
+        for mode, argv in (('daemon', command), ('local', command[:3] + ['--local'] + command[3:])):
+            timer = Timer(mode)
+            timer.measure(lambda: subprocess.check_call(argv, stdout=devnull), repeat)
+            results['{0}/startup_{1}'.format(scale, mode)] = timer.summary()
+        return results
+    finally:
+        if subprocess.call([sys.executable, '-m', 'liberty', '--socket', socket_path, 'shutdown']) != 0:
+            daemon.terminate()
+        daemon.wait()
+        devnull.close()
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark CLI calls through the daemon against in-process calls.')
+    parser.add_argument('--scales', default='small', help='comma separated scales out of: ' + ', '.join(sorted(SCALES)))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to check the results against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = {'results': {}}
+    for scale in args.scales.split(','):
+        report['results'].update(run_scale(scale.strip(), args.repeat))
+
+    sys.stdout.write('{0:<32}{1:>12}{2:>12}\n'.format('case', 'p50 (ms)', 'p99 (ms)'))
+    for name, result in sorted(report['results'].items()):
+        sys.stdout.write('{0:<32}{1:>12.2f}{2:>12.2f}\n'.format(name, result['p50'] * 1000, result['p99'] * 1000))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for name, before, after in regressions:
+            sys.stdout.write('REGRESSION {0}: p50 {1:.2f} ms -> {2:.2f} ms\n'.format(name, before * 1000, after * 1000))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+
+
+SCALES = {
+    'small': {'features': 10, 'users': 100, 'groups': 10, 'datasources': 5, 'applications': 5, 'depth': 2},
+    'medium': {'features': 40, 'users': 2000, 'groups': 100, 'datasources': 50, 'applications': 50, 'depth': 4},
+    'large': {'features': 80, 'users': 20000, 'groups': 500, 'datasources': 200, 'applications': 200, 'depth': 8},
+}
+
+
+class ServerXmlGenerator(object):
+    """Writes deterministic synthetic server.xml files.
+
+    The element counts control the breadth of the document, ``depth`` the
+    number of nested ``library`` levels under every ``jdbcDriver``.
+    """
+
+    def __init__(self, features=10, users=100, groups=10, datasources=5, applications=5, depth=2):
+        self.features = features
+        self.users = users
+        self.groups = groups
+        self.datasources = datasources
+        self.applications = applications
+        self.depth = depth
+
+    @classmethod
+    def for_scale(cls, scale):
+        return cls(**SCALES[scale])
+
+    def element_count(self):
+        members_per_group = min(self.users, 10)
+        count = 1
+        count += 1 + self.features
+        count += 1
+        count += 1 + self.users + self.groups * (1 + members_per_group)
+        count += self.datasources * (1 + self.depth + 1 + 2)
+        count += self.applications * (1 + 1 + 2 * 2)
+        return count
+
+    def generate(self):
+        lines = ['<server description="benchmark server">']
+        self._feature_manager(lines)
+        lines.append('    <httpEndpoint id="defaultHttpEndpoint" host="*" httpPort="9080" httpsPort="9443" />')
+        self._basic_registry(lines)
+        self._datasources(lines)
+        self._applications(lines)
+        lines.append('</server>')
+        return '\n'.join(lines)
+
+    def write(self, xml_file):
+        parent = os.path.dirname(xml_file)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent)
+        with open(xml_file, 'w') as f:
+            f.write(self.generate())
+        return xml_file
+
+    def _feature_manager(self, lines):
+        lines.append('    <featureManager>')
+        for i in range(self.features):
+            lines.append('        <feature>feature{0}-1.0</feature>'.format(i))
+        lines.append('    </featureManager>')
+
+    def _basic_registry(self, lines):
+        lines.append('    <basicRegistry id="basic" realm="benchmarkRealm">')
+        for i in range(self.users):
+            lines.append('        <user name="user{0}" password="user{0}_pwd" />'.format(i))
+        members_per_group = min(self.users, 10)
+        for i in range(self.groups):
+            lines.append('        <group name="group{0}">'.format(i))
+            for j in range(members_per_group):
+                lines.append('            <member name="user{0}" />'.format((i * members_per_group + j) % self.users))
+            lines.append('        </group>')
+        lines.append('    </basicRegistry>')
+
+    def _datasources(self, lines):
+        for i in range(self.datasources):
+            indent = '    '
+            lines.append('{0}<jdbcDriver id="driver{1}" libraryRef="lib{1}_0">'.format(indent, i))
+            for level in range(self.depth):
+                indent += '    '
+                lines.append('{0}<library id="lib{1}_{2}">'.format(indent, i, level))
+            lines.append('{0}    <fileset dir="lib{1}" includes="*.jar" />'.format(indent, i))
+            for level in range(self.depth):
+                lines.append('{0}</library>'.format(indent))
+                indent = indent[:-4]
+            lines.append('{0}</jdbcDriver>'.format(indent))
+
+            lines.append('    <dataSource id="jdbc/ds{0}" jdbcDriverRef="driver{0}" jndiName="jdbc/ds{0}">'.format(i))
+            lines.append('        <properties.db2.jcc currentSchema="schema{0}" databaseName="db{0}" password="passw0rd" '
+                         'portNumber="{1}" serverName="dbhost{0}" user="dbuser" />'.format(i, 50000 + i))
+            lines.append('    </dataSource>')
+
+    def _applications(self, lines):
+        for i in range(self.applications):
+            lines.append('    <application id="app{0}" location="${{server.config.dir}}/apps/app{0}.war" '
+                         'name="app{0}" type="war">'.format(i))
+            lines.append('        <application-bnd>')
+            for role in ('administrators', 'deployers'):
+                lines.append('            <security-role name="{0}">'.format(role))
+                lines.append('                <group name="{0}" />'.format(role))
+                lines.append('            </security-role>')
+            lines.append('        </application-bnd>')
+            lines.append('    </application>')
+
+
+def create_liberty_home(root, server_names, generator):
+    """Lays out a minimal ``wlp`` tree whose servers all use the generated server.xml."""
+    for name in server_names:
+        server_dir = os.path.join(root, 'usr', 'servers', name)
+        generator.write(os.path.join(server_dir, 'server.xml'))
+        apps_dir = os.path.join(server_dir, 'apps')
+        if not os.path.isdir(apps_dir):
+            os.makedirs(apps_dir)
+    return root
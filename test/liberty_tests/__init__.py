@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty.liberty import Liberty
+
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def write_file(path, content):
+    """Writes ``content`` to ``path``, making its directory first, and returns ``path``."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+class LibertyTestCase(unittest.TestCase):
+    """Runs each test against its own copy of ``resources/wlp`` in a temporary directory."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._liberty_home = os.path.join(self._tmp_dir, 'wlp')
+        shutil.copytree(os.path.join(RESOURCES_DIR, 'wlp'), self._liberty_home)
+        self._servers_dir = os.path.join(self._liberty_home, 'usr', 'servers')
+        self._liberty = Liberty(self._liberty_home)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _copy_server(self, name, source='server1'):
+        shutil.copytree(os.path.join(self._servers_dir, source), os.path.join(self._servers_dir, name))
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty import accesslog
+from liberty.accesslog import AccessLogAnalyzer, LibertyAccessLogException, compile_format
+
+
+class TestAccessLogAnalyzer(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+        
+    def _write_log(self, name, entries):
+        path = os.path.join(self._tmp_dir, name)
+        with open(path, 'w') as f:
+            for minute, request, status, elapsed in entries:
+                f.write('127.0.0.1 - [10/Oct/2015:13:{0:02d}:36 +0200] "{1} HTTP/1.1" {2} 512 {3}\n'.format(
+                    minute, request, status, elapsed))
+        return path
+    
+    def test_compile_format(self):
+        pattern = compile_format('%h %{User-Agent}i "%r" %s %D')
+        match = pattern.match('10.0.0.1 curl/7.1 "GET /a?b=1 HTTP/1.1" 200 1500\n')
+        
+        self.assertEqual('GET /a?b=1 HTTP/1.1', match.group('request'))
+        self.assertEqual('1500', match.group('elapsed'))
+        self.assertRaises(LibertyAccessLogException, compile_format, '%h %r %s')
+        
+    def test_analyze(self):
+        entries = [(minute % 4, 'GET /app/items?page={0}'.format(minute), 200, (minute + 1) * 1000) for minute in range(100)]
+        entries += [(0, 'POST /app/items', 500, 250000), (1, 'POST /app/items', 201, 150000), (1, 'GET /app/items', 404, 10)]
+        path = self._write_log('http_access.log', entries)
+        with open(path, 'a') as f:
+            f.write('garbage\n')
+        
+        report = AccessLogAnalyzer(chunk_size=512).analyze([path])
+        
+        self.assertEqual(104, report.lines)
+        self.assertEqual(1, report.skipped)
+        items = report.get('GET', '/app/items')
+        self.assertEqual(101, items.count)
+        self.assertEqual(1, items.client_errors)
+        self.assertEqual(0.0, items.error_rate())
+        self.assertAlmostEqual(0.050, items.percentile(50), delta=0.050 * 0.05)
+        self.assertAlmostEqual(0.095, items.percentile(95), delta=0.095 * 0.05)
+        self.assertAlmostEqual(0.099, items.percentile(99), delta=0.099 * 0.05)
+        self.assertEqual(101 / 4.0, items.throughput())
+        self.assertEqual(0.5, report.get('POST', '/app/items').error_rate())
+        self.assertEqual(27, report.peak_throughput())
+        self.assertTrue('/app/items' in report.format())
+        
+    def test_rotated_files_in_parallel(self):
+        paths = [self._write_log('http_access_{0}.log'.format(i), [(i, 'GET /a', 200, 1000 * (i + 1))] * 10) for i in range(3)]
+        
+        report = AccessLogAnalyzer(processes=2).analyze(paths)
+        
+        stats = report.get('GET', '/a')
+        self.assertEqual(30, stats.count)
+        self.assertAlmostEqual(0.002, stats.percentile(50), delta=0.002 * 0.05)
+        self.assertEqual(10.0, stats.throughput())
+        self.assertEqual({1444474800: 10, 1444474860: 10, 1444474920: 10}, report.minutes)
+
+    @unittest.skipIf(accesslog.numpy is None, 'NumPy is not installed')
+    def test_numpy_histograms_match_the_pure_python_ones(self):
+        # Endpoints first seen in a later chunk make the NumPy counts grow.
+        entries = [(i % 60, 'GET /app/{0}'.format(i // 40), 200, (i * 7919) % 3000000) for i in range(200)]
+        path = self._write_log('http_access.log', entries)
+        
+        with_numpy = AccessLogAnalyzer(chunk_size=1024).analyze([path])
+        numpy = accesslog.numpy
+        accesslog.numpy = None
+        try:
+            without_numpy = AccessLogAnalyzer(chunk_size=1024).analyze([path])
+        finally:
+            accesslog.numpy = numpy
+        
+        self.assertEqual(5, len(with_numpy.endpoints))
+        for key, stats in without_numpy.endpoints.items():
+            self.assertEqual(stats.histogram, with_numpy.endpoints[key].histogram)
+            self.assertEqual(40, sum(stats.histogram))
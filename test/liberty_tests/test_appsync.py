@@ -0,0 +1,93 @@
+import os
+import shutil
+import unittest
+
+from liberty import instrument
+from liberty.serveradmin import LibertyAdminTaskException
+from liberty_tests import LibertyTestCase, write_file
+
+
+class TestSyncApp(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server = self._liberty.get_server('server1')
+        self._source = os.path.join(self._tmp_dir, 'app')
+        self._write('index.jsp', 'hello')
+        self._write('WEB-INF/web.xml', '<web-app />')
+        self._write('WEB-INF/classes/a/A.class', 'A' * 1000)
+        self._write('WEB-INF/classes/a/B.class', 'B' * 1000)
+        
+    def _write(self, path, content):
+        write_file(os.path.join(self._source, path), content)
+            
+    def _target(self, *path):
+        return os.path.join(self._server.get_home(), 'dropins', 'app.war', *path)
+            
+    def test_first_sync_copies_everything(self):
+        report = self._server.get_server_admin_task().sync_app('app', self._source)
+        
+        self.assertEqual(['WEB-INF/classes/a/A.class', 'WEB-INF/classes/a/B.class', 'WEB-INF/web.xml', 'index.jsp'], report.copied)
+        self.assertEqual(report.total_bytes, report.bytes_transferred)
+        self.assertEqual('A' * 1000, open(self._target('WEB-INF', 'classes', 'a', 'A.class')).read())
+        
+    def test_only_differences_are_transferred(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task.sync_app('app', self._source)
+        self._write('index.jsp', 'HELLO')
+        self._write('WEB-INF/classes/a/C.class', 'C' * 10)
+        os.remove(os.path.join(self._source, 'WEB-INF', 'classes', 'a', 'B.class'))
+        
+        report = admin_task.sync_app('app', self._source)
+        
+        self.assertEqual(['WEB-INF/classes/a/C.class', 'index.jsp'], report.copied)
+        self.assertEqual(['WEB-INF/classes/a/B.class'], report.deleted)
+        self.assertEqual(15, report.bytes_transferred)
+        self.assertEqual(1026, report.total_bytes)
+        self.assertEqual('HELLO', open(self._target('index.jsp')).read())
+        self.assertFalse(os.path.exists(self._target('WEB-INF', 'classes', 'a', 'B.class')))
+        self.assertEqual([], os.listdir(os.path.join(self._server.get_toolkit_dir(), 'staging')))
+        
+    def test_files_and_directories_can_swap(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task.sync_app('app', self._source)
+        shutil.rmtree(os.path.join(self._source, 'WEB-INF', 'classes', 'a'))
+        self._write('WEB-INF/classes/a', 'now a file')
+        os.remove(os.path.join(self._source, 'index.jsp'))
+        self._write('index.jsp/page.html', 'now a directory')
+        
+        report = admin_task.sync_app('app', self._source)
+        
+        self.assertEqual(['WEB-INF/classes/a', 'index.jsp/page.html'], report.copied)
+        self.assertEqual(['WEB-INF/classes/a/A.class', 'WEB-INF/classes/a/B.class', 'index.jsp'], report.deleted)
+        self.assertEqual('now a file', open(self._target('WEB-INF', 'classes', 'a')).read())
+        self.assertEqual('now a directory', open(self._target('index.jsp', 'page.html')).read())
+        self.assertFalse(admin_task.sync_app('app', self._source).is_changed())
+        
+    def test_unchanged_files_are_not_hashed_again(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task.sync_app('app', self._source)
+        admin_task.sync_app('app', self._source)
+        
+        with instrument.profile() as profile:
+            report = admin_task.sync_app('app', self._source)
+        
+        self.assertFalse(report.is_changed())
+        self.assertEqual(0, profile.get_counter('cache_misses_total', cache='appsync'))
+        
+    def test_existing_exploded_app_in_apps(self):
+        os.makedirs(os.path.join(self._server.get_apps_dir(), 'app.war'))
+        
+        self._server.get_server_admin_task().sync_app('app', self._source)
+        
+        self.assertTrue(os.path.exists(os.path.join(self._server.get_apps_dir(), 'app.war', 'index.jsp')))
+        
+    def test_archive_can_not_be_synchronized(self):
+        os.makedirs(self._server.get_apps_dir())
+        open(os.path.join(self._server.get_apps_dir(), 'app.war'), 'w').close()
+        
+        self.assertRaises(LibertyAdminTaskException, self._server.get_server_admin_task().sync_app, 'app', self._source)
+
+
+if __name__ == '__main__':
+    unittest.main()
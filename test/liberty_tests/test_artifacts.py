@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from liberty import instrument
+from liberty.artifacts import WarInspector, LibertyArtifactException, parse_web_xml
+from liberty.daemon import Session, execute
+from liberty.serverxml import Application, ApplicationBnd, SecurityRole
+from liberty_tests import LibertyTestCase
+
+
+_WEB_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<web-app xmlns="http://xmlns.jcp.org/xml/ns/javaee" version="3.1">
+    <security-constraint>
+        <auth-constraint><role-name>admin</role-name></auth-constraint>
+    </security-constraint>
+    <security-role><role-name>admin</role-name></security-role>
+    <security-role>
+        <description>Read only access</description>
+        <role-name> viewer </role-name>
+    </security-role>
+</web-app>
+'''
+
+
+def _write_war(path, web_xml=_WEB_XML, entries=10):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as war:
+        if web_xml is not None:
+            war.writestr('WEB-INF/web.xml', web_xml)
+        for i in range(entries):
+            war.writestr('WEB-INF/classes/Class{0}.class'.format(i), 'x' * 100)
+    return path
+
+
+class TestWarInspector(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._cache_file = os.path.join(self._tmp_dir, 'artifacts.json')
+        self._inspector = WarInspector(self._cache_file)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_parse_web_xml(self):
+        result = parse_web_xml(_WEB_XML)
+
+        self.assertEqual('3.1', result['version'])
+        self.assertEqual(['admin', 'viewer'], result['roles'])
+
+    def test_war_without_web_xml(self):
+        war = _write_war(os.path.join(self._tmp_dir, 'app.war'), web_xml=None)
+
+        self.assertEqual([], self._inspector.get_roles(war))
+
+    def test_not_a_war(self):
+        path = os.path.join(self._tmp_dir, 'app.war')
+        with open(path, 'w') as f:
+            f.write('not a zip')
+
+        self.assertRaises(LibertyArtifactException, self._inspector.inspect, path)
+
+    def test_cache_is_reused(self):
+        wars = [_write_war(os.path.join(self._tmp_dir, 'app{0}.war'.format(i))) for i in range(5)]
+        first = self._inspector.inspect_all(wars)
+
+        with instrument.profile() as profile:
+            second = WarInspector(self._cache_file).inspect_all(wars)
+
+        self.assertEqual(first, second)
+        self.assertEqual(5, profile.get_counter('cache_hits_total', cache='artifacts'))
+        self.assertEqual(0, profile.get_counter('cache_misses_total', cache='artifacts'))
+
+    def test_identical_content_is_read_once(self):
+        war = _write_war(os.path.join(self._tmp_dir, 'app.war'))
+        copy = os.path.join(self._tmp_dir, 'copy.war')
+        shutil.copy(war, copy)
+        self._inspector.inspect(war)
+
+        with instrument.profile() as profile:
+            self.assertEqual(['admin', 'viewer'], self._inspector.get_roles(copy))
+
+        self.assertEqual(0, profile.get_counter('cache_misses_total', cache='artifacts'))
+
+    def test_changed_war_is_read_again(self):
+        war = _write_war(os.path.join(self._tmp_dir, 'app.war'))
+        self._inspector.inspect(war)
+        _write_war(war, web_xml=_WEB_XML.replace('viewer', 'editor'), entries=11)
+
+        self.assertEqual(['admin', 'editor'], WarInspector(self._cache_file).get_roles(war))
+
+
+class TestInstallWar(LibertyTestCase):
+
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._liberty._war_inspector = WarInspector(os.path.join(self._tmp_dir, 'artifacts.json'))
+        self._server = self._liberty.get_server('server1')
+
+    def test_install_war_maps_declared_roles(self):
+        war = _write_war(os.path.join(self._tmp_dir, 'app.war'))
+        admin_task = self._server.get_server_admin_task()
+
+        admin_task.install_war('app', war, 'auto')
+
+        app_bnd = admin_task._server_model.find(Application).find(ApplicationBnd)
+        self.assertEqual(['admin', 'viewer'], [role.name for role in app_bnd.find_all(SecurityRole)])
+
+    def test_daemon_maps_declared_roles_only_without_roles(self):
+        war = _write_war(os.path.join(self._tmp_dir, 'app.war'))
+        session = Session(self._liberty_home)
+        session.liberty._war_inspector = WarInspector(os.path.join(self._tmp_dir, 'artifacts.json'))
+
+        def roles(name):
+            admin_task = session.get_admin_task('server1')
+            app = [app for app in admin_task._server_model.find_all(Application) if app.name == name][0]
+            app_bnd = app.find(ApplicationBnd)
+            return [role.name for role in app_bnd.find_all(SecurityRole)] if app_bnd is not None else []
+
+        self.assertEqual({'ok': True, 'result': None}, execute(session, 'install-war', ['server1', 'auto', war]))
+        self.assertEqual(['admin', 'viewer'], roles('auto'))
+        execute(session, 'install-war', ['server1', 'none', war, []])
+        self.assertEqual([], roles('none'))
+        execute(session, 'install-war', ['server1', 'listed', war, 'admin,dev'])
+        self.assertEqual(['admin', 'dev'], roles('listed'))
+
+
+if __name__ == '__main__':
+    unittest.main()
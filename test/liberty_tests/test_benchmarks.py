@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty.serverxml import Builder, FeatureManager, BasicRegistry, User, Datasource, Application
+from liberty_benchmarks.bench_serverxml import compare, percentile
+from liberty_benchmarks.generator import ServerXmlGenerator
+
+
+class TestServerXmlGenerator(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+        
+    def _count(self, model):
+        return 1 + sum(self._count(child) for child in model.children())
+    
+    def test_generated_server_is_buildable(self):
+        generator = ServerXmlGenerator(features=3, users=20, groups=2, datasources=2, applications=4, depth=3)
+        xml_file = generator.write(os.path.join(self._tmp_dir, 'server.xml'))
+        model = Builder().build(xml_file)
+        
+        self.assertEqual(generator.element_count(), self._count(model))
+        self.assertEqual(3, len(model.find(FeatureManager).list_features()))
+        self.assertEqual(20, len(model.find(BasicRegistry).find_all(User)))
+        self.assertEqual(2, len(model.find_all(Datasource)))
+        self.assertEqual(4, len(model.find_all(Application)))
+        
+    def test_generation_is_deterministic(self):
+        self.assertEqual(ServerXmlGenerator.for_scale('small').generate(), ServerXmlGenerator.for_scale('small').generate())
+        
+
+class TestBenchmarkReport(unittest.TestCase):
+    
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(50.0, percentile(samples, 50))
+        self.assertEqual(99.0, percentile(samples, 99))
+        
+    def test_compare_reports_regressions_over_threshold(self):
+        baseline = {'results': {'small/parse': {'p50': 1.0}, 'small/save': {'p50': 1.0}}}
+        current = {'results': {'small/parse': {'p50': 1.3}, 'small/save': {'p50': 1.1}, 'large/save': {'p50': 9.0}}}
+        
+        self.assertEqual([('small/parse', 1.0, 1.3)], compare(baseline, current, 0.25))
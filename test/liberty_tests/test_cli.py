@@ -0,0 +1,109 @@
+import os
+import sys
+import stat
+import threading
+import unittest
+from StringIO import StringIO
+
+from liberty import cli
+from liberty.daemon import Session, ToolkitDaemon, LibertyDaemonException, execute
+from liberty_tests import LibertyTestCase
+
+
+class TestCli(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server_xml = os.path.join(self._servers_dir, 'server1', 'server.xml')
+        self._socket = os.path.join(self._tmp_dir, 'toolkit.sock')
+        
+    def _main(self, *argv):
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        try:
+            code = cli.main(['--home', self._liberty_home, '--socket', self._socket] + list(argv))
+            return code, sys.stdout.getvalue()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+    
+    def test_runs_in_process_without_daemon(self):
+        self.assertEqual((0, '9080\n9443\n'), self._main('ports', 'server1'))
+        self.assertEqual((0, ''), self._main('add-features', 'server1', 'jsp-2.2'))
+        self.assertTrue('<feature>jsp-2.2</feature>' in open(self._server_xml).read())
+        self.assertEqual(1, self._main('ports', 'noSuchServer')[0])
+        self.assertEqual(1, self._main('noSuchCommand')[0])
+        
+    def test_daemon_serves_requests(self):
+        daemon = ToolkitDaemon(self._socket).start()
+        try:
+            self.assertEqual({'ok': True, 'result': 'pong'}, cli.request(self._socket, {'command': 'ping'}))
+            self.assertRaises(LibertyDaemonException, ToolkitDaemon(self._socket).bind)
+            
+            self.assertEqual((0, 'server1\n'), self._main('servers'))
+            self.assertEqual((0, '9080\n9443\n'), self._main('ports', 'server1'))
+            session = daemon.get_session(self._liberty_home)
+            admin_task = session.get_admin_task('server1')
+            self.assertEqual((0, ''), self._main('add-features', 'server1', 'jsp-2.2'))
+            self.assertIs(admin_task, session.get_admin_task('server1'))
+            self.assertTrue('<feature>jsp-2.2</feature>' in open(self._server_xml).read())
+            
+            with open(self._server_xml, 'w') as f:
+                f.write('<server>\n    <httpEndpoint id="defaultHttpEndpoint" httpPort="1" httpsPort="2" />\n</server>')
+            self.assertEqual((0, '1\n2\n'), self._main('ports', 'server1'))
+            self.assertEqual({'ok': False, 'error': "Wrong number of arguments for 'ports'."},
+                             cli.run(self._liberty_home, 'ports', [], self._socket))
+            
+            self.assertEqual((0, ''), self._main('shutdown'))
+            daemon.stop()
+            self.assertFalse(os.path.exists(self._socket))
+            self.assertEqual(None, cli.request(self._socket, {'command': 'ping'}))
+        finally:
+            daemon.stop()
+            
+    def test_agent_needs_a_token(self):
+        token = os.environ.pop('LIBERTY_AGENT_TOKEN', None)
+        try:
+            self.assertEqual((1, ''), self._main('agent', '127.0.0.1:0'))
+        finally:
+            if token is not None:
+                os.environ['LIBERTY_AGENT_TOKEN'] = token
+            
+    def test_default_socket_is_private(self):
+        environ = dict(os.environ)
+        try:
+            os.environ.pop('LIBERTY_TOOLKIT_SOCKET', None)
+            os.environ['XDG_RUNTIME_DIR'] = '/run/user/1000'
+            self.assertEqual('/run/user/1000/liberty-toolkit.sock', cli.get_default_socket())
+            del os.environ['XDG_RUNTIME_DIR']
+            os.environ['TMPDIR'] = self._tmp_dir
+            socket_path = cli.get_default_socket()
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        
+        daemon = ToolkitDaemon(socket_path).start()
+        try:
+            self.assertEqual(os.path.join(self._tmp_dir, 'liberty-toolkit-{0}'.format(os.getuid())), os.path.dirname(socket_path))
+            self.assertEqual(0o700, stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode))
+        finally:
+            daemon.stop()
+            
+    @unittest.skipUnless(os.getuid() == 0, 'changing the owner of a file needs root')
+    def test_socket_of_another_user_is_refused(self):
+        daemon = ToolkitDaemon(self._socket).start()
+        try:
+            os.chown(self._socket, os.getuid() + 1, -1)
+            self.assertRaises(cli.LibertyCliException, cli.request, self._socket, {'command': 'ping'})
+            self.assertEqual(1, self._main('servers')[0])
+        finally:
+            daemon.stop()
+            
+    def test_start_and_stop_do_not_hold_the_session_lock(self):
+        session = Session(self._liberty_home)
+        results = []
+        with session.lock:
+            thread = threading.Thread(target=lambda: results.append(execute(session, 'status', ['server1'])))
+            thread.start()
+            thread.join(10)
+        
+        self.assertTrue(results[0]['ok'])
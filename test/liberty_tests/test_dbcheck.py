@@ -0,0 +1,91 @@
+import socket
+import unittest
+
+from liberty.dbcheck import DatasourceChecker, Endpoint
+from liberty.serverxml import ServerModel, Datasource, DB2JCCProp, OracleProp, GenericElement
+
+
+class TestDatasourceChecker(unittest.TestCase):
+    
+    def setUp(self):
+        self._listener = socket.socket()
+        self._listener.bind(('127.0.0.1', 0))
+        self._listener.listen(16)
+        self._open_port = self._listener.getsockname()[1]
+        
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        self._closed_port = closed.getsockname()[1]
+        closed.close()
+        
+        self._checker = DatasourceChecker(timeout=2.0)
+        
+    def tearDown(self):
+        self._listener.close()
+        
+    def _server_model(self, datasources):
+        server = ServerModel()
+        for jndi, prop_class, port in datasources:
+            datasource = Datasource()
+            datasource.jndi = jndi
+            prop = prop_class()
+            prop.server_name = '127.0.0.1'
+            prop.db_port = str(port)
+            datasource.add(prop)
+            server.add(datasource)
+        return server
+        
+    def test_collect_dedupes_endpoints(self):
+        models = {
+            'server1': self._server_model([('jdbc/a', DB2JCCProp, self._open_port), ('jdbc/b', OracleProp, self._open_port)]),
+            'server2': self._server_model([('jdbc/a', DB2JCCProp, self._open_port)]),
+        }
+        
+        endpoints = self._checker.collect(models)
+        
+        self.assertEqual([Endpoint('127.0.0.1', self._open_port)], list(endpoints.keys()))
+        self.assertEqual([('server1', 'jdbc/a'), ('server1', 'jdbc/b'), ('server2', 'jdbc/a')],
+                         endpoints[Endpoint('127.0.0.1', self._open_port)])
+        
+    def test_check_reports_reachable_and_refused_endpoints(self):
+        models = {'server1': self._server_model([('jdbc/up', DB2JCCProp, self._open_port),
+                                                 ('jdbc/down', OracleProp, self._closed_port)])}
+        
+        report = self._checker.check(models)
+        
+        self.assertFalse(report.is_ok())
+        up, down = sorted(report.results, key=lambda result: not result.reachable)
+        self.assertEqual(self._open_port, up.endpoint.port)
+        self.assertTrue(up.latency >= 0)
+        self.assertEqual([('server1', 'jdbc/down')], down.datasources)
+        self.assertEqual([down], report.unreachable())
+        self.assertTrue('UNREACHABLE' in report.format())
+        
+    def test_variables_are_resolved(self):
+        model = self._server_model([('jdbc/a', DB2JCCProp, '${db.port}'), ('jdbc/b', DB2JCCProp, '${other.port}')])
+        variable = GenericElement('variable')
+        variable.set('name', 'db.port')
+        variable.set('value', str(self._open_port))
+        model.add(variable)
+        
+        report = self._checker.check({'server1': model})
+        
+        self.assertEqual([Endpoint('127.0.0.1', self._open_port)], [result.endpoint for result in report.results])
+        self.assertEqual([('server1', 'jdbc/b', '127.0.0.1:${other.port}')], report.unresolved)
+        self.assertTrue('UNRESOLVED' in report.format())
+        
+    def test_results_are_cached(self):
+        models = {'server1': self._server_model([('jdbc/up', DB2JCCProp, self._open_port)])}
+        
+        self.assertFalse(self._checker.check(models).results[0].cached)
+        self.assertTrue(self._checker.check(models).results[0].cached)
+        self.assertFalse(DatasourceChecker(ttl=0).check(models).results[0].cached)
+        
+    def test_connection_limits(self):
+        checker = DatasourceChecker(timeout=2.0, max_connections=2, max_per_host=1)
+        endpoints = [Endpoint('127.0.0.1', self._open_port), Endpoint('localhost', self._open_port),
+                     Endpoint('127.0.0.1', self._closed_port)]
+        
+        results = checker.probe(endpoints)
+        
+        self.assertEqual([True, True, False], [results[endpoint].reachable for endpoint in endpoints])
@@ -0,0 +1,150 @@
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import unittest
+
+from liberty.diagnostics import LibertyDiagnosticsException
+from liberty.liberty import Liberty
+
+
+_FAKE_SERVER_SCRIPT = '''#!/bin/sh
+# Fake Liberty 'server' script: dump <name> --archive=<path> | javadump <name>
+out="$WLP_OUTPUT_DIR/$2"
+case "$1" in
+    dump) sleep 0.5; echo "dump of $2" > "${3#--archive=}" ;;
+    javadump) [ "$2" = broken ] && exit 2; echo "javacore of $2" > "$out/javacore.$2.txt"; echo heap > "$out/heapdump.$2.phd" ;;
+esac
+'''
+
+_FAKE_JVM = '''
+import os, signal, sys, time
+def dump(signum, frame):
+    if sys.argv[3] == 'hotspot':
+        with open(os.path.join(sys.argv[1], 'logs', 'console.log'), 'a') as f:
+            f.write('Full thread dump\\n')
+    else:
+        with open(os.path.join(sys.argv[1], 'javacore.%d.txt' % os.getpid()), 'w') as f:
+            f.write('threads')
+signal.signal(signal.SIGQUIT, dump)
+open(sys.argv[2], 'w').close()
+while True:
+    time.sleep(0.05)
+'''
+
+
+class TestCollectDiagnostics(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._liberty_home = os.path.join(self._tmp_dir, 'wlp')
+        self._output_dir = os.path.join(self._tmp_dir, 'output')
+        bin_dir = os.path.join(self._liberty_home, 'bin')
+        os.makedirs(bin_dir)
+        with open(os.path.join(bin_dir, 'server'), 'w') as f:
+            f.write(_FAKE_SERVER_SCRIPT)
+        os.chmod(os.path.join(bin_dir, 'server'), stat.S_IRWXU)
+        for name in ('s1', 's2', 's3', 'broken'):
+            os.makedirs(os.path.join(self._liberty_home, 'usr', 'servers', name))
+            open(os.path.join(self._liberty_home, 'usr', 'servers', name, 'server.xml'), 'w').close()
+            os.makedirs(os.path.join(self._output_dir, name))
+        os.environ['WLP_OUTPUT_DIR'] = self._output_dir
+        self._liberty = Liberty(self._liberty_home)
+        
+    def tearDown(self):
+        del os.environ['WLP_OUTPUT_DIR']
+        shutil.rmtree(self._tmp_dir)
+        
+    def _archive_members(self, archive):
+        with tarfile.open(archive, 'r:gz') as tar:
+            return dict((member.name, tar.extractfile(member).read()) for member in tar.getmembers())
+        
+    def test_concurrent_dumps(self):
+        archive = os.path.join(self._tmp_dir, 'diag.tar.gz')
+        
+        start = time.time()
+        report = self._liberty.collect_diagnostics(['s1', 's2', 's3'], archive=archive, workers=3, remove=True)
+        
+        self.assertTrue(time.time() - start < 1.2)
+        self.assertEqual([], report.failed())
+        members = self._archive_members(archive)
+        self.assertEqual(3, len(members))
+        for result in report.results:
+            (arcname, size), = result.files
+            self.assertEqual('dump of {0}\n'.format(result.name), members[arcname])
+            self.assertEqual(len(members[arcname]), size)
+            self.assertTrue(result.trigger_seconds >= 0.5)
+        self.assertEqual([], [name for name in os.listdir(os.path.join(self._output_dir, 's1'))])
+        self.assertTrue('s2 dump: 1 files, 11 bytes' in report.format())
+        
+    def test_javadump_failures_are_reported(self):
+        archive = os.path.join(self._tmp_dir, 'diag.tar.gz')
+        
+        report = self._liberty.collect_diagnostics(['s1', 'broken'], kinds=('javadump',), archive=archive)
+        
+        failed, = report.failed()
+        self.assertEqual('broken', failed.name)
+        self.assertEqual("'server javadump' exited with 2", failed.error)
+        self.assertEqual(['s1/heapdump.s1.phd', 's1/javacore.s1.txt'], sorted(self._archive_members(archive)))
+        self.assertRaises(LibertyDiagnosticsException, self._liberty.collect_diagnostics, ['s1'], ('heap',), archive)
+        
+    def _start_jvm(self, name, vendor='ibm'):
+        pid_dir = os.path.join(self._output_dir, '.pid')
+        if not os.path.isdir(pid_dir):
+            os.makedirs(pid_dir)
+        ready = os.path.join(self._tmp_dir, 'ready')
+        jvm = subprocess.Popen([sys.executable, '-c', _FAKE_JVM, os.path.join(self._output_dir, name), ready, vendor])
+        while not os.path.exists(ready):
+            time.sleep(0.01)
+        with open(os.path.join(pid_dir, name + '.pid'), 'w') as f:
+            f.write(str(jvm.pid))
+        return jvm
+        
+    def test_thread_dump_signals_the_jvm(self):
+        jvm = self._start_jvm('s1')
+        try:
+            report = self._liberty.collect_diagnostics(['s1', 's2'], kinds=('threads',), archive=os.path.join(self._tmp_dir, 'threads.tar.gz'))
+        finally:
+            jvm.kill()
+            jvm.wait()
+        
+        failed, = report.failed()
+        self.assertEqual('s2', failed.name)
+        self.assertEqual({'s1/javacore.{0}.txt'.format(jvm.pid): 'threads'}, self._archive_members(report.archive))
+        
+    def test_console_thread_dump_is_copied(self):
+        console_log = os.path.join(self._output_dir, 's1', 'logs', 'console.log')
+        os.makedirs(os.path.dirname(console_log))
+        with open(console_log, 'w') as f:
+            f.write('started\n')
+        jvm = self._start_jvm('s1', 'hotspot')
+        try:
+            report = self._liberty.collect_diagnostics(['s1'], kinds=('threads',), archive=os.path.join(self._tmp_dir, 'threads.tar.gz'),
+                                                       timeout=60, remove=True)
+        finally:
+            jvm.kill()
+            jvm.wait()
+        
+        self.assertEqual([], report.failed())
+        # Not waiting for a javacore that never comes.
+        self.assertTrue(report.results[0].trigger_seconds < 10)
+        self.assertEqual(['Full thread dump\n'], list(self._archive_members(report.archive).values()))
+        with open(console_log, 'r') as f:
+            self.assertEqual('started\nFull thread dump\n', f.read())
+        
+    def test_kinds_of_one_server_do_not_collect_each_others_files(self):
+        jvm = self._start_jvm('s1')
+        try:
+            report = self._liberty.collect_diagnostics(['s1'], kinds=('javadump', 'threads'), archive=os.path.join(self._tmp_dir, 'diag.tar.gz'),
+                                                       remove=True)
+        finally:
+            jvm.kill()
+            jvm.wait()
+        
+        self.assertEqual([], report.failed())
+        self.assertEqual(sorted(['s1/heapdump.s1.phd', 's1/javacore.s1.txt', 's1/javacore.{0}.txt'.format(jvm.pid)]),
+                         sorted(self._archive_members(report.archive)))
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty.farm import ServerFarm, ServerSpec, LibertyFarmException, matrix
+from liberty.serverxml import Builder, XmlOutputter, ServerModel, FeatureManager, HttpEndpoint, BasicRegistry, Datasource
+
+
+class TestServerFarm(unittest.TestCase):
+
+    def setUp(self):
+        self._template_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        self._template = Builder().build(self._template_file)
+        self._farm = ServerFarm(self._template)
+
+    def test_unchanged_subtrees_are_shared(self):
+        model = self._farm.create(ServerSpec('s1', http_port=10080, datasource_hosts={'jdbc/ds': 'db1:50001'}))
+
+        self.assertIsNot(self._template, model)
+        self.assertIs(self._template.find(BasicRegistry), model.find(BasicRegistry))
+        self.assertIs(self._template.find(FeatureManager), model.find(FeatureManager))
+        self.assertIsNot(self._template.find(HttpEndpoint), model.find(HttpEndpoint))
+        self.assertIsNot(self._template.find(Datasource), model.find(Datasource))
+        self.assertEqual(10080, model.find(HttpEndpoint).http_port)
+        self.assertEqual('9080', self._template.find(HttpEndpoint).http_port)
+        self.assertEqual('db1', model.find(Datasource).children()[1].server_name)
+        self.assertEqual('h', self._template.find(Datasource).children()[1].server_name)
+
+    def test_render_keeps_template_text(self):
+        with open(self._template_file, 'rb') as f:
+            original = f.read()
+
+        self.assertEqual(original, self._farm.render(ServerSpec('same')))
+        content = self._farm.render(ServerSpec('s2', http_port=10080, https_port=10443, applications=['app1']))
+        self.assertEqual(original.replace('"9080"', '"10080"').replace('"9443"', '"10443"').replace(
+            '\n</server>', '\n    <application id="app1" location="${server.config.dir}/apps/app1.war" name="app1" type="war" />\n</server>'),
+            content)
+        self.assertEqual(original, XmlOutputter().output(self._template))
+
+    def test_generated_template(self):
+        template = ServerModel()
+        feature_manager = FeatureManager()
+        feature_manager.add_features(['servlet-3.0'])
+        template.add(feature_manager)
+        farm = ServerFarm(template)
+
+        content = farm.render(ServerSpec('s1', http_port=9081, features=['jsp-2.2']))
+
+        self.assertEqual(['servlet-3.0'], feature_manager.list_features())
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], Builder().build(_Text(content)).find(FeatureManager).list_features())
+        self.assertEqual(farm.render(ServerSpec('s2')), farm.render(ServerSpec('s3')))
+
+    def test_unknown_datasource(self):
+        self.assertRaises(LibertyFarmException, self._farm.create, ServerSpec('s1', datasource_hosts={'jdbc/none': 'db'}))
+
+    def test_matrix(self):
+        specs = matrix('srv{index}', http_port=9080, datasource_hosts=[{'jdbc/ds': 'a'}, {'jdbc/ds': 'b'}],
+                       applications=[['x'], ['y']])
+
+        self.assertEqual(['srv0', 'srv1', 'srv2', 'srv3'], [spec.name for spec in specs])
+        self.assertEqual([9080, 9081, 9082, 9083], [spec.http_port for spec in specs])
+        self.assertEqual([['x'], ['x'], ['y'], ['y']], [spec.applications for spec in specs])
+
+    def test_write(self):
+        servers_dir = tempfile.mkdtemp()
+        try:
+            specs = matrix('srv{index}', http_port=9080, datasource_hosts=[{'jdbc/ds': 'db{0}'.format(i)} for i in range(5)])
+            paths = self._farm.write(specs, servers_dir, workers=3)
+
+            self.assertEqual(5, len(paths))
+            for i, spec in enumerate(specs):
+                model = Builder().build(paths[spec.name])
+                self.assertEqual(os.path.join(servers_dir, spec.name, 'server.xml'), paths[spec.name])
+                self.assertEqual(str(9080 + i), model.find(HttpEndpoint).http_port)
+                self.assertEqual('db{0}'.format(i), model.find(Datasource).children()[1].server_name)
+
+            self.assertRaises(LibertyFarmException, self._farm.write, specs + specs[:1], servers_dir)
+        finally:
+            shutil.rmtree(servers_dir)
+
+
+class _Text(object):
+
+    def __init__(self, text):
+        self._text = text
+
+    def read(self):
+        return self._text
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty import instrument
+from liberty.features import FeatureCatalog, LibertyFeatureException, parse_manifest
+
+
+class TestFeatureCatalog(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._liberty_home = os.path.join(os.path.dirname(__file__), 'resources', 'wlp')
+        self._cache_file = os.path.join(self._tmp_dir, 'features.json')
+        self._catalog = FeatureCatalog(self._liberty_home, self._cache_file)
+        
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+        
+    def test_parse_manifest(self):
+        manifest = os.path.join(self._liberty_home, 'lib', 'features', 'com.ibm.websphere.appserver.servlet-3.0.mf')
+        feature = parse_manifest(manifest)
+        
+        self.assertEqual('com.ibm.websphere.appserver.servlet-3.0', feature['symbolic_name'])
+        self.assertEqual('servlet-3.0', feature['short_name'])
+        self.assertEqual('public', feature['visibility'])
+        self.assertTrue(feature['singleton'])
+        self.assertEqual(['com.ibm.websphere.appserver.javaeeCompatible-6.0'], feature['requires'])
+        
+    def test_parse_manifest_tolerates(self):
+        feature = parse_manifest(os.path.join(self._liberty_home, 'lib', 'features', 'com.ibm.websphere.appserver.jsp-2.2.mf'))
+        
+        self.assertEqual({'com.ibm.websphere.appserver.servlet-3.0': ['3.1']}, feature['tolerates'])
+        
+    def test_public_features(self):
+        self.assertEqual(['jdbc-4.1', 'jsp-2.2', 'servlet-3.0', 'servlet-3.1'], self._catalog.features())
+        self.assertTrue(self._catalog.is_known('JSP-2.2'))
+        self.assertFalse(self._catalog.is_known('jsp-9.9'))
+        
+    def test_resolve_transitive_closure(self):
+        self.assertEqual(['com.ibm.websphere.appserver.javaeeCompatible-6.0',
+                          'com.ibm.websphere.appserver.jsp-2.2',
+                          'com.ibm.websphere.appserver.servlet-3.0'], self._catalog.resolve(['jsp-2.2']))
+        
+    def test_resolve_tolerated_version(self):
+        self.assertEqual(['com.ibm.websphere.appserver.javaeeCompatible-7.0',
+                          'com.ibm.websphere.appserver.jsp-2.2',
+                          'com.ibm.websphere.appserver.servlet-3.1'], self._catalog.resolve(['jsp-2.2', 'servlet-3.1']))
+
+    def test_resolve_tolerated_version_required_deeper(self):
+        # webProfile-7.0 reaches jsp-2.2 before websocket-1.0, which requires servlet-3.1.
+        self.assertEqual(['com.ibm.websphere.appserver.javaeeCompatible-7.0',
+                          'com.ibm.websphere.appserver.jsp-2.2',
+                          'com.ibm.websphere.appserver.servlet-3.1',
+                          'com.ibm.websphere.appserver.webProfile-7.0',
+                          'com.ibm.websphere.appserver.websocket-1.0'],
+                         self._catalog.resolve(['com.ibm.websphere.appserver.webProfile-7.0']))
+        
+    def test_resolve_conflicting_versions(self):
+        try:
+            self._catalog.resolve(['servlet-3.0', 'servlet-3.1'])
+            self.fail()
+        except LibertyFeatureException as e:
+            self.assertTrue('servlet-3.0, servlet-3.1' in str(e))
+            
+    def test_resolve_unknown_feature(self):
+        self.assertRaises(LibertyFeatureException, self._catalog.resolve, ['noSuchFeature-1.0'])
+        
+    def test_cache_is_reused(self):
+        self._catalog.features()
+        self.assertTrue(os.path.exists(self._cache_file))
+        
+        with instrument.profile() as profile:
+            FeatureCatalog(self._liberty_home, self._cache_file).features()
+        
+        self.assertEqual(1, profile.get_counter('cache_hits_total', cache='features'))
+        self.assertEqual(0, profile.get_counter('cache_misses_total', cache='features'))
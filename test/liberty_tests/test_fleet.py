@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from liberty.fleet import FleetController, ToolkitAgent, LibertyFleetException, parse_address
+
+
+class TestFleet(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        resources = os.path.join(os.path.dirname(__file__), 'resources', 'wlp')
+        self._agents = []
+        for i in range(3):
+            liberty_home = os.path.join(self._tmp_dir, 'wlp{0}'.format(i))
+            shutil.copytree(resources, liberty_home)
+            server_xml = os.path.join(liberty_home, 'usr', 'servers', 'server1', 'server.xml')
+            with open(server_xml, 'r') as f:
+                content = f.read().replace('9080', str(10080 + i))
+            with open(server_xml, 'w') as f:
+                f.write(content)
+            self._agents.append(ToolkitAgent(liberty_home, ('127.0.0.1', 0), token='secret').start())
+        self._addresses = [agent.get_address() for agent in self._agents]
+        self._controller = FleetController(self._addresses, token='secret')
+        
+    def tearDown(self):
+        self._controller.close()
+        # Each stop waits for the poll interval of its server, so they are stopped together.
+        threads = [threading.Thread(target=agent.stop) for agent in self._agents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        shutil.rmtree(self._tmp_dir)
+        
+    def test_parse_address(self):
+        self.assertEqual(('127.0.0.1', 9797), parse_address('9797'))
+        self.assertEqual(('host', 9797), parse_address('host:9797'))
+        self.assertEqual(('host', 9797), parse_address(('host', '9797')))
+        
+    def test_run_on_all_agents(self):
+        results = dict(self._controller.run('ports', ['server1']))
+        
+        self.assertEqual(sorted(self._addresses), sorted(results))
+        for i, address in enumerate(self._addresses):
+            self.assertEqual({'ok': True, 'result': [str(10080 + i), '9443'], 'id': 0}, results[address])
+            
+    def test_batch_is_pipelined_on_one_connection(self):
+        commands = [('add-features', ['server1', 'jsp-2.2']), ('ports', ['server1'])] + [('servers', [])] * 100
+        
+        for agent, responses in self._controller.batch(commands):
+            self.assertEqual(102, len(responses))
+            self.assertTrue(all(response['ok'] for response in responses))
+            self.assertEqual(['server1'], responses[-1]['result'])
+        for agent, responses in self._controller.batch(commands[1:]):
+            self.assertEqual(1, len(self._controller._pools[agent]._idle))
+            
+    def test_token_is_checked(self):
+        controller = FleetController(self._addresses[:1], token='wrong')
+        try:
+            self.assertEqual('Not authorized.', controller.call(self._addresses[0], 'servers')['error'])
+        finally:
+            controller.close()
+            
+    def test_agent_without_token_is_refused(self):
+        liberty_home = os.path.join(self._tmp_dir, 'wlp0')
+        self.assertRaises(LibertyFleetException, ToolkitAgent, liberty_home, ('127.0.0.1', 0))
+        self.assertRaises(LibertyFleetException, ToolkitAgent, liberty_home, ('0.0.0.0', 0), token='')
+            
+    def test_unreachable_agent_answers_with_an_error(self):
+        self._agents[2].stop()
+        
+        results = dict(self._controller.run('servers'))
+        
+        self.assertTrue(results[self._addresses[0]]['ok'])
+        self.assertFalse(results[self._addresses[2]]['ok'])
+        
+    def test_reconnects_after_agent_restart(self):
+        address = self._addresses[0]
+        self.assertTrue(self._controller.call(address, 'servers')['ok'])
+        self._agents[0].stop()
+        self._agents[0] = ToolkitAgent(os.path.join(self._tmp_dir, 'wlp0'), address, token='secret').start()
+        
+        self.assertTrue(self._controller.call(address, 'servers')['ok'])
+        
+    def test_timed_out_command_is_not_sent_again(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(5)
+        received = []
+        
+        def serve():
+            connection, _ = listener.accept()
+            reader = connection.makefile('rb')
+            for line in iter(reader.readline, b''):
+                received.append(json.loads(line.decode('utf-8'))['command'])
+                # Answers the first command only, then takes too long.
+                if len(received) == 1:
+                    connection.sendall(b'{"ok": true, "id": 0}\n')
+            reader.close()
+            connection.close()
+        thread = threading.Thread(target=serve)
+        thread.daemon = True
+        thread.start()
+        address = listener.getsockname()
+        controller = FleetController([], timeout=0.5)
+        try:
+            self.assertTrue(controller.call(address, 'servers')['ok'])
+            response = controller.call(address, 'server-start')
+        finally:
+            controller.close()
+            thread.join(5)
+            listener.close()
+        
+        self.assertFalse(response['ok'])
+        self.assertTrue('Timed out' in response['error'])
+        self.assertEqual(['servers', 'server-start'], received)
+
+
+if __name__ == '__main__':
+    unittest.main()
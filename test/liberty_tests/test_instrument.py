@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty import instrument
+from liberty.serverxml import Builder, XmlOutputter
+
+
+class TestInstrument(unittest.TestCase):
+    
+    def _http_endpoint_xml(self):
+        return os.path.join(os.path.dirname(__file__), 'resources', 'data', 'http_endpoint.xml')
+    
+    def test_span_without_hooks_is_shared_noop(self):
+        self.assertFalse(instrument.is_enabled())
+        self.assertTrue(instrument.span('a') is instrument.span('b'))
+        
+    def test_hook_receives_start_and_stop(self):
+        events = []
+        
+        class RecordingHook(instrument.Hook):
+            def on_start(self, span):
+                events.append(('start', span.name))
+            def on_stop(self, span):
+                events.append(('stop', span.name, span.tags['server']))
+        
+        hook = RecordingHook()
+        instrument.add_hook(hook)
+        try:
+            with instrument.span('op', server='server1'):
+                pass
+        finally:
+            instrument.remove_hook(hook)
+        
+        self.assertEqual([('start', 'op'), ('stop', 'op', 'server1')], events)
+        self.assertFalse(instrument.is_enabled())
+        
+    def test_profile_builder_and_outputter(self):
+        with instrument.profile() as profile:
+            model = Builder().build(self._http_endpoint_xml())
+            XmlOutputter().output(model)
+        
+        self.assertEqual(['builder.build', 'xml.output'], [span.name for span in profile.spans])
+        self.assertEqual(os.path.getsize(self._http_endpoint_xml()), profile.get_counter('parse_bytes_total'))
+        self.assertEqual(1, profile.get_counter('parsed_elements_total'))
+        self.assertEqual(1, profile.get_histogram('operation_seconds', operation='builder.build').count)
+        self.assertEqual(2, len(profile.summary()))
+        
+    def test_span_records_errors(self):
+        with instrument.profile() as profile:
+            try:
+                with instrument.span('failing'):
+                    raise ValueError()
+            except ValueError:
+                pass
+        
+        self.assertEqual(1, profile.get_counter('operation_errors_total', operation='failing', error='ValueError'))
+
+
+class TestPrometheusExporter(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+    
+    def test_render(self):
+        collector = instrument.MetricsCollector(buckets=(0.1, 1.0))
+        collector.on_counter('subprocess_exits_total', 1, {'command': 'start', 'code': 0})
+        collector.on_observe('operation_seconds', 0.5, {'operation': 'admin.save'})
+        
+        text = instrument.PrometheusExporter(collector).render()
+        
+        self.assertTrue('liberty_toolkit_subprocess_exits_total{code="0",command="start"} 1\n' in text)
+        self.assertTrue('liberty_toolkit_operation_seconds_bucket{operation="admin.save",le="0.1"} 0\n' in text)
+        self.assertTrue('liberty_toolkit_operation_seconds_bucket{operation="admin.save",le="1.0"} 1\n' in text)
+        self.assertTrue('liberty_toolkit_operation_seconds_bucket{operation="admin.save",le="+Inf"} 1\n' in text)
+        self.assertTrue('liberty_toolkit_operation_seconds_count{operation="admin.save"} 1\n' in text)
+        
+    def test_write_textfile(self):
+        collector = instrument.MetricsCollector()
+        collector.on_counter('cache_hits_total', 3, {'cache': 'features'})
+        path = os.path.join(self._tmp_dir, 'liberty.prom')
+        
+        instrument.PrometheusExporter(collector).write_textfile(path)
+        
+        with open(path) as f:
+            self.assertTrue('liberty_toolkit_cache_hits_total{cache="features"} 3' in f.read())
+        self.assertEqual(['liberty.prom'], os.listdir(self._tmp_dir))
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from liberty import instrument
+from liberty.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+    
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._tmp_dir, 'toolkit', 'admin.journal')
+        
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+        
+    def test_append_and_read(self):
+        journal = Journal(self._path)
+        journal.append({'op': 'a'})
+        journal.append({'op': 'b'})
+        
+        self.assertEqual([{'op': 'a'}, {'op': 'b'}], Journal(self._path).read())
+        self.assertEqual(0o600, os.stat(self._path).st_mode & 0o777)
+        journal.close()
+        
+    def test_torn_last_line_is_ignored(self):
+        journal = Journal(self._path)
+        journal.append({'op': 'a'})
+        journal.close()
+        with open(self._path, 'a') as f:
+            f.write('{"op": "b"')
+            
+        self.assertEqual([{'op': 'a'}], journal.read())
+        
+    def test_appends_share_syncs(self):
+        journal = Journal(self._path, sync_interval=60)
+        with instrument.profile() as profile:
+            for i in range(2000):
+                journal.append({'op': 'create_group', 'args': {'group_name': 'g{0}'.format(i)}})
+            journal.close()
+        
+        self.assertEqual(1, profile.get_counter('journal_syncs_total'))
+        self.assertEqual(2000, len(journal.read()))
+        
+    def test_last_append_is_synced_within_the_interval(self):
+        journal = Journal(self._path, sync_interval=0.1)
+        with instrument.profile() as profile:
+            journal.append({'op': 'a'})
+            self.assertEqual(0, profile.get_counter('journal_syncs_total'))
+            time.sleep(0.5)
+            self.assertEqual(1, profile.get_counter('journal_syncs_total'))
+            journal.close()
+        
+        self.assertEqual(1, profile.get_counter('journal_syncs_total'))
+        
+    def test_reset(self):
+        journal = Journal(self._path)
+        journal.append({'op': 'a'})
+        journal.reset({'base': 'digest'})
+        journal.append({'op': 'b'})
+        
+        self.assertEqual([{'base': 'digest'}, {'op': 'b'}], journal.read())
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import unittest
+
+from liberty_tests import LibertyTestCase, write_file
+
+
+class TestLibraryConsolidation(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        for name in ('server2', 'server3'):
+            self._copy_server(name)
+        
+        self._drivers = {}
+        for name, content in (('server1', 'db2'), ('server2', 'db2'), ('server3', 'oracle')):
+            driver_dir = os.path.join(self._tmp_dir, 'drivers-' + name)
+            for jar in ('driver.jar', 'license.jar'):
+                write_file(os.path.join(driver_dir, jar), content * 100)
+            write_file(os.path.join(driver_dir, 'README'), name)
+            admin_task = self._liberty.get_server(name).get_server_admin_task()
+            admin_task.create_jdbc_driver('driver', driver_dir)
+            admin_task.save()
+            self._drivers[name] = driver_dir
+        
+    def _read_server_xml(self, name):
+        with open(self._liberty.get_server(name).get_server_xml(), 'r') as f:
+            return f.read()
+        
+    def test_dry_run_reports_duplicates(self):
+        before = self._read_server_xml('server1')
+        
+        report = self._liberty.consolidate_libraries()
+        
+        self.assertEqual(1, len(report.duplicates))
+        duplicate = report.duplicates[0]
+        self.assertEqual(['server1', 'server2'], sorted(copy.server_name for copy in duplicate.copies))
+        self.assertEqual(['driver.jar', 'license.jar'], [name for name, _, _ in duplicate.copies[0].files])
+        self.assertEqual(600, report.get_wasted_bytes())
+        self.assertTrue('(dry run)' in report.format())
+        self.assertEqual(before, self._read_server_xml('server1'))
+        self.assertFalse(os.path.exists(duplicate.target))
+        
+    def test_apply_rewrites_servers_to_one_shared_copy(self):
+        report = self._liberty.consolidate_libraries(dry_run=False)
+        
+        target = report.duplicates[0].target
+        location = '${shared.resource.dir}/' + os.path.basename(target)
+        self.assertEqual(['driver.jar', 'license.jar'], sorted(os.listdir(target)))
+        self.assertTrue('<fileset dir="{0}" includes="*.jar" />'.format(location) in self._read_server_xml('server1'))
+        self.assertTrue('<fileset dir="{0}" includes="*.jar" />'.format(location) in self._read_server_xml('server2'))
+        self.assertTrue(self._drivers['server3'] in self._read_server_xml('server3'))
+        self.assertEqual([], self._liberty.consolidate_libraries().duplicates)
+        
+    def test_existing_shared_copy_is_reused(self):
+        shared_dir = os.path.join(self._liberty_home, 'usr', 'shared', 'resources', 'db2')
+        shutil.copytree(self._drivers['server1'], shared_dir)
+        admin_task = self._liberty.get_server('server3').get_server_admin_task()
+        admin_task.create_jdbc_driver('db2', '${shared.resource.dir}/db2')
+        admin_task.save()
+        
+        report = self._liberty.consolidate_libraries(dry_run=False)
+        
+        self.assertEqual(shared_dir, report.duplicates[0].target)
+        self.assertTrue('<fileset dir="${shared.resource.dir}/db2" includes="*.jar" />' in self._read_server_xml('server1'))
+
+    def test_shared_directory_with_other_jars_is_not_reused(self):
+        shared_dir = os.path.join(self._liberty_home, 'usr', 'shared', 'resources', 'db2')
+        shutil.copytree(self._drivers['server1'], shared_dir)
+        write_file(os.path.join(shared_dir, 'extra.jar'), 'extra')
+        admin_task = self._liberty.get_server('server3').get_server_admin_task()
+        admin_task.create_jdbc_driver('db2', '${shared.resource.dir}/db2')
+        admin_task.save()
+        server_xml = self._liberty.get_server('server3').get_server_xml()
+        with open(server_xml, 'r') as f:
+            content = f.read().replace('db2" includes="*.jar"', 'db2" includes="driver.jar license.jar"')
+        write_file(server_xml, content)
+        
+        report = self._liberty.consolidate_libraries(dry_run=False)
+        
+        target = report.duplicates[0].target
+        self.assertNotEqual(shared_dir, target)
+        self.assertTrue(os.path.basename(target).startswith('driver-'))
+        self.assertEqual(['driver.jar', 'license.jar'], sorted(os.listdir(target)))
+        self.assertEqual(['README', 'driver.jar', 'extra.jar', 'license.jar'], sorted(os.listdir(shared_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
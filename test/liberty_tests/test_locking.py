@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from liberty.locking import ReadWriteLock, LibertyLockException
+
+
+class TestReadWriteLock(unittest.TestCase):
+    
+    def _start(self, target):
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        return thread
+        
+    def test_readers_share_the_lock(self):
+        lock = ReadWriteLock()
+        entered = threading.Event()
+        
+        def read():
+            with lock.reading():
+                entered.set()
+                
+        with lock.reading():
+            self._start(read)
+            self.assertTrue(entered.wait(5))
+            
+    def test_writer_waits_for_readers(self):
+        lock = ReadWriteLock()
+        written = threading.Event()
+        
+        def write():
+            with lock.writing():
+                written.set()
+                
+        with lock.reading():
+            self._start(write)
+            self.assertFalse(written.wait(0.2))
+        self.assertTrue(written.wait(5))
+        
+    def test_updater_lets_readers_in_but_not_writers(self):
+        lock = ReadWriteLock()
+        read = threading.Event()
+        written = threading.Event()
+        
+        def reader():
+            with lock.reading():
+                read.set()
+                
+        def writer():
+            with lock.writing():
+                written.set()
+                
+        with lock.updating():
+            self._start(writer)
+            self._start(reader)
+            self.assertTrue(read.wait(5))
+            self.assertFalse(written.wait(0.2))
+            with lock.writing():
+                self.assertFalse(written.is_set())
+        self.assertTrue(written.wait(5))
+        
+    def test_locks_are_reentrant(self):
+        lock = ReadWriteLock()
+        with lock.writing():
+            with lock.updating():
+                with lock.writing():
+                    with lock.reading():
+                        pass
+        with lock.reading():
+            with lock.reading():
+                pass
+            self.assertRaises(LibertyLockException, lock.acquire_write)
+            self.assertRaises(LibertyLockException, lock.acquire_update)
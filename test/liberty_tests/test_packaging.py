@@ -0,0 +1,77 @@
+import os
+
+from liberty.liberty import Liberty
+from liberty.packaging import LibertyPackageException
+from liberty_tests import LibertyTestCase, write_file
+
+
+class TestServerPackager(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._write('server1/apps/app.war/index.html', 'hello')
+        self._write('server1/logs/messages.log', 'log')
+        self._write('server1/workarea/state', 'state')
+        self._write('server1/.toolkit/admin.journal', 'journal')
+        self._copy_server('server2')
+        self._write('server2/bootstrap.properties', 'a=b')
+        os.chmod(os.path.join(self._servers_dir, 'server2', 'bootstrap.properties'), 0o600)
+        self._package_dir = os.path.join(self._tmp_dir, 'package')
+        
+    def _write(self, path, content, servers_dir=None):
+        write_file(os.path.join(servers_dir or self._servers_dir, *path.split('/')), content)
+            
+    def _read(self, path, servers_dir):
+        with open(os.path.join(servers_dir, *path.split('/')), 'r') as f:
+            return f.read()
+        
+    def test_package_stores_identical_files_once(self):
+        report = self._liberty.package_servers(None, self._package_dir, processes=2)
+        
+        self.assertEqual(['server1', 'server2'], sorted(report.servers))
+        self.assertEqual(5, report.files)
+        self.assertEqual(3, report.new_objects)
+        objects = [name for _, _, names in os.walk(os.path.join(self._package_dir, 'objects')) for name in names]
+        self.assertEqual(3, len(objects))
+        
+    def test_package_again_writes_only_changes(self):
+        self._liberty.package_servers(['server1', 'server2'], self._package_dir)
+        
+        report = self._liberty.package_servers(['server1', 'server2'], self._package_dir)
+        self.assertEqual((0, 0), (report.hashed_files, report.new_objects))
+        
+        self._write('server2/apps/app.war/index.html', 'hello, world')
+        report = self._liberty.package_servers(['server2'], self._package_dir)
+        self.assertEqual((1, 1), (report.hashed_files, report.new_objects))
+        
+    def test_restore_recreates_servers(self):
+        self._liberty.package_servers(None, self._package_dir)
+        home = os.path.join(self._tmp_dir, 'restored')
+        servers_dir = os.path.join(home, 'usr', 'servers')
+        
+        report = Liberty(home).restore_servers(self._package_dir)
+        
+        self.assertEqual(5, len(report.restored))
+        self.assertEqual('hello', self._read('server2/apps/app.war/index.html', servers_dir))
+        self.assertEqual(self._read('server1/server.xml', self._servers_dir), self._read('server1/server.xml', servers_dir))
+        self.assertEqual(0o600, os.stat(os.path.join(servers_dir, 'server2', 'bootstrap.properties')).st_mode & 0o777)
+        self.assertFalse(os.path.exists(os.path.join(servers_dir, 'server1', 'logs')))
+        self.assertFalse(os.path.exists(os.path.join(servers_dir, 'server1', 'workarea')))
+        self.assertFalse(os.path.exists(os.path.join(servers_dir, 'server1', '.toolkit')))
+        
+        self._write('server1/apps/app.war/index.html', 'changed', servers_dir)
+        self._write('server1/apps/other.war/index.html', 'other', servers_dir)
+        self._write('server1/logs/messages.log', 'log', servers_dir)
+        report = Liberty(home).restore_servers(self._package_dir, ['server1'])
+        self.assertEqual([('server1', 'apps/app.war/index.html')], report.restored)
+        self.assertEqual([('server1', 'apps/other.war/index.html')], report.removed)
+        self.assertEqual(1, report.unchanged)
+        self.assertEqual('hello', self._read('server1/apps/app.war/index.html', servers_dir))
+        self.assertFalse(os.path.exists(os.path.join(servers_dir, 'server1', 'apps', 'other.war')))
+        self.assertEqual('log', self._read('server1/logs/messages.log', servers_dir))
+        
+    def test_restore_rejects_unknown_servers(self):
+        self._liberty.package_servers(['server1'], self._package_dir)
+        
+        self.assertRaises(LibertyPackageException, self._liberty.restore_servers, self._package_dir, ['server2'])
+        self.assertRaises(LibertyPackageException, self._liberty.restore_servers, os.path.join(self._tmp_dir, 'none'))
@@ -0,0 +1,71 @@
+import os
+import unittest
+
+from liberty import security
+from liberty.security import PasswordEncoder, XorPasswordEncoder, LibertySecurityException
+from liberty.serverxml import Builder, ServerModel, BasicRegistry, User, Datasource, DB2JCCProp, KeyStore
+
+
+class TestPasswordEncoders(unittest.TestCase):
+    
+    def test_xor_encode(self):
+        # The value produced by 'securityUtility encode passw0rd'.
+        self.assertEqual('{xor}Lz4sLChvLTs=', XorPasswordEncoder().encode('passw0rd'))
+        
+    def test_xor_round_trip(self):
+        encoder = XorPasswordEncoder()
+        self.assertEqual('p\xc3\xa4ss', encoder.decode(encoder.encode(u'p\xe4ss')))
+        self.assertRaises(LibertySecurityException, encoder.decode, 'plain')
+        
+    def test_xor_encode_all(self):
+        encoder = XorPasswordEncoder()
+        passwords = ['a', '', 'passw0rd', 'longer password']
+        
+        self.assertEqual([encoder.encode(password) for password in passwords], encoder.encode_all(passwords))
+        
+    def test_encoders_must_implement_encode_and_decode(self):
+        class IncompleteEncoder(PasswordEncoder):
+            SCHEME = 'incomplete'
+            
+            def encode(self, password):
+                return password
+            
+        self.assertRaises(TypeError, IncompleteEncoder)
+        
+    def test_is_encoded_matches_known_schemes(self):
+        self.assertTrue(security.is_encoded('{xor}Lz4sLChvLTs='))
+        self.assertTrue(security.is_encoded('{aes}AEmVKa+jOeA7pos+sLx1tBs='))
+        self.assertTrue(security.is_encoded('{hash}ATAAAAAI'))
+        self.assertFalse(security.is_encoded('{secret}'))
+        self.assertFalse(security.is_encoded('{no-tag'))
+        self.assertFalse(security.is_encoded(None))
+        
+    def test_unknown_scheme(self):
+        self.assertRaises(LibertySecurityException, security.encode_password, 'pwd', 'hash')
+        
+
+class TestBulkEncoding(unittest.TestCase):
+    
+    def test_encode_server(self):
+        server = ServerModel()
+        registry = BasicRegistry()
+        for name, password in (('u1', 'p1'), ('u2', '{xor}Lz4sLChvLTs='), ('u3', '{secret}')):
+            user = User()
+            user.name = name
+            user.password = password
+            registry.add(user)
+        server.add(registry)
+        
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'db2_datasource.xml')
+        server.add(Builder().build(xml_file))
+        key_store = KeyStore()
+        key_store.password = 'tester'
+        server.add(key_store)
+        
+        self.assertEqual(4, security.encode_server(server))
+        
+        encoder = XorPasswordEncoder()
+        self.assertEqual(['p1', 'passw0rd', '{secret}'], [encoder.decode(user.password) for user in registry.find_all(User)])
+        self.assertEqual('passw0rd', encoder.decode(server.find(Datasource).find(DB2JCCProp).db_password))
+        self.assertEqual('tester', encoder.decode(key_store.password))
+        self.assertEqual(0, security.encode_server(server))
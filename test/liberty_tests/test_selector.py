@@ -0,0 +1,52 @@
+import os
+import unittest
+
+from liberty.selector import compile_selector, SelectorException
+from liberty.serverxml import Builder, DB2JCCProp, Fileset
+from liberty.validator import IdIndex
+
+
+class TestSelector(unittest.TestCase):
+    
+    def setUp(self):
+        resources = os.path.join(os.path.dirname(__file__), 'resources', 'data')
+        self._server = Builder().build(os.path.join(resources, 'broken_references.xml'))
+        self._server.add(Builder().build(os.path.join(resources, 'db2_datasource.xml')))
+        self._server.add(Builder().build(os.path.join(resources, 'application.xml')))
+        
+    def _ids(self, models):
+        return [model.id for model in models]
+    
+    def test_child_steps_with_attribute_predicates(self):
+        props = list(self._server.select("dataSource[@jdbcDriverRef='db2-driver']/properties.db2.jcc"))
+        
+        self.assertEqual(1, len(props))
+        self.assertTrue(isinstance(props[0], DB2JCCProp))
+        self.assertEqual(['ds1', 'ds3'], self._ids(self._server.select("dataSource[@jdbcDriverRef!='oracle-driver'][@id!='jdbc/ilogDataSource']")))
+        self.assertEqual(['ds1', 'ds2', 'ds3', 'jdbc/ilogDataSource'], self._ids(self._server.select('dataSource[@jndiName]')))
+        
+    def test_descendants_wildcards_and_positions(self):
+        self.assertTrue(isinstance(self._server.select_one('//fileset'), Fileset))
+        self.assertEqual(['resAdministrators', 'resDeployers'],
+                         [role.name for role in self._server.select('application/*/security-role')])
+        self.assertEqual(['resDeployers'], [role.name for role in self._server.select('//application-bnd/security-role[2]')])
+        self.assertEqual(['db2Lib'], self._ids(self._server.select("//*[@id='db2Lib']")))
+        self.assertEqual(None, self._server.select_one('noSuchElement'))
+        
+    def test_text_predicate(self):
+        feature_manager = Builder().build(os.path.join(os.path.dirname(__file__), 'resources', 'data', 'feature_manager.xml'))
+        
+        self.assertEqual(['jsp-2.2'], [feature.value for feature in feature_manager.select("feature[text()='jsp-2.2']")])
+        
+    def test_select_with_id_index(self):
+        index = IdIndex([self._server])
+        
+        self.assertEqual(['ds1', 'ds1'], self._ids(self._server.select("//*[@id='ds1']", index)))
+        self.assertEqual(['keyStore'], [model.get_element_name() for model in self._server.select("//keyStore[@id='ds1']", index)])
+        
+    def test_compiled_selectors_are_cached(self):
+        self.assertTrue(compile_selector('a/b') is compile_selector('a/b'))
+        
+    def test_invalid_selectors(self):
+        for text in ('', 'a/', 'a//', '[1]', 'a b', 'a[0]', "a[@b='c]"):
+            self.assertRaises(SelectorException, compile_selector, text)
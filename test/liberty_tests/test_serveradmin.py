@@ -0,0 +1,206 @@
+import os
+import threading
+
+from liberty.serveradmin import LibertyAdminTaskException
+from liberty.serverxml import FeatureManager, BasicRegistry, XmlOutputter
+from liberty_tests import LibertyTestCase
+
+
+class TestAdminTask(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server = self._liberty.get_server('server1')
+        
+    def _read_server_xml(self):
+        with open(self._server.get_server_xml(), 'r') as f:
+            return f.read()
+        
+    def test_save_unchanged_model_leaves_file_untouched(self):
+        os.utime(self._server.get_server_xml(), (0, 0))
+        
+        self._server.get_server_admin_task().save()
+        
+        self.assertEqual(0, os.path.getmtime(self._server.get_server_xml()))
+        
+    def test_save_keeps_unmodelled_elements(self):
+        with open(self._server.get_server_xml(), 'w') as f:
+            f.write('<server>\n    <logging maxFiles="5" />\n    <featureManager>\n    </featureManager>\n</server>')
+        admin_task = self._server.get_server_admin_task()
+        
+        admin_task.add_features(['jsp-2.2'])
+        admin_task.save()
+        
+        self.assertEqual('<server>\n    <logging maxFiles="5" />\n    <featureManager>\n        <feature>jsp-2.2</feature>\n    </featureManager>\n</server>',
+                         self._read_server_xml())
+        
+    def test_add_features_rejects_unknown_features(self):
+        admin_task = self._server.get_server_admin_task()
+        
+        self.assertRaises(LibertyAdminTaskException, admin_task.add_features, ['noSuchFeature-1.0'], True)
+        self.assertRaises(LibertyAdminTaskException, admin_task.add_features, ['servlet-3.1'], True)
+        
+        admin_task.add_features(['jsp-2.2', 'jsp-2.2'], True)
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], admin_task._server_model.find(FeatureManager).list_features())
+        
+    def test_create_user_with_encoded_password(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task.create_basic_registry('basic', 'realm')
+        
+        admin_task.create_user('admin', 'passw0rd', encode='xor')
+        admin_task.save()
+        
+        self.assertTrue('<user name="admin" password="{xor}Lz4sLChvLTs=" />' in self._read_server_xml())
+        
+    def test_tuning_elements(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task.create_db2_datasource('jdbc/db', 'db2', 'db', 'u', 'p', 'localhost', 50000)
+        admin_task.add_managed_executor_service('concurrent/exec')
+        
+        admin_task.set_connection_pool('jdbc/db', max_pool_size=20, min_pool_size=5, aged_timeout='10m')
+        admin_task.set_executor(core_threads=4, max_threads=16)
+        admin_task.set_http_options(keep_alive_enabled=True, persist_timeout='30s')
+        admin_task.set_concurrency_policy('concurrent/exec', max_concurrency=2)
+        admin_task.save()
+        
+        content = self._read_server_xml()
+        self.assertTrue('<connectionManager agedTimeout="10m" maxPoolSize="20" minPoolSize="5" />' in content)
+        self.assertTrue('<executor coreThreads="4" maxThreads="16" />' in content)
+        self.assertTrue('<httpOptions keepAliveEnabled="true" persistTimeout="30s" />' in content)
+        self.assertTrue('<concurrencyPolicy max="2" />' in content)
+        self.assertRaises(LibertyAdminTaskException, admin_task.set_connection_pool, 'jdbc/none', 10)
+        
+    def test_enable_access_logging(self):
+        admin_task = self._server.get_server_admin_task()
+        
+        admin_task.enable_access_logging(max_files=3)
+        admin_task.save()
+        
+        self.assertTrue('<accessLogging logFormat="%h %u %t &quot;%r&quot; %s %b %D" maxFiles="3" />' in self._read_server_xml())
+        
+        
+class TestAdminTaskJournal(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server = self._liberty.get_server('server1')
+        
+    def _features(self, admin_task):
+        return admin_task._server_model.find(FeatureManager).list_features()
+        
+    def test_unsaved_operations_are_replayed(self):
+        admin_task = self._server.get_server_admin_task(journal=True)
+        admin_task.add_features(['jsp-2.2'])
+        admin_task.create_basic_registry('basic', 'realm')
+        admin_task.create_user('admin', 'passw0rd', encode='xor')
+        # No save: the process "crashes" here.
+        
+        replayed = self._server.get_server_admin_task(journal=True)
+        
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], self._features(replayed))
+        self.assertEqual(['add_features', 'create_basic_registry', 'create_user'], [op['op'] for op in replayed.history()])
+        self.assertEqual({'username': 'admin', 'password': '{xor}Lz4sLChvLTs=', 'encode': None}, replayed.history()[2]['args'])
+        
+    def test_undo(self):
+        admin_task = self._server.get_server_admin_task(journal=True)
+        admin_task.add_features(['jsp-2.2'])
+        admin_task.add_features(['jdbc-4.1'])
+        admin_task.modify_http_endpoints(10080, 10443)
+        
+        admin_task.undo(2)
+        
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], self._features(admin_task))
+        self.assertEqual(('9080', '9443'), admin_task.get_ports())
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], self._features(self._server.get_server_admin_task(journal=True)))
+        self.assertRaises(LibertyAdminTaskException, admin_task.undo, 2)
+        
+    def test_save_compacts_the_journal(self):
+        admin_task = self._server.get_server_admin_task(journal=True)
+        admin_task.add_features(['jsp-2.2'])
+        admin_task.save()
+        
+        self.assertEqual([], admin_task.history())
+        self.assertTrue('<feature>jsp-2.2</feature>' in self._read_server_xml())
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], self._features(self._server.get_server_admin_task(journal=True)))
+        self.assertRaises(LibertyAdminTaskException, admin_task.undo)
+        
+    def test_compact_after(self):
+        admin_task = self._server.get_server_admin_task(journal=True, compact_after=2)
+        admin_task.create_basic_registry('basic', 'realm')
+        admin_task.create_group('g1')
+        admin_task.create_group('g2')
+        
+        self.assertEqual(1, len(admin_task.history()))
+        self.assertTrue('<group name="g1" />' in self._read_server_xml())
+        
+    def test_server_xml_changed_outside_the_journal(self):
+        admin_task = self._server.get_server_admin_task(journal=True)
+        admin_task.add_features(['jsp-2.2'])
+        with open(self._server.get_server_xml(), 'a') as f:
+            f.write('\n')
+        
+        self.assertRaises(LibertyAdminTaskException, self._server.get_server_admin_task, True)
+        
+    def _read_server_xml(self):
+        with open(self._server.get_server_xml(), 'r') as f:
+            return f.read()
+
+
+class TestConcurrentAdminTask(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server = self._liberty.get_server('server1')
+        
+    def test_queries_stay_consistent_under_contention(self):
+        admin_task = self._server.get_server_admin_task(journal=True, compact_after=25, concurrent=True)
+        admin_task.create_basic_registry('basic', 'realm')
+        admin_task.modify_http_endpoints('9000', '10000')
+        users = 200
+        errors = []
+        done = threading.Event()
+        
+        def write():
+            try:
+                for i in range(users):
+                    admin_task.modify_http_endpoints(str(9000 + i), str(10000 + i))
+                    admin_task.create_user('user{0}'.format(i), 'secret')
+                    if i % 10 == 0:
+                        admin_task.save()
+                    if i % 50 == 49:
+                        admin_task.undo()
+                        admin_task.create_user('user{0}'.format(i), 'secret')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+        
+        def read():
+            try:
+                while not done.is_set():
+                    http_port, https_port = admin_task.get_ports()
+                    if int(https_port) - int(http_port) != 1000:
+                        errors.append('Inconsistent ports {0} {1}'.format(http_port, https_port))
+                    with admin_task.reading() as model:
+                        names = [user.name for user in model.find(BasicRegistry).children()]
+                        if len(names) != len(set(names)):
+                            errors.append('Duplicate users {0}'.format(names))
+                        XmlOutputter().output(model)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        admin_task.save()
+        admin_task.close()
+        
+        self.assertEqual([], errors)
+        with admin_task.reading() as model:
+            self.assertEqual(users, len(model.find(BasicRegistry).children()))
+            content = XmlOutputter().output(model)
+        with open(self._server.get_server_xml(), 'r') as f:
+            self.assertEqual(content, f.read())
+        self.assertEqual(('9199', '10199'), admin_task.get_ports())
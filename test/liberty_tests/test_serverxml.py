@@ -4,7 +4,7 @@ import unittest
 from liberty.serverxml import Builder, XmlOutputter, ServerModel, FeatureManager, \
     HttpEndpoint, BasicRegistry, User, Group, Library, Fileset, JdbcDriver, \
     DB2JCCProp, OracleProp, Datasource, Application, \
-    SecurityRole, Feature, KeyStore, ManagedExecutorService, SSL
+    SecurityRole, Feature, KeyStore, ManagedExecutorService, SSL, GenericElement
 
 
 class TestBuilder(unittest.TestCase):
@@ -146,6 +146,24 @@ class TestBuilder(unittest.TestCase):
         self.assertEqual('defaultKeyStore', model.key_store_ref)
         self.assertEqual('TLS', model.ssl_protocol)
         
+    def test_build_unmodelled_elements(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        model = self._builder.build(xml_file)
+        
+        self.assertEqual(['featureManager', 'include', 'variable', 'logging', 'httpEndpoint', 'dataSource', 'basicRegistry'],
+                         [child.get_element_name() for child in model.children()])
+        self.assertEqual(['servlet-3.0', 'jsp-2.2'], model.find(FeatureManager).list_features())
+        
+        variable = model.children()[2]
+        self.assertTrue(isinstance(variable, GenericElement))
+        self.assertEqual('variable', variable.tag)
+        self.assertEqual(['name', 'value'], list(variable.attributes.keys()))
+        self.assertEqual('x & y', variable.get('value'))
+        
+        connection_manager = model.find(Datasource).children()[0]
+        self.assertEqual('connectionManager', connection_manager.get_element_name())
+        self.assertEqual('10', connection_manager.get('maxPoolSize'))
+        
 
 class TestXmlOutputter(unittest.TestCase):
     
@@ -310,6 +328,49 @@ class TestXmlOutputter(unittest.TestCase):
         expect = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'expect_ssl.txt') 
         self.assertEqual(self._read_from_file(expect), outputter.output(model))
         
+    def test_output_generic_element(self):
+        outputter = XmlOutputter()
+        model = GenericElement('variable')
+        model.set('name', 'greeting')
+        model.set('value', '"hello" & <bye>')
+        
+        self.assertEqual('<variable name="greeting" value="&quot;hello&quot; &amp; &lt;bye&gt;" />', outputter.output(model))
+        
+    def test_output_unchanged_model_is_identical(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        model = Builder().build(xml_file)
+        
+        self.assertEqual(self._read_from_file(xml_file), XmlOutputter().output(model))
+        
+    def test_output_modified_model_keeps_unchanged_text(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        model = Builder().build(xml_file)
+        model.find(FeatureManager).add_features(['jdbc-4.1'])
+        model.find(HttpEndpoint).http_port = '9081'
+        model.remove(model.find(Datasource))
+        
+        expect = self._read_from_file(xml_file)
+        expect = expect.replace("\t<feature>jsp-2.2</feature>\n", "\t<feature>jsp-2.2</feature>\n        <feature>jdbc-4.1</feature>\n")
+        expect = expect.replace('httpPort="9080"', 'httpPort="9081"')
+        start = expect.index('    <dataSource')
+        expect = expect[:start] + expect[expect.index('    <basicRegistry'):]
+        self.assertEqual(expect, XmlOutputter().output(model))
+
+    def test_output_keeps_close_tag_indent_when_last_children_are_removed(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        model = Builder().build(xml_file)
+        datasource = model.find(Datasource)
+        datasource.remove(datasource.children()[-1])
+
+        expect = self._read_from_file(xml_file)
+        expect = expect.replace('        <properties.db2.jcc serverName="h" portNumber="1"/>\n', '')
+        self.assertEqual(expect, XmlOutputter().output(model))
+
+        datasource.remove(datasource.children()[0])
+        start = expect.index('        <connectionManager')
+        expect = expect[:start] + expect[expect.index('    </dataSource>'):]
+        self.assertEqual(expect, XmlOutputter().output(model))
+
         
 class TestElementModel(unittest.TestCase):
     
@@ -343,4 +404,92 @@ class TestElementModel(unittest.TestCase):
         features = feature_manager.find_all(Feature)
         self.assertEqual(2, len(features))
         self.assertEqual('test1', features[0].value)
-        self.assertEqual('test2', features[1].value)
\ No newline at end of file
+        self.assertEqual('test2', features[1].value)
+        
+    def test_fork_is_independent(self):
+        server = self._server_model()
+        fork = server.fork()
+        
+        fork.set('desc', 'forked')
+        fork.find(FeatureManager).add_features(['test3'])
+        fork.find(FeatureManager).children()[0].value = 'changed'
+        self.assertEqual('test_desc', server.get('desc'))
+        self.assertEqual(['test1', 'test2'], server.find(FeatureManager).list_features())
+        self.assertEqual(['changed', 'test2', 'test3'], fork.find(FeatureManager).list_features())
+        
+        server.remove(server.find(FeatureManager))
+        server.set('desc', 'original')
+        self.assertEqual('forked', fork.get('desc'))
+        self.assertEqual(1, len(fork.children()))
+        
+    def test_fork_copies_only_the_reached_path(self):
+        server = self._server_model()
+        feature_manager = server.find(FeatureManager)
+        fork = server.fork()
+        
+        self.assertIs(server.attributes, fork.attributes)
+        forked_manager = fork.find(FeatureManager)
+        self.assertIsNot(feature_manager, forked_manager)
+        self.assertIs(feature_manager.attributes, forked_manager.attributes)
+        self.assertIs(feature_manager, server.find(FeatureManager))
+        
+        forked_manager.set('id', 'fm')
+        self.assertIsNot(feature_manager.attributes, forked_manager.attributes)
+        self.assertEqual(None, feature_manager.id)
+        
+    def test_snapshot_survives_changes(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        with open(xml_file, 'rb') as f:
+            original = f.read()
+        model = Builder().build(xml_file)
+        snapshot = model.snapshot()
+        
+        model.find(HttpEndpoint).http_port = 9081
+        model.find(FeatureManager).add_features(['jdbc-4.1'])
+        second = snapshot.fork()
+        second.find(HttpEndpoint).https_port = 9444
+        
+        self.assertEqual(original, XmlOutputter().output(snapshot))
+        self.assertNotEqual(original, XmlOutputter().output(model))
+        self.assertEqual(original.replace('"9443"', '"9444"'), XmlOutputter().output(second))
+        
+    def test_changing_the_original_keeps_the_snapshot_lazy(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        with open(xml_file, 'rb') as f:
+            original = f.read()
+        model = Builder().build(xml_file)
+        feature_manager = model.find(FeatureManager)
+        snapshot = model.snapshot()
+        
+        feature_manager.children()[0].value = 'servlet-3.1'
+        model.find(HttpEndpoint).http_port = 9081
+        XmlOutputter().output(model)
+        
+        self.assertIs(model, snapshot._base)
+        self.assertIs(feature_manager, model.find(FeatureManager))
+        self.assertEqual(original, XmlOutputter().output(snapshot))
+        
+        del snapshot
+        model.find(HttpEndpoint).http_port = 9082
+        self.assertEqual(None, model.find(HttpEndpoint)._history)
+        
+    def test_fork_read_in_full_keeps_its_state(self):
+        xml_file = os.path.join(os.path.dirname(__file__), 'resources', 'data', 'unmodelled_server.xml')
+        model = Builder().build(xml_file)
+        model.find(HttpEndpoint).http_port = '9081'
+        snapshot = model.snapshot()
+        expect = XmlOutputter().output(snapshot)
+        
+        model.find(HttpEndpoint).http_port = '1'
+        model.find(FeatureManager).add_features(['jdbc-4.1'])
+        
+        self.assertEqual(expect, XmlOutputter().output(snapshot))
+        self.assertEqual('9081', snapshot.find(HttpEndpoint).http_port)
+        
+        root = GenericElement('root')
+        child = GenericElement('child')
+        root.add(child)
+        fork = root.fork()
+        self.assertEqual('<root>\n    <child />\n</root>', XmlOutputter().output(fork))
+        child.set('k', 'v')
+        self.assertEqual('<root>\n    <child />\n</root>', XmlOutputter().output(fork))
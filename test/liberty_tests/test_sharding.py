@@ -0,0 +1,93 @@
+import os
+
+from liberty.daemon import _stamp
+from liberty.serverxml import Datasource
+from liberty.sharding import load_server_xml
+from liberty.validator import validate_file
+from liberty_tests import LibertyTestCase
+
+
+class TestShardedSave(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server = self._liberty.get_server('server1')
+        self._server_dir = os.path.dirname(self._server.get_server_xml())
+        
+        admin_task = self._server.get_server_admin_task()
+        admin_task.create_basic_registry('basic', 'realm')
+        admin_task.create_user('alice', 'secret')
+        admin_task.create_jdbc_driver('db2', '/opt/db2')
+        admin_task.create_db2_datasource('jdbc/orders', 'db2', 'ORDERS', 'user', 'pwd', 'localhost', '50000')
+        admin_task.save()
+        self._single_file = self._read('server.xml')
+        admin_task.save(sharded=True)
+        
+    def _path(self, location):
+        return os.path.join(self._server_dir, *location.split('/'))
+        
+    def _read(self, location):
+        with open(self._path(location), 'r') as f:
+            return f.read()
+        
+    def _fragments(self):
+        return sorted(os.listdir(self._path('fragments')))
+        
+    def _touch_all(self):
+        for location in ['server.xml'] + ['fragments/' + name for name in self._fragments()]:
+            os.utime(self._path(location), (0, 0))
+        
+    def test_sharded_save_writes_includes(self):
+        self.assertEqual(['basicRegistry.xml', 'dataSource-jdbc_orders.xml', 'jdbcDriver-db2.xml'], self._fragments())
+        server_xml = self._read('server.xml')
+        self.assertTrue('<include location="fragments/basicRegistry.xml" />' in server_xml)
+        self.assertFalse('alice' in server_xml)
+        self.assertTrue(self._read('fragments/basicRegistry.xml').startswith('<?xml version="1.0" encoding="UTF-8"?>\n<server>'))
+        self.assertTrue('alice' in self._read('fragments/basicRegistry.xml'))
+        
+    def test_unsharded_save_restores_single_file(self):
+        admin_task = self._server.get_server_admin_task()
+        self.assertEqual(['jdbc/orders'], [datasource.id for datasource in admin_task._server_model.find_all(Datasource)])
+        
+        admin_task.save(sharded=False)
+        
+        self.assertEqual(self._single_file, self._read('server.xml'))
+        self.assertEqual([], self._fragments())
+        
+    def test_save_rewrites_only_changed_fragments(self):
+        self._touch_all()
+        admin_task = self._server.get_server_admin_task()
+        
+        admin_task.save()
+        self.assertEqual([0, 0, 0, 0], [os.path.getmtime(self._path(location)) for location in
+                                        ['server.xml'] + ['fragments/' + name for name in self._fragments()]])
+        
+        admin_task.create_user('bob', 'secret')
+        admin_task.save()
+        
+        self.assertNotEqual(0, os.path.getmtime(self._path('fragments/basicRegistry.xml')))
+        self.assertEqual(0, os.path.getmtime(self._path('server.xml')))
+        self.assertEqual(0, os.path.getmtime(self._path('fragments/jdbcDriver-db2.xml')))
+        self.assertTrue('bob' in self._read('fragments/basicRegistry.xml'))
+        
+    def test_save_removes_fragments_of_removed_elements(self):
+        admin_task = self._server.get_server_admin_task()
+        admin_task._server_model.remove(admin_task._server_model.find(Datasource))
+        
+        admin_task.save()
+        
+        self.assertEqual(['basicRegistry.xml', 'jdbcDriver-db2.xml'], self._fragments())
+        self.assertFalse('dataSource' in self._read('server.xml'))
+        
+    def test_readers_see_the_fragments(self):
+        model, fragments = load_server_xml(self._server.get_server_xml())
+        
+        self.assertEqual(['jdbc/orders'], [datasource.id for datasource in model.find_all(Datasource)])
+        self.assertEqual(3, len(fragments))
+        self.assertTrue(validate_file(self._server.get_server_xml()).is_valid())
+        
+    def test_stamp_covers_the_fragments(self):
+        stamp = _stamp(self._server.get_server_xml())
+        os.utime(self._path('fragments/basicRegistry.xml'), (0, 0))
+        
+        self.assertNotEqual(stamp, _stamp(self._server.get_server_xml()))
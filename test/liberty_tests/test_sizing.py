@@ -0,0 +1,77 @@
+import os
+
+from liberty.serverxml import ServerModel, Datasource, ManagedExecutorService
+from liberty.sizing import HostInfo, SizingAdvisor, LibertySizingException, parse_size, read_heap
+from liberty_tests import LibertyTestCase, write_file
+
+
+class TestSizing(LibertyTestCase):
+    
+    def _write(self, name, content):
+        return write_file(os.path.join(self._tmp_dir, name), content)
+    
+    def _model(self, datasources, executors=()):
+        model = ServerModel()
+        for jndi in datasources:
+            datasource = Datasource()
+            datasource.jndi = jndi
+            model.add(datasource)
+        for jndi in executors:
+            executor = ManagedExecutorService()
+            executor.jndi_name = jndi
+            model.add(executor)
+        return model
+        
+    def test_read_host(self):
+        self._write('cpuinfo', 'processor\t: 0\nmodel name\t: x\n\nprocessor\t: 1\nmodel name\t: x\n')
+        self._write('meminfo', 'MemTotal:        8192000 kB\nMemFree:         1024 kB\n')
+        
+        host = HostInfo.read(self._tmp_dir)
+        
+        self.assertEqual(2, host.cpus)
+        self.assertEqual(8192000 * 1024, host.memory)
+        
+    def test_read_heap(self):
+        jvm_options = self._write('jvm.options', '# heap\n-Xms256m\n-Xmx512m\n-Xmx1g\n')
+        
+        self.assertEqual(1024 ** 3, read_heap(jvm_options))
+        self.assertEqual(None, read_heap(os.path.join(self._tmp_dir, 'missing.options')))
+        self.assertEqual(2048, parse_size('2k'))
+        self.assertRaises(LibertySizingException, parse_size, '2x')
+        
+    def test_advise_models(self):
+        advisor = SizingAdvisor(HostInfo(8, 4 * 1024 ** 3))
+        
+        report = advisor.advise_models([('s1', self._model(['jdbc/a', 'jdbc/b'], ['concurrent/e']), 512 * 1024 ** 2),
+                                        ('s2', self._model([]), 64 * 1024 ** 2)])
+        
+        s1, s2 = report.servers
+        self.assertEqual((8, 32), (s1.core_threads, s1.max_threads))
+        self.assertEqual({'jdbc/a': (4, 16), 'jdbc/b': (4, 16)}, s1.pools)
+        self.assertEqual({'concurrent/e': 4}, s1.concurrency)
+        self.assertEqual((8, 8), (s2.core_threads, s2.max_threads))
+        self.assertEqual([], report.warnings)
+        
+    def test_overcommitted_host(self):
+        advisor = SizingAdvisor(HostInfo(1, 1024 ** 3))
+        
+        report = advisor.advise_models([('s1', self._model([]), None), ('s2', self._model([]), 1024 ** 3)])
+        
+        self.assertEqual(2, len(report.warnings))
+        self.assertEqual(256 * 1024 ** 2, report.get('s1').heap)
+        self.assertEqual(2, report.get('s1').core_threads)
+        self.assertTrue('WARNING: 2 servers share 1 cpus.' in report.format())
+        
+    def test_advise_liberty_and_apply(self):
+        server = self._liberty.get_server('server1')
+        write_file(os.path.join(server.get_home(), 'jvm.options'), '-Xmx256m\n')
+        
+        report = self._liberty.advise_sizing(host=HostInfo(4, 2 * 1024 ** 3))
+        sizing = report.get('server1')
+        self.assertEqual(256 * 1024 ** 2, sizing.heap)
+        
+        admin_task = server.get_server_admin_task()
+        admin_task.apply_sizing(sizing)
+        admin_task.save()
+        with open(server.get_server_xml(), 'r') as f:
+            self.assertTrue('<executor coreThreads="8" maxThreads="32" />' in f.read())
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+from liberty.startup import parse_messages, parse_timestamp
+from liberty_tests import LibertyTestCase, write_file
+
+
+_HEADER = '''********************************************************************************
+product = WebSphere Application Server 8.5.5.9 (wlp-1.0.12.cl50920160227-1523)
+********************************************************************************
+'''
+
+_LINE = '[3/10/16 10:{0:02d}:{1:02d}:{2:03d} EST] 00000001 com.ibm.ws.Component                                   I {3}: {4}\n'
+
+
+def _messages(start_minute, events):
+    lines = [_HEADER]
+    for offset, code, message in events:
+        millis = int(round(offset * 1000))
+        lines.append(_LINE.format(start_minute + millis // 60000, millis // 1000 % 60, millis % 1000, code, message))
+    return ''.join(lines)
+
+
+def _start(start_minute, app_seconds=1.5, features='jsp-2.2, servlet-3.0'):
+    return _messages(start_minute, [
+        (0.0, 'CWWKE0001I', 'The server server1 has been launched.'),
+        (2.0, 'CWWKF0007I', 'Feature update started.'),
+        (2.5, 'CWWKO0219I', 'TCP Channel defaultHttpEndpoint has been started and is now listening for requests on host *  (IPv6) port 9080.'),
+        (3.0, 'CWWKZ0018I', 'Starting application app.'),
+        (3.0 + app_seconds, 'CWWKZ0001I', 'Application app started in {0} seconds.'.format(app_seconds)),
+        (5.0 + app_seconds, 'CWWKF0012I', 'The server installed the following features: [{0}].'.format(features)),
+        (5.5 + app_seconds, 'CWWKF0011I', 'The server server1 is ready to run a smarter planet.'),
+    ])
+
+
+class TestStartupAnalyzer(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._copy_server('server2')
+        
+    def _write_log(self, server_name, content, name='messages.log'):
+        write_file(os.path.join(self._liberty.get_server(server_name).get_output_dir(), 'logs', name), content)
+        
+    def test_parse_timestamp(self):
+        self.assertEqual(1457605291.123, parse_timestamp('3/10/16 10:21:31:123 EST'))
+        self.assertEqual(1457605291.123, parse_timestamp('2016-03-10T10:21:31.123-0500'))
+        self.assertEqual(None, parse_timestamp('yesterday'))
+        
+    def test_phases(self):
+        profile, = parse_messages(_start(0).splitlines(True), 'server1')
+        
+        self.assertEqual(7.0, profile.ready)
+        self.assertEqual({'kernel': 2.0, 'features': 3.0, 'ports': 0.5, 'app:app': 1.5}, profile.phases())
+        self.assertEqual(['jsp-2.2', 'servlet-3.0'], profile.installed_features)
+        self.assertEqual({9080: 2.5}, profile.ports)
+        self.assertEqual(('features', 3.0), profile.slowest_phase())
+        
+    def test_incomplete_start(self):
+        profile, = parse_messages(_start(0).splitlines(True)[:6])
+        
+        self.assertFalse(profile.is_complete())
+        self.assertEqual(2.0, profile.kernel)
+        
+    def test_history_survives_log_rotation(self):
+        self._write_log('server1', _start(0), 'messages_16.03.10_10.00.00.0.log')
+        self._write_log('server1', _start(10, app_seconds=4.0, features='jsp-2.2, servlet-3.0, jdbc-4.1'))
+        server = self._liberty.get_server('server1')
+        
+        first, second = server.analyze_startup()
+        os.remove(os.path.join(server.get_output_dir(), 'logs', 'messages_16.03.10_10.00.00.0.log'))
+        self.assertEqual(2, len(server.analyze_startup()))
+        
+        diff = second.diff(first)
+        self.assertEqual(2.5, diff.get_delta())
+        self.assertEqual(['jdbc-4.1'], diff.added_features)
+        self.assertEqual(('app:app', 1.5, 4.0), diff.changes[0])
+        
+    def test_rank_servers_by_slowest_phase(self):
+        self._write_log('server1', _start(0))
+        self._write_log('server2', _start(0, app_seconds=9.0))
+        
+        ranking = self._liberty.rank_startups()
+        
+        self.assertEqual([('server2', 'app:app', 9.0, 14.5), ('server1', 'features', 3.0, 7.0)], ranking.entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+
+from liberty.liberty import Liberty
+from liberty.status import RUNNING, STOPPED
+from liberty_tests import LibertyTestCase
+
+
+_DUMMY_SERVER = '''
+import socket, sys, time
+s = socket.socket()
+s.bind(('127.0.0.1', 0))
+s.listen(1)
+sys.stdout.write('%d\\n' % s.getsockname()[1])
+sys.stdout.flush()
+time.sleep(60)
+'''
+
+
+class MockLiberty(Liberty):
+    
+    def __init__(self, liberty_home, exit_code):
+        Liberty.__init__(self, liberty_home)
+        self.log = []
+        self._exit_code = exit_code
+    
+    def _execute_cmd(self, _cmd):
+        self.log.append(_cmd)
+        return self._exit_code
+
+
+class TestServerStatus(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._copy_server('server2')
+        self._process = None
+        
+    def tearDown(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        LibertyTestCase.tearDown(self)
+        
+    def _start_dummy_server(self, server_name):
+        self._process = subprocess.Popen([sys.executable, '-c', _DUMMY_SERVER], stdout=subprocess.PIPE)
+        port = int(self._process.stdout.readline())
+        pid_dir = os.path.join(self._liberty_home, 'usr', 'servers', '.pid')
+        if not os.path.isdir(pid_dir):
+            os.makedirs(pid_dir)
+        with open(os.path.join(pid_dir, server_name + '.pid'), 'w') as f:
+            f.write(str(self._process.pid))
+        return port
+        
+    def test_status_without_pid_file(self):
+        status = self._liberty.get_server('server1').status()
+        
+        self.assertEqual(STOPPED, status.state)
+        self.assertEqual(None, status.pid)
+        
+    def test_status_of_running_server(self):
+        port = self._start_dummy_server('server1')
+        
+        status = self._liberty.get_server('server1').status()
+        
+        self.assertEqual(RUNNING, status.state)
+        self.assertEqual(self._process.pid, status.pid)
+        self.assertEqual([port], status.ports)
+        
+    def test_status_with_stale_pid_file(self):
+        self._start_dummy_server('server1')
+        self._process.kill()
+        self._process.wait()
+        
+        self.assertEqual(STOPPED, self._liberty.get_server('server1').status().state)
+        
+    def test_statuses(self):
+        self._start_dummy_server('server2')
+        
+        statuses = self._liberty.statuses()
+        
+        self.assertEqual([('server1', STOPPED), ('server2', RUNNING)],
+                         sorted((status.name, status.state) for status in statuses))
+        
+    def test_status_confirmed_by_script(self):
+        liberty = MockLiberty(self._liberty_home, 0)
+        
+        status = liberty.get_server('server1').status(confirm=True)
+        
+        self.assertEqual(RUNNING, status.state)
+        self.assertTrue(status.confirmed)
+        self.assertEqual([['status', 'server1']], liberty.log)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from liberty.serveradmin import LibertyAdminTaskException
+from liberty.serverxml import Builder, GenericElement
+from liberty.validator import ConfigValidator, validate_servers, MISSING_REFERENCE, WRONG_REFERENCE_TYPE
+from liberty_tests import LibertyTestCase, RESOURCES_DIR
+
+
+class TestConfigValidator(unittest.TestCase):
+    
+    def _build(self, name):
+        return Builder().build(os.path.join(os.path.dirname(__file__), 'resources', 'data', name))
+    
+    def _build_text(self, text):
+        fd, path = tempfile.mkstemp(suffix='.xml')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            return Builder().build(path)
+        finally:
+            os.remove(path)
+    
+    def test_valid_configuration(self):
+        report = ConfigValidator().validate(self._build('jdbc_driver.xml'))
+        
+        self.assertTrue(report.is_valid())
+        self.assertEqual('', report.format())
+        
+    def test_broken_references(self):
+        report = ConfigValidator().validate(self._build('broken_references.xml'))
+        
+        self.assertEqual([MISSING_REFERENCE, WRONG_REFERENCE_TYPE, MISSING_REFERENCE],
+                         [issue.kind for issue in report.issues])
+        self.assertEqual("<dataSource id='ds2'> jdbcDriverRef='oracle-driver' does not match any element id", report.issues[0].message)
+        self.assertEqual("<dataSource id='ds3'> jdbcDriverRef='db2Lib' points to a library, not a jdbcDriver", report.issues[1].message)
+        self.assertEqual("<classloader> commonLibraryRef='missingLib' does not match any element id", report.issues[2].message)
+        
+    def test_ids_are_scoped_by_element_type(self):
+        report = ConfigValidator().validate(self._build_text(
+            '<server><keyStore id="store" /><library id="store" /><ssl id="ssl" keyStoreRef="store" /></server>'))
+        
+        self.assertTrue(report.is_valid())
+        
+    def test_reference_to_a_differently_named_element(self):
+        report = ConfigValidator().validate(self._build_text(
+            '<server><jaasLoginModule id="custom" /><jaasLoginContextEntry id="system.WEB_INBOUND" loginModuleRef="custom" />'
+            '<library id="lib" /><jaasLoginContextEntry id="other" loginModuleRef="lib" /></server>'))
+        
+        self.assertEqual([WRONG_REFERENCE_TYPE], [issue.kind for issue in report.issues])
+        self.assertEqual("<jaasLoginContextEntry id='other'> loginModuleRef='lib' points to a library, not a jaasLoginModule",
+                         report.issues[0].message)
+        
+    def test_elements_with_the_same_id_are_merged(self):
+        report = ConfigValidator().validate(self._build_text(
+            '<server><jdbcDriver id="driver" /><dataSource id="ds" jdbcDriverRef="missing" />'
+            '<dataSource id="ds" jdbcDriverRef="driver" /></server>'))
+        
+        self.assertTrue(report.is_valid())
+        
+    def test_references_resolved_across_models(self):
+        report = ConfigValidator().validate(self._build('db2_datasource.xml'), self._build('jdbc_driver.xml'))
+        
+        self.assertTrue(report.is_valid())
+        
+
+class TestValidateServers(LibertyTestCase):
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        broken_dir = os.path.join(self._servers_dir, 'broken')
+        os.makedirs(broken_dir)
+        shutil.copy(os.path.join(RESOURCES_DIR, 'data', 'broken_references.xml'), os.path.join(broken_dir, 'server.xml'))
+        
+    def test_validate_servers(self):
+        reports = validate_servers(self._liberty, processes=2)
+        
+        self.assertEqual(['broken', 'server1'], sorted(reports))
+        self.assertTrue(reports['server1'].is_valid())
+        self.assertEqual(3, len(reports['broken'].issues))
+        
+    def test_save_with_validation(self):
+        admin_task = self._liberty.get_server('server1').get_server_admin_task()
+        admin_task.create_jdbc_driver('db2-driver', '/opt/db2')
+        admin_task.create_jdbc_driver('oracle-driver', '/opt/oracle')
+        admin_task.create_db2_datasource('jdbc/ds', 'db2-driver', 'db', 'user', 'pwd', 'localhost', '50000')
+        admin_task.save(validate=True)
+        
+        admin_task.create_oracle_datasource('jdbc/ds2', 'missing-driver', 'db', 'user', 'pwd', 'localhost', '1521')
+        self.assertFalse(admin_task.validate().is_valid())
+        self.assertRaises(LibertyAdminTaskException, admin_task.save, True)
+        
+    def test_save_with_validation_reads_includes(self):
+        server_dir = os.path.join(self._liberty_home, 'usr', 'servers', 'server1')
+        with open(os.path.join(server_dir, 'drivers.xml'), 'w') as f:
+            f.write('<server><jdbcDriver id="included-driver" /></server>')
+        admin_task = self._liberty.get_server('server1').get_server_admin_task()
+        include = GenericElement('include')
+        include.set('location', 'drivers.xml')
+        admin_task._server_model.add(include)
+        admin_task.create_db2_datasource('jdbc/ds', 'included-driver', 'db', 'user', 'pwd', 'localhost', '50000')
+        
+        admin_task.save(validate=True)
+        
+        self.assertTrue(validate_servers(self._liberty, ['server1'])['server1'].is_valid())
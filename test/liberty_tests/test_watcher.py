@@ -0,0 +1,120 @@
+import os
+import time
+
+from liberty.serverxml import HttpEndpoint
+from liberty.watcher import ServerWatcher, ADDED, MODIFIED, REMOVED
+from liberty_tests import LibertyTestCase, write_file
+
+
+class TestServerWatcher(LibertyTestCase):
+    
+    USE_INOTIFY = True
+    
+    def setUp(self):
+        LibertyTestCase.setUp(self)
+        self._server_xml = os.path.join(self._servers_dir, 'server1', 'server.xml')
+        self._watcher = ServerWatcher(self._liberty, debounce=0.05, poll_interval=0.01, use_inotify=self.USE_INOTIFY)
+        
+    def tearDown(self):
+        self._watcher.stop()
+        LibertyTestCase.tearDown(self)
+        
+    def _write(self, path, content):
+        write_file(path, content)
+        # Make sure the polling backend sees a different mtime.
+        os.utime(path, (time.time() + 1, time.time() + 1))
+            
+    def _poll(self):
+        for _ in range(20):
+            published = self._watcher.poll(0.1)
+            if published:
+                return published
+        return []
+    
+    def test_initial_models(self):
+        self.assertEqual(['server1'], self._watcher.servers())
+        self.assertEqual('9080', self._watcher.get_model('server1').find(HttpEndpoint).http_port)
+        
+    def test_modified_element_is_reported_once_per_burst(self):
+        with open(self._server_xml) as f:
+            content = f.read()
+        self._write(self._server_xml, content.replace('9080', '9081'))
+        self._write(self._server_xml, content.replace('9080', '9082'))
+        
+        published = self._poll()
+        
+        self.assertEqual(1, len(published))
+        name, changes = published[0]
+        self.assertEqual('server1', name)
+        self.assertEqual([MODIFIED], [change.kind for change in changes])
+        self.assertEqual('9082', changes[0].element.http_port)
+        self.assertEqual('9082', self._watcher.get_model('server1').find(HttpEndpoint).http_port)
+        
+    def test_new_server_is_reported(self):
+        self._write(os.path.join(self._liberty_home, 'usr', 'servers', 'server2', 'server.xml'),
+                    '<server>\n    <featureManager />\n</server>')
+        
+        published = self._poll()
+        
+        self.assertEqual([('server2', [ADDED])], [(name, [c.kind for c in changes]) for name, changes in published])
+        self.assertEqual(['server1', 'server2'], self._watcher.servers())
+        
+    def test_include_changes_are_reported(self):
+        include = os.path.join(self._liberty_home, 'usr', 'servers', 'server1', 'conf', 'extra.xml')
+        self._write(include, '<server>\n    <logging maxFiles="2" />\n</server>')
+        with open(self._server_xml) as f:
+            content = f.read()
+        self._write(self._server_xml, content.replace('</server>', '    <include location="conf/extra.xml" />\n</server>'))
+        self.assertEqual([ADDED, ADDED], [c.kind for c in self._poll()[0][1]])
+        
+        self._write(include, '<server>\n</server>')
+        
+        published = self._poll()
+        self.assertEqual([REMOVED], [c.kind for c in published[0][1]])
+        self.assertEqual('logging', published[0][1][0].element.get_element_name())
+        
+    def test_dropped_include_is_forgotten(self):
+        include = os.path.join(self._liberty_home, 'usr', 'servers', 'server1', 'conf', 'extra.xml')
+        self._write(include, '<server>\n    <logging maxFiles="2" />\n</server>')
+        with open(self._server_xml) as f:
+            content = f.read()
+        self._write(self._server_xml, content.replace('</server>', '    <include location="conf/extra.xml" />\n</server>'))
+        self._poll()
+        
+        self._write(self._server_xml, content)
+        
+        changes = self._poll()[0][1]
+        self.assertEqual([(REMOVED, 'include'), (REMOVED, 'logging')],
+                         [(change.kind, change.element.get_element_name()) for change in changes])
+        self.assertEqual([self._server_xml], list(self._watcher._servers['server1'].models))
+        
+
+class TestPollingServerWatcher(TestServerWatcher):
+    
+    USE_INOTIFY = False
+    
+    def test_backend(self):
+        self.assertFalse(self._watcher.uses_inotify())
+
+
+class TestLibertyWatch(LibertyTestCase):
+    
+    def test_watch_with_callback_and_iterator(self):
+        received = []
+        watcher = self._liberty.watch(lambda name, changes: received.append(name), debounce=0.05, poll_interval=0.01)
+        try:
+            changes = watcher.changes(timeout=5)
+            server_xml = os.path.join(self._liberty_home, 'usr', 'servers', 'server1', 'server.xml')
+            with open(server_xml) as f:
+                content = f.read()
+            with open(server_xml, 'w') as f:
+                f.write(content.replace('9443', '9444'))
+            os.utime(server_xml, (time.time() + 1, time.time() + 1))
+            
+            name, changes = next(changes)
+        finally:
+            watcher.stop()
+        
+        self.assertEqual('server1', name)
+        self.assertEqual('9444', changes[0].element.https_port)
+        self.assertEqual(['server1'], received)